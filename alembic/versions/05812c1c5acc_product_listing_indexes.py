@@ -0,0 +1,45 @@
+"""product listing indexes
+
+Índices parciales (solo productos activos) para la paginación por keyset de
+GET /store/products: uno por orden disponible, con el id como desempate para que
+cada página sea un recorrido del índice a partir del último (valor, id). El orden
+"newest" filtrado por stock tiene su propio índice, limitado a los productos con stock.
+
+Revision ID: 05812c1c5acc
+Revises: 09d7a2df5c15
+Create Date: 2026-10-17 13:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '05812c1c5acc'
+down_revision: Union[str, None] = '09d7a2df5c15'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+INDEXES = [
+    ("ix_products_active_created_at_id", "created_at, id", "is_active"),
+    ("ix_products_active_price_id", "price, id", "is_active"),
+    ("ix_products_active_title_id", "title, id", "is_active"),
+    ("ix_products_in_stock_created_at_id", "created_at, id", "is_active AND stock > 0"),
+]
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    # CREATE/DROP INDEX CONCURRENTLY no puede ejecutarse dentro de una transacción
+    with op.get_context().autocommit_block():
+        for name, columns, where in INDEXES:
+            op.execute(sa.text(f"CREATE INDEX CONCURRENTLY IF NOT EXISTS {name} ON products ({columns}) WHERE {where}"))
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    with op.get_context().autocommit_block():
+        for name, _, _ in INDEXES:
+            op.execute(sa.text(f"DROP INDEX CONCURRENTLY IF EXISTS {name}"))
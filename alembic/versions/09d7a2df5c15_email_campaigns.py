@@ -0,0 +1,46 @@
+"""email campaigns
+
+Tabla email_campaigns: estado y punto de reanudación (last_user_id) de los envíos
+masivos de src/campaigns/sender.py.
+
+Revision ID: 09d7a2df5c15
+Revises: dd195b980276
+Create Date: 2026-10-17 12:30:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+
+
+# revision identifiers, used by Alembic.
+revision: str = '09d7a2df5c15'
+down_revision: Union[str, None] = 'dd195b980276'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_table(
+        'email_campaigns',
+        sa.Column('id', postgresql.UUID(as_uuid=True), server_default=sa.text('uuid_generate_v7()'), nullable=False),
+        sa.Column('template', sa.String(), nullable=False),
+        sa.Column('subject', sa.String(), nullable=False),
+        sa.Column('status', sa.String(), server_default='running', nullable=False),
+        sa.Column('last_user_id', postgresql.UUID(as_uuid=True), nullable=True),
+        sa.Column('sent', sa.Integer(), server_default='0', nullable=False),
+        sa.Column('failed', sa.Integer(), server_default='0', nullable=False),
+        sa.Column('last_error', sa.Text(), nullable=True),
+        sa.Column('created_at', sa.DateTime(timezone=True), server_default=sa.text('now()'), nullable=False),
+        sa.Column('updated_at', sa.DateTime(timezone=True), server_default=sa.text('now()'), nullable=False),
+        sa.Column('finished_at', sa.DateTime(timezone=True), nullable=True),
+        sa.PrimaryKeyConstraint('id'),
+    )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_table('email_campaigns')
@@ -0,0 +1,45 @@
+"""drop used_tokens
+
+Los enlaces de restablecimiento se invalidan con users.token_version y los que no llevan
+"ver" se rechazan, así que used_tokens ya no se lee ni se escribe. Si la tabla se
+particionó con el antiguo `python -m src.auth.retention partition`, DROP TABLE elimina
+también sus particiones. El downgrade la recrea vacía.
+
+Revision ID: 3d63f8b58dba
+Revises: cce65121709e
+Create Date: 2026-10-17 14:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+
+
+# revision identifiers, used by Alembic.
+revision: str = '3d63f8b58dba'
+down_revision: Union[str, None] = 'cce65121709e'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.execute(sa.text("DROP TABLE IF EXISTS used_tokens"))
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.create_table(
+        'used_tokens',
+        sa.Column('id', postgresql.UUID(as_uuid=True), server_default=sa.text('uuid_generate_v7()'), nullable=False),
+        sa.Column('token_hash', sa.String(), nullable=False),
+        sa.Column('token_type', sa.String(), nullable=False),
+        sa.Column('user_id', postgresql.UUID(as_uuid=True), nullable=False),
+        sa.Column('used_at', sa.DateTime(timezone=True), server_default=sa.text('now()'), nullable=False),
+        sa.ForeignKeyConstraint(['user_id'], ['users.id'], ondelete='CASCADE'),
+        sa.PrimaryKeyConstraint('id'),
+    )
+    op.create_index('ix_used_tokens_token_hash', 'used_tokens', ['token_hash'], unique=True)
+    op.create_index('ix_used_tokens_used_at', 'used_tokens', ['used_at'])
@@ -0,0 +1,69 @@
+"""uuid7 primary key defaults
+
+La aplicación ya genera UUIDv7 (src.utils.uuid7) para las filas nuevas. Esta migración
+añade además uuid_generate_v7() como DEFAULT de las PK para las inserciones hechas
+fuera del ORM. Solo cambia metadatos: las filas existentes conservan su uuid4 y ambos
+conviven en la misma columna, sin reescribir tablas ni claves foráneas.
+
+Revision ID: 50d0dc1a962e
+Revises: 96cb808e2216
+Create Date: 2026-10-17 10:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '50d0dc1a962e'
+down_revision: Union[str, None] = '96cb808e2216'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+TABLES = [
+    "users",
+    "password_history",
+    "used_tokens",
+    "products",
+    "carts",
+    "cart_products",
+    "orders",
+    "order_products",
+]
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    # Toma un uuid4 aleatorio, sobrescribe los 48 bits altos con el timestamp en ms
+    # y cambia la versión de 4 (0100) a 7 (0111) activando los bits 52 y 53.
+    op.execute(sa.text("""
+        CREATE OR REPLACE FUNCTION uuid_generate_v7() RETURNS uuid AS $$
+        BEGIN
+            RETURN encode(
+                set_bit(
+                    set_bit(
+                        overlay(
+                            uuid_send(gen_random_uuid())
+                            PLACING substring(int8send(floor(extract(epoch FROM clock_timestamp()) * 1000)::bigint) FROM 3)
+                            FROM 1 FOR 6
+                        ),
+                        52, 1
+                    ),
+                    53, 1
+                ),
+                'hex'
+            )::uuid;
+        END
+        $$ LANGUAGE plpgsql VOLATILE
+    """))
+    for table in TABLES:
+        op.alter_column(table, "id", server_default=sa.text("uuid_generate_v7()"))
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    for table in TABLES:
+        op.alter_column(table, "id", server_default=None)
+    op.execute(sa.text("DROP FUNCTION IF EXISTS uuid_generate_v7()"))
@@ -0,0 +1,41 @@
+"""user token_version
+
+Añade users.token_version, que viaja en los enlaces de restablecimiento ("ver") y se
+incrementa para invalidarlos. Sustituye a las filas de invalidación de used_tokens, por
+lo que se elimina el índice que solo usaba esa comprobación. Con DEFAULT constante
+ADD COLUMN no reescribe la tabla.
+
+Revision ID: 632276a03bda
+Revises: 6f72d79f2f12
+Create Date: 2026-10-17 11:30:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '632276a03bda'
+down_revision: Union[str, None] = '6f72d79f2f12'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.add_column('users', sa.Column('token_version', sa.Integer(), server_default='0', nullable=False))
+    # CREATE/DROP INDEX CONCURRENTLY no puede ejecutarse dentro de una transacción
+    with op.get_context().autocommit_block():
+        op.execute(sa.text("DROP INDEX CONCURRENTLY IF EXISTS ix_used_tokens_user_id_token_type_used_at"))
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    with op.get_context().autocommit_block():
+        op.execute(sa.text(
+            "CREATE INDEX CONCURRENTLY IF NOT EXISTS ix_used_tokens_user_id_token_type_used_at "
+            "ON used_tokens (user_id, token_type, used_at)"
+        ))
+    op.drop_column('users', 'token_version')
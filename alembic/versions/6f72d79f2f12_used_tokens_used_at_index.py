@@ -0,0 +1,34 @@
+"""used_tokens used_at index
+
+Índice sobre used_tokens.used_at para que el job de retención (src/auth/retention.py)
+borre por lotes los tokens caducados sin recorrer la tabla entera en cada lote.
+
+Revision ID: 6f72d79f2f12
+Revises: 50d0dc1a962e
+Create Date: 2026-10-17 11:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '6f72d79f2f12'
+down_revision: Union[str, None] = '50d0dc1a962e'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    # CREATE/DROP INDEX CONCURRENTLY no puede ejecutarse dentro de una transacción
+    with op.get_context().autocommit_block():
+        op.execute(sa.text("CREATE INDEX CONCURRENTLY IF NOT EXISTS ix_used_tokens_used_at ON used_tokens (used_at)"))
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    with op.get_context().autocommit_block():
+        op.execute(sa.text("DROP INDEX CONCURRENTLY IF EXISTS ix_used_tokens_used_at"))
@@ -0,0 +1,83 @@
+"""access path indexes
+
+Índices para las consultas reales de los servicios y eliminación de los índices
+redundantes sobre las claves primarias (la PK ya tiene su propio índice único).
+Se crean con CONCURRENTLY para no bloquear escrituras en producción.
+
+Revision ID: 96cb808e2216
+Revises: f44f15bcc9a2
+Create Date: 2026-10-17 09:30:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '96cb808e2216'
+down_revision: Union[str, None] = 'f44f15bcc9a2'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+NEW_INDEXES = [
+    ("ix_used_tokens_user_id_token_type_used_at", "used_tokens", "user_id, token_type, used_at", False),
+    ("ix_orders_created_at", "orders", "created_at", False),
+    ("ix_order_products_order_id", "order_products", "order_id", False),
+    ("uq_cart_products_cart_id_product_id", "cart_products", "cart_id, product_id", True),
+    ("ix_password_history_user_id_created_at", "password_history", "user_id, created_at", False),
+]
+
+REDUNDANT_PK_INDEXES = [
+    ("ix_users_id", "users"),
+    ("ix_password_history_id", "password_history"),
+    ("ix_used_tokens_id", "used_tokens"),
+    ("ix_products_id", "products"),
+    ("ix_carts_id", "carts"),
+    ("ix_cart_products_id", "cart_products"),
+    ("ix_orders_id", "orders"),
+    ("ix_order_products_id", "order_products"),
+]
+
+_DUPLICATED_CART_LINES = """
+    SELECT cart_id, product_id, min(id::text)::uuid AS keep_id, sum(quantity) AS quantity
+    FROM cart_products
+    GROUP BY cart_id, product_id
+    HAVING count(*) > 1
+"""
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    # El índice único fallaría con líneas repetidas: se fusionan sumando cantidades
+    op.execute(sa.text(f"""
+        UPDATE cart_products SET quantity = d.quantity
+        FROM ({_DUPLICATED_CART_LINES}) AS d
+        WHERE cart_products.id = d.keep_id
+    """))
+    op.execute(sa.text(f"""
+        DELETE FROM cart_products
+        USING ({_DUPLICATED_CART_LINES}) AS d
+        WHERE cart_products.cart_id = d.cart_id
+          AND cart_products.product_id = d.product_id
+          AND cart_products.id <> d.keep_id
+    """))
+
+    # CREATE/DROP INDEX CONCURRENTLY no puede ejecutarse dentro de una transacción
+    with op.get_context().autocommit_block():
+        for name, table, columns, unique in NEW_INDEXES:
+            op.execute(sa.text(
+                f"CREATE {'UNIQUE ' if unique else ''}INDEX CONCURRENTLY IF NOT EXISTS {name} ON {table} ({columns})"
+            ))
+        for name, _ in REDUNDANT_PK_INDEXES:
+            op.execute(sa.text(f"DROP INDEX CONCURRENTLY IF EXISTS {name}"))
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    with op.get_context().autocommit_block():
+        for name, table in REDUNDANT_PK_INDEXES:
+            op.execute(sa.text(f"CREATE INDEX CONCURRENTLY IF NOT EXISTS {name} ON {table} (id)"))
+        for name, _, _, _ in NEW_INDEXES:
+            op.execute(sa.text(f"DROP INDEX CONCURRENTLY IF EXISTS {name}"))
@@ -0,0 +1,42 @@
+"""listing keyset indexes
+
+Índices para los listados paginados con src/pagination.py: pedidos de un usuario
+(GET /store/orders) por (user_id, created_at, id) y usuarios (GET /auth/users) por
+(created_at, id). El listado de todos los pedidos usa el ix_orders_created_at existente.
+
+Revision ID: cce65121709e
+Revises: 05812c1c5acc
+Create Date: 2026-10-17 13:30:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'cce65121709e'
+down_revision: Union[str, None] = '05812c1c5acc'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+INDEXES = [
+    ("ix_orders_user_id_created_at_id", "orders", "user_id, created_at, id"),
+    ("ix_users_created_at_id", "users", "created_at, id"),
+]
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    # CREATE/DROP INDEX CONCURRENTLY no puede ejecutarse dentro de una transacción
+    with op.get_context().autocommit_block():
+        for name, table, columns in INDEXES:
+            op.execute(sa.text(f"CREATE INDEX CONCURRENTLY IF NOT EXISTS {name} ON {table} ({columns})"))
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    with op.get_context().autocommit_block():
+        for name, _, _ in INDEXES:
+            op.execute(sa.text(f"DROP INDEX CONCURRENTLY IF EXISTS {name}"))
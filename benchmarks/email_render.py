@@ -0,0 +1,59 @@
+"""
+Coste por email de generar el HTML y el mensaje MIME listo para enviar.
+
+Compara el camino anterior (get_template + render completo + MIMEMultipart serializado)
+con el actual: plantilla prerenderada (PrerenderedTemplate) y cabeceras en caché
+(EmailService.build_message). No envía nada.
+
+Uso (con el .env del proyecto disponible):
+    python -m benchmarks.email_render [iteraciones]
+"""
+import sys
+import time
+from email.mime.multipart import MIMEMultipart
+from email.mime.text import MIMEText
+
+from src.auth.emails import email_service
+from src.config import get_settings
+
+settings = get_settings()
+
+
+def _legacy(i: int) -> bytes:
+    html_content = email_service.env.get_template("password_reset.html").render(
+        reset_url=f"https://example.com/auth/password-reset?token=token-{i}",
+        expiration_minutes=settings.PASSWORD_RESET_TOKEN_EXPIRE_MINUTES,
+    )
+    msg = MIMEMultipart()
+    msg["From"] = email_service.sender_email
+    msg["To"] = f"user{i}@example.com"
+    msg["Subject"] = "Restablecimiento de contraseña"
+    msg.attach(MIMEText(html_content, "html"))
+    return msg.as_bytes()
+
+
+def _current(i: int) -> bytes:
+    subject, html_content = email_service.render_password_reset(f"token-{i}")
+    return email_service.build_message(f"user{i}@example.com", subject, html_content)
+
+
+def _per_message_us(build, iterations: int) -> float:
+    build(0)
+    start = time.perf_counter()
+    for i in range(iterations):
+        build(i)
+    return (time.perf_counter() - start) / iterations * 1_000_000
+
+
+def main(iterations: int) -> None:
+    start = time.perf_counter()
+    templates = email_service.precompile()
+    print(f"precompile: {templates} plantillas en {(time.perf_counter() - start) * 1000:.1f} ms")
+    legacy = _per_message_us(_legacy, iterations)
+    current = _per_message_us(_current, iterations)
+    print(f"render + MIMEMultipart:            {legacy:>8.1f} µs/email")
+    print(f"prerenderizada + cabeceras caché:  {current:>8.1f} µs/email  {legacy / current:>5.1f}x")
+
+
+if __name__ == "__main__":
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 20_000)
@@ -0,0 +1,41 @@
+"""
+Coste por petición de verificar el token de acceso.
+
+Compara los backends de decodificación (python-jose y PyJWT) y la caché de claims
+verificados (decode_token_cached) con un token de acceso como los que emite /auth/token.
+
+Uso (con el .env del proyecto disponible):
+    python -m benchmarks.jwt_decode [iteraciones]
+"""
+import sys
+import time
+import uuid
+
+from src.auth import service
+from src.auth.cache import token_cache
+from src.auth.tokens import DECODERS, decode_token_cached
+
+
+def _per_call_us(func, token: str, iterations: int) -> float:
+    func(token)
+    start = time.perf_counter()
+    for _ in range(iterations):
+        func(token)
+    return (time.perf_counter() - start) / iterations * 1_000_000
+
+
+def main(iterations: int = 20_000) -> None:
+    token = service.create_access_token(data={"sub": str(uuid.uuid4())})
+    assert DECODERS["jose"](token) == DECODERS["pyjwt"](token)
+
+    results = {f"decode ({name})": _per_call_us(decoder, token, iterations) for name, decoder in DECODERS.items()}
+    token_cache.clear()
+    results["decode_token_cached"] = _per_call_us(decode_token_cached, token, iterations)
+
+    baseline = results["decode (jose)"]
+    for name, us in results.items():
+        print(f"{name:<22} {us:>8.1f} µs/llamada  {baseline / us:>6.1f}x")
+
+
+if __name__ == "__main__":
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 20_000)
@@ -0,0 +1,61 @@
+"""
+Latencia de la comprobación del historial de contraseñas según su tamaño.
+
+Compara la verificación secuencial (un bcrypt tras otro, como antes) con
+PasswordHasher.verify_any, que reparte los hashes por el pool de procesos y corta en
+la primera coincidencia. Para cada tamaño mide dos casos: sin coincidencia (hay que
+verificarlos todos) y coincidencia con la contraseña más reciente.
+
+Uso (con el .env del proyecto disponible):
+    python -m benchmarks.password_history [tamaños separados por coma] [repeticiones]
+"""
+import asyncio
+import sys
+import time
+
+from src.auth.hashing import password_hasher
+
+NEW_PASSWORD = "NuevaClave#2024"
+
+
+async def _sequential(password: str, hashes: list[str]) -> bool:
+    for hashed in hashes:
+        if await password_hasher.verify(password, hashed):
+            return True
+    return False
+
+
+async def _measure(check, password: str, hashes: list[str], repeat: int) -> float:
+    start = time.perf_counter()
+    for _ in range(repeat):
+        await check(password, hashes)
+    return (time.perf_counter() - start) / repeat * 1000
+
+
+async def main(sizes: list[int], repeat: int) -> None:
+    password_hasher.start()
+    try:
+        print(f"Procesos de hashing: {password_hasher.workers}")
+        old_hashes = await asyncio.gather(
+            *[password_hasher.hash(f"Antigua#{i}") for i in range(max(sizes))]
+        )
+        new_hash = await password_hasher.hash(NEW_PASSWORD)
+        print(f"{'tamaño':>6}  {'caso':<14} {'secuencial':>12} {'paralelo':>12} {'mejora':>8}")
+        for size in sizes:
+            cases = {
+                "sin coincidir": old_hashes[:size],
+                "la más reciente": [new_hash] + old_hashes[:size - 1],
+            }
+            for case, hashes in cases.items():
+                sequential = await _measure(_sequential, NEW_PASSWORD, hashes, repeat)
+                parallel = await _measure(password_hasher.verify_any, NEW_PASSWORD, hashes, repeat)
+                print(f"{size:>6}  {case:<14} {sequential:>10.0f}ms {parallel:>10.0f}ms {sequential / parallel:>7.1f}x")
+    finally:
+        password_hasher.shutdown()
+
+
+if __name__ == "__main__":
+    asyncio.run(main(
+        [int(size) for size in sys.argv[1].split(",")] if len(sys.argv) > 1 else [3, 5, 10, 15, 20],
+        int(sys.argv[2]) if len(sys.argv) > 2 else 1,
+    ))
@@ -0,0 +1,98 @@
+"""
+Throughput de registro de usuarios: camino anterior frente a INSERT ... RETURNING.
+
+El camino anterior hace dos SELECT de unicidad, INSERT del usuario, refresh e INSERT del
+historial (cinco o más viajes); el nuevo es una sola sentencia con CTE más el COMMIT.
+El hash de la contraseña se calcula una vez fuera del bucle para medir solo la base de datos.
+
+Usa la base de datos del .env; al terminar borra los usuarios creados (email bench-signup-*).
+NO ejecutar contra producción.
+
+Uso:
+    python -m benchmarks.signup [registros] [concurrencia]
+"""
+import asyncio
+import sys
+import time
+import uuid
+
+from sqlalchemy import delete, select
+
+from src.auth import models, schemas
+from src.auth.hashing import pwd_context
+from src.auth.service import _insert_user_with_history
+from src.database import AsyncSessionLocal, async_engine
+
+EMAIL_PREFIX = "bench-signup-"
+
+
+def _new_user() -> schemas.UserCreate:
+    suffix = uuid.uuid4().hex
+    return schemas.UserCreate.model_construct(
+        email=f"{EMAIL_PREFIX}{suffix}@example.com",
+        full_name="Benchmark",
+        phone_number=f"9{int(suffix[:12], 16) % 10**11:011d}",
+        address="Calle 1",
+        password="x",
+    )
+
+
+async def _legacy(hashed_password: str) -> None:
+    user = _new_user()
+    async with AsyncSessionLocal() as db:
+        await db.execute(select(models.User).where(models.User.email == user.email))
+        await db.execute(select(models.User).where(models.User.phone_number == user.phone_number))
+        db_user = models.User(
+            email=user.email,
+            full_name=user.full_name,
+            phone_number=user.phone_number,
+            address=user.address,
+            hashed_password=hashed_password,
+        )
+        db.add(db_user)
+        await db.flush()
+        await db.refresh(db_user)
+        db.add(models.PasswordHistory(user_id=db_user.id, hashed_password=hashed_password))
+        await db.flush()
+        await db.commit()
+
+
+async def _single_statement(hashed_password: str) -> None:
+    async with AsyncSessionLocal() as db:
+        await db.execute(select(models.User).from_statement(_insert_user_with_history(_new_user(), hashed_password)))
+        await db.commit()
+
+
+async def _run(signup, hashed_password: str, total: int, concurrency: int) -> float:
+    semaphore = asyncio.Semaphore(concurrency)
+
+    async def one() -> None:
+        async with semaphore:
+            await signup(hashed_password)
+
+    start = time.perf_counter()
+    await asyncio.gather(*[one() for _ in range(total)])
+    return total / (time.perf_counter() - start)
+
+
+async def main(total: int, concurrency: int) -> None:
+    hashed_password = pwd_context.hash("Benchmark#2024")
+    try:
+        print(f"{total} registros, concurrencia {concurrency}")
+        legacy = await _run(_legacy, hashed_password, total, concurrency)
+        print(f"  anterior (SELECT x2 + INSERT + refresh + INSERT): {legacy:>8.0f} registros/s")
+        single = await _run(_single_statement, hashed_password, total, concurrency)
+        print(f"  INSERT ... RETURNING con CTE:                      {single:>8.0f} registros/s")
+        print(f"  mejora: {single / legacy:.2f}x")
+    finally:
+        async with AsyncSessionLocal() as db:
+            await db.execute(delete(models.User).where(models.User.email.startswith(EMAIL_PREFIX)))
+            await db.commit()
+        await async_engine.dispose()
+
+
+if __name__ == "__main__":
+    asyncio.run(main(
+        int(sys.argv[1]) if len(sys.argv) > 1 else 2_000,
+        int(sys.argv[2]) if len(sys.argv) > 2 else 10,
+    ))
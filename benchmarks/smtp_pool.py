@@ -0,0 +1,91 @@
+"""
+Emails por segundo: conexión nueva por mensaje frente al pool de conexiones SMTP.
+
+El camino anterior crea un contexto SSL, abre una conexión TLS, hace AUTH, envía un
+mensaje y cierra, en cada email. El pool (src/auth/smtp.py) reutiliza conexiones ya
+autenticadas y un único contexto SSL. Ambos envían contra un servidor SMTP local con TLS
+implícito (benchmarks/smtp_stub.py); la latencia simula el viaje de ida y vuelta.
+
+No necesita .env: no importa la configuración de la app.
+
+Uso:
+    python -m benchmarks.smtp_pool [mensajes] [concurrencia] [latencia_ms]
+"""
+import asyncio
+import ssl
+import sys
+import time
+from email.mime.multipart import MIMEMultipart
+from email.mime.text import MIMEText
+
+import aiosmtplib
+
+from benchmarks.smtp_stub import SMTPStub, self_signed_tls
+from src.auth.smtp import SMTPConnectionPool
+
+USER, PASSWORD = "bench@example.com", "secret"
+
+
+def _message(i: int) -> MIMEMultipart:
+    msg = MIMEMultipart()
+    msg["From"] = USER
+    msg["To"] = f"user{i}@example.com"
+    msg["Subject"] = "Benchmark"
+    msg.attach(MIMEText("<p>Hola</p>" * 50, "html"))
+    return msg
+
+
+def _client_context(cert: str) -> ssl.SSLContext:
+    context = ssl.create_default_context()
+    context.load_verify_locations(cert)
+    return context
+
+
+async def _send_fresh(port: int, cert: str, msg: MIMEMultipart) -> None:
+    smtp = aiosmtplib.SMTP(hostname="localhost", port=port, use_tls=True, tls_context=_client_context(cert))
+    await smtp.connect()
+    await smtp.login(USER, PASSWORD)
+    await smtp.send_message(msg)
+    await smtp.quit()
+
+
+async def _run(send, total: int, concurrency: int) -> float:
+    semaphore = asyncio.Semaphore(concurrency)
+
+    async def one(i: int) -> None:
+        async with semaphore:
+            await send(_message(i))
+
+    start = time.perf_counter()
+    await asyncio.gather(*[one(i) for i in range(total)])
+    return total / (time.perf_counter() - start)
+
+
+async def main(total: int, concurrency: int, latency_ms: float) -> None:
+    server_tls, cert = self_signed_tls()
+    stub = SMTPStub(latency_ms)
+    server = await stub.start(host="127.0.0.1", tls=server_tls)
+    port = server.sockets[0].getsockname()[1]
+    pool = SMTPConnectionPool(
+        "localhost", port, USER, PASSWORD, size=concurrency, max_messages=total, tls_context=_client_context(cert)
+    )
+    try:
+        print(f"{total} mensajes, concurrencia {concurrency}, latencia {latency_ms} ms")
+        fresh = await _run(lambda msg: _send_fresh(port, cert, msg), total, concurrency)
+        print(f"  conexión nueva por mensaje: {fresh:>8.0f} mensajes/s")
+        pooled = await _run(pool.send_message, total, concurrency)
+        print(f"  pool de conexiones:         {pooled:>8.0f} mensajes/s")
+        print(f"  mejora: {pooled / fresh:.2f}x")
+        print(f"  pool: {pool.snapshot()}")
+    finally:
+        await pool.close()
+        server.close()
+        await server.wait_closed()
+
+
+if __name__ == "__main__":
+    asyncio.run(main(
+        int(sys.argv[1]) if len(sys.argv) > 1 else 500,
+        int(sys.argv[2]) if len(sys.argv) > 2 else 4,
+        float(sys.argv[3]) if len(sys.argv) > 3 else 2,
+    ))
@@ -0,0 +1,89 @@
+"""
+Servidor SMTP mínimo para benchmarks: acepta AUTH, MAIL, RCPT, DATA, NOOP, RSET y QUIT,
+descarta los mensajes y solo los cuenta. Con TLS implícito (como el puerto 465) usa un
+certificado autofirmado generado con el binario openssl.
+
+`latency_ms` retrasa cada respuesta para simular el viaje de ida y vuelta al servidor real.
+
+Uso (servidor independiente, sin TLS):
+    python -m benchmarks.smtp_stub [puerto] [latencia_ms]
+"""
+import asyncio
+import os
+import ssl
+import subprocess
+import sys
+import tempfile
+from typing import Optional
+
+
+class SMTPStub:
+    def __init__(self, latency_ms: float = 0):
+        self.latency = latency_ms / 1000
+        self.messages = 0
+        self.connections = 0
+
+    async def _reply(self, writer: asyncio.StreamWriter, line: str) -> None:
+        if self.latency:
+            await asyncio.sleep(self.latency)
+        writer.write(line.encode() + b"\r\n")
+        await writer.drain()
+
+    async def handle(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter) -> None:
+        self.connections += 1
+        try:
+            await self._reply(writer, "220 localhost ESMTP stub")
+            while line := await reader.readline():
+                command = line.decode(errors="replace").strip().upper()
+                if command.startswith(("EHLO", "HELO")):
+                    await self._reply(writer, "250-localhost\r\n250-AUTH PLAIN LOGIN\r\n250-8BITMIME\r\n250 SIZE 10485760")
+                elif command.startswith("AUTH"):
+                    await self._reply(writer, "235 2.7.0 Authentication successful")
+                elif command == "DATA":
+                    await self._reply(writer, "354 End data with <CR><LF>.<CR><LF>")
+                    while (data := await reader.readline()) not in (b".\r\n", b""):
+                        pass
+                    self.messages += 1
+                    await self._reply(writer, "250 2.0.0 OK queued")
+                elif command == "QUIT":
+                    await self._reply(writer, "221 2.0.0 Bye")
+                    break
+                else:
+                    # MAIL, RCPT, NOOP, RSET
+                    await self._reply(writer, "250 2.0.0 OK")
+        except (ConnectionError, asyncio.IncompleteReadError, ssl.SSLError):
+            pass
+        finally:
+            writer.close()
+
+    async def start(self, host: str = "127.0.0.1", port: int = 0, tls: Optional[ssl.SSLContext] = None) -> asyncio.Server:
+        return await asyncio.start_server(self.handle, host, port, ssl=tls)
+
+
+def self_signed_tls(directory: Optional[str] = None) -> tuple[ssl.SSLContext, str]:
+    """Contexto TLS de servidor con un certificado para localhost y la ruta del certificado."""
+    directory = directory or tempfile.mkdtemp(prefix="smtp-stub-")
+    cert, key = os.path.join(directory, "cert.pem"), os.path.join(directory, "key.pem")
+    subprocess.run(
+        ["openssl", "req", "-x509", "-newkey", "rsa:2048", "-nodes", "-days", "1",
+         "-subj", "/CN=localhost", "-addext", "subjectAltName=DNS:localhost,IP:127.0.0.1",
+         "-keyout", key, "-out", cert],
+        check=True, capture_output=True,
+    )
+    context = ssl.SSLContext(ssl.PROTOCOL_TLS_SERVER)
+    context.load_cert_chain(cert, key)
+    return context, cert
+
+
+async def main(port: int, latency_ms: float) -> None:
+    server = await SMTPStub(latency_ms).start(port=port)
+    print(f"SMTP de prueba en 127.0.0.1:{port} (latencia {latency_ms} ms por respuesta)")
+    async with server:
+        await server.serve_forever()
+
+
+if __name__ == "__main__":
+    asyncio.run(main(
+        int(sys.argv[1]) if len(sys.argv) > 1 else 2525,
+        float(sys.argv[2]) if len(sys.argv) > 2 else 0,
+    ))
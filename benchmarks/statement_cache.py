@@ -0,0 +1,76 @@
+"""
+Micro-benchmark del coste por llamada de las búsquedas frecuentes (usuario por id).
+
+Compara la API legacy db.query(...).filter(...), select() con y sin caché de
+compilación y lambda_stmt. Usa SQLite en memoria para aislar el coste de Python
+(construcción + compilación + ORM) del de la red y el servidor.
+
+Uso (con el .env del proyecto disponible):
+    python -m benchmarks.statement_cache [iteraciones]
+"""
+import sys
+import time
+import uuid
+
+from sqlalchemy import create_engine, lambda_stmt, select
+from sqlalchemy.orm import Session
+
+import src.models  # noqa: F401  registra todos los modelos
+from src.auth.models import User
+from src.database import Base
+
+
+def _make_session(query_cache_size: int) -> tuple[Session, uuid.UUID]:
+    engine = create_engine("sqlite://", query_cache_size=query_cache_size)
+    Base.metadata.create_all(engine)
+    db = Session(engine)
+    user = User(
+        email="bench@example.com",
+        full_name="Benchmark",
+        phone_number="70000000",
+        address="Calle 1",
+        hashed_password="x",
+    )
+    db.add(user)
+    db.commit()
+    return db, user.id
+
+
+def _legacy(db: Session, user_id):
+    return db.query(User).filter(User.id == user_id).first()
+
+
+def _select(db: Session, user_id):
+    return db.execute(select(User).where(User.id == user_id)).scalars().first()
+
+
+def _lambda(db: Session, user_id):
+    return db.execute(lambda_stmt(lambda: select(User).where(User.id == user_id))).scalars().first()
+
+
+def _measure(fn, db: Session, user_id, iterations: int) -> float:
+    for _ in range(min(iterations, 200)):
+        fn(db, user_id)
+    start = time.perf_counter()
+    for _ in range(iterations):
+        fn(db, user_id)
+    return (time.perf_counter() - start) / iterations * 1_000_000
+
+
+def main(iterations: int = 20_000) -> None:
+    cases = [
+        ("query().filter() sin caché de compilación", _legacy, 0),
+        ("query().filter() (antes)", _legacy, 500),
+        ("select()", _select, 500),
+        ("lambda_stmt (después)", _lambda, 500),
+    ]
+    print(f"{iterations} llamadas por caso")
+    for label, fn, cache_size in cases:
+        db, user_id = _make_session(cache_size)
+        per_call = _measure(fn, db, user_id, iterations)
+        print(f"{label:<45} {per_call:8.1f} µs/llamada")
+        db.close()
+
+
+if __name__ == "__main__":
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 20_000)
@@ -0,0 +1,68 @@
+"""
+Throughput de inserción con claves uuid4 frente a uuid7 en PostgreSQL.
+
+Crea dos tablas UNLOGGED temporales (bench_uuid_v4 y bench_uuid_v7) en la base de
+datos configurada en el .env, inserta el mismo número de filas en lotes y muestra
+filas/segundo por tramo, además del tamaño final del índice de la PK. Con uuid4 el
+rendimiento cae a medida que el índice deja de caber en memoria; con uuid7 se mantiene.
+
+NO ejecutar contra producción. Las tablas se eliminan al terminar.
+
+Uso:
+    python -m benchmarks.uuid_insert [filas] [tamaño_lote]
+"""
+import sys
+import time
+import uuid
+
+import psycopg2
+from psycopg2.extras import execute_values, register_uuid
+
+from src.config import get_settings
+from src.utils import uuid7
+
+REPORT_EVERY = 250_000
+
+
+def _run(cursor, table: str, generate, rows: int, batch_size: int) -> float:
+    cursor.execute(f"DROP TABLE IF EXISTS {table}")
+    cursor.execute(
+        f"CREATE UNLOGGED TABLE {table} (id uuid PRIMARY KEY, created_at timestamptz NOT NULL DEFAULT now(), payload text)"
+    )
+    inserted = window_rows = 0
+    start = window_start = time.perf_counter()
+    while inserted < rows:
+        batch = [(generate(), "x" * 64) for _ in range(min(batch_size, rows - inserted))]
+        execute_values(cursor, f"INSERT INTO {table} (id, payload) VALUES %s", batch, page_size=batch_size)
+        inserted += len(batch)
+        window_rows += len(batch)
+        if window_rows >= REPORT_EVERY or inserted == rows:
+            now = time.perf_counter()
+            print(f"  {table}: {inserted:>10,} filas  {window_rows / (now - window_start):>10,.0f} filas/s (tramo)")
+            window_rows, window_start = 0, now
+    elapsed = time.perf_counter() - start
+    cursor.execute(f"SELECT pg_size_pretty(pg_relation_size('{table}_pkey'))")
+    print(f"  {table}: total {rows / elapsed:,.0f} filas/s, índice PK {cursor.fetchone()[0]}")
+    cursor.execute(f"DROP TABLE {table}")
+    return elapsed
+
+
+def main(rows: int = 2_000_000, batch_size: int = 5_000) -> None:
+    register_uuid()
+    connection = psycopg2.connect(get_settings().DATABASE_URL)
+    connection.autocommit = True
+    try:
+        with connection.cursor() as cursor:
+            print(f"Insertando {rows:,} filas en lotes de {batch_size:,}")
+            v4 = _run(cursor, "bench_uuid_v4", uuid.uuid4, rows, batch_size)
+            v7 = _run(cursor, "bench_uuid_v7", uuid7, rows, batch_size)
+            print(f"uuid7 vs uuid4: {v4 / v7:.2f}x")
+    finally:
+        connection.close()
+
+
+if __name__ == "__main__":
+    main(
+        int(sys.argv[1]) if len(sys.argv) > 1 else 2_000_000,
+        int(sys.argv[2]) if len(sys.argv) > 2 else 5_000,
+    )
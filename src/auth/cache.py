@@ -0,0 +1,48 @@
+from uuid import UUID
+
+from sqlalchemy import event
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from src.auth import models, schemas
+from src.cache import TTLCache
+from src.config import get_settings
+from src.database import RoutingSession
+
+settings = get_settings()
+
+# Proyección del usuario autenticado (schemas.User) por id, sin hash de contraseña
+user_cache = TTLCache(
+    "auth_users",
+    max_size=settings.AUTH_USER_CACHE_MAX_SIZE,
+    ttl_seconds=settings.AUTH_USER_CACHE_TTL_SECONDS,
+)
+
+# Claims de los JWT ya verificados, por digest del token; cada entrada caduca como mucho en su exp
+token_cache = TTLCache(
+    "auth_tokens",
+    max_size=settings.AUTH_TOKEN_CACHE_MAX_SIZE,
+    ttl_seconds=settings.AUTH_TOKEN_CACHE_TTL_SECONDS,
+)
+
+
+def to_current_user(user: models.User) -> schemas.User:
+    # model_construct: los datos ya están en la BD, no se vuelven a validar en cada carga
+    return schemas.User.model_construct(
+        **{field: getattr(user, field) for field in schemas.User.model_fields}
+    )
+
+
+def invalidate_user(db: AsyncSession, user_id: UUID | str) -> None:
+    """
+    Quita al usuario de la caché ahora y de nuevo tras el commit, para que una petición
+    concurrente no vuelva a cachear los datos anteriores mientras la transacción sigue abierta.
+    """
+    key = str(user_id)
+    user_cache.invalidate(key)
+    db.info.setdefault("invalidated_user_ids", set()).add(key)
+
+
+@event.listens_for(RoutingSession, "after_commit")
+def _invalidate_after_commit(session) -> None:
+    for key in session.info.pop("invalidated_user_ids", ()):
+        user_cache.invalidate(key)
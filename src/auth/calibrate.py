@@ -0,0 +1,78 @@
+"""
+Calibra el coste del hashing de contraseñas en la máquina de despliegue.
+
+Mide el tiempo de un hash con cada coste candidato y recomienda el mayor que cabe en
+el presupuesto de latencia. El valor se lleva al .env; los hashes existentes con otro
+coste se recalculan solos en el siguiente inicio de sesión (verify_and_update).
+
+Uso:
+    python -m src.auth.calibrate [objetivo_ms] [muestras]
+"""
+import statistics
+import sys
+import time
+
+from passlib.hash import argon2, bcrypt
+
+from src.config import get_settings
+
+settings = get_settings()
+
+BCRYPT_ROUNDS_RANGE = range(10, 17)
+ARGON2_TIME_COST_RANGE = range(1, 11)
+SAMPLE_PASSWORD = "Calibracion#2024"
+
+
+def _median_ms(handler, samples: int) -> float:
+    timings = []
+    for _ in range(samples):
+        start = time.perf_counter()
+        handler.hash(SAMPLE_PASSWORD)
+        timings.append((time.perf_counter() - start) * 1000)
+    return statistics.median(timings)
+
+
+def _calibrate(name: str, candidates, make_handler, target_ms: float, samples: int):
+    chosen = None
+    print(f"{name}:")
+    for value in candidates:
+        elapsed = _median_ms(make_handler(value), samples)
+        print(f"  {value:>3}  {elapsed:>8.1f} ms")
+        if elapsed > target_ms:
+            # El coste crece de forma monótona: los siguientes valores tampoco caben
+            break
+        chosen = value
+    return chosen
+
+
+def main(target_ms: float = 250, samples: int = 5) -> None:
+    print(f"Objetivo: {target_ms:.0f} ms por hash (mediana de {samples} muestras)")
+    if settings.PASSWORD_HASH_SCHEME == "argon2":
+        time_cost = _calibrate(
+            f"argon2id (memoria {settings.ARGON2_MEMORY_COST} KiB, paralelismo {settings.ARGON2_PARALLELISM})",
+            ARGON2_TIME_COST_RANGE,
+            lambda value: argon2.using(
+                type="ID",
+                time_cost=value,
+                memory_cost=settings.ARGON2_MEMORY_COST,
+                parallelism=settings.ARGON2_PARALLELISM,
+            ),
+            target_ms,
+            samples,
+        )
+        recommendation = f"ARGON2_TIME_COST={time_cost}" if time_cost else None
+    else:
+        rounds = _calibrate("bcrypt", BCRYPT_ROUNDS_RANGE, lambda value: bcrypt.using(rounds=value), target_ms, samples)
+        recommendation = f"BCRYPT_ROUNDS={rounds}" if rounds else None
+
+    if recommendation is None:
+        print("Ningún coste candidato cabe en el objetivo; aumentar el presupuesto o revisar la máquina")
+        sys.exit(1)
+    print(f"\nAñadir al .env:\n{recommendation}")
+
+
+if __name__ == "__main__":
+    main(
+        float(sys.argv[1]) if len(sys.argv) > 1 else 250,
+        int(sys.argv[2]) if len(sys.argv) > 2 else 5,
+    )
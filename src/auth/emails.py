@@ -1,16 +1,54 @@
-import aiosmtplib
+import base64
+import os
+import re
+from email.header import Header
 from email.mime.text import MIMEText
 from email.mime.multipart import MIMEMultipart
 import smtplib
 from typing import Optional
 from pathlib import Path
-from jinja2 import Environment, FileSystemLoader
-import ssl
+from jinja2 import Environment, FileSystemBytecodeCache, FileSystemLoader, Template
+from markupsafe import Markup, escape
 
+from src.auth.smtp import SMTPConnectionPool
 from src.config import get_settings
 
 settings = get_settings()
 
+# Frontera MIME fija: el cuerpo va en base64, que no contiene "-", así que no puede coincidir
+MIME_BOUNDARY = "=_ecostylo_html_part"
+
+
+class PrerenderedTemplate:
+    """
+    Plantilla renderizada una sola vez con marcadores en lugar de las variables de cada
+    destinatario. Cada email solo concatena los fragmentos estáticos con los valores
+    escapados, sin volver a ejecutar la plantilla.
+
+    Solo vale si las variables se imprimen tal cual ({{ var }}); al construirla se compara
+    con un render normal y, si no coinciden (filtros, condiciones sobre la variable...),
+    se renderiza la plantilla completa en cada email.
+    """
+
+    _MARKER = re.compile("\x00(\\w+)\x00")
+
+    def __init__(self, template: Template, variables: tuple[str, ...], **static_context):
+        self.template = template
+        self.static_context = static_context
+        markers = {name: Markup(f"\x00{name}\x00") for name in variables}
+        self.parts: Optional[list[str]] = self._MARKER.split(template.render(**static_context, **markers))
+        sample = {name: f'<{name} & "{name}">' for name in variables}
+        if self.render(**sample) != template.render(**static_context, **sample):
+            self.parts = None
+
+    def render(self, **values) -> str:
+        if self.parts is None:
+            return self.template.render(**self.static_context, **values)
+        parts = self.parts.copy()
+        for i in range(1, len(parts), 2):
+            parts[i] = escape(values[parts[i]])
+        return "".join(parts)
+
 
 class EmailService:
     def __init__(self):
@@ -19,57 +57,156 @@ class EmailService:
         self.sender_email = settings.SENDER_EMAIL
         self.sender_password = settings.SMTP_PASSWORD
         self.template_dir = Path(__file__).parent.parent / "templates" / "email"
+        if settings.EMAIL_TEMPLATE_BYTECODE_CACHE_DIR:
+            os.makedirs(settings.EMAIL_TEMPLATE_BYTECODE_CACHE_DIR, exist_ok=True)
         self.env = Environment(
             loader=FileSystemLoader(str(self.template_dir)),
-            autoescape=True
+            autoescape=True,
+            # Las plantillas compiladas se guardan en disco: otros workers y reinicios no las recompilan
+            bytecode_cache=FileSystemBytecodeCache(settings.EMAIL_TEMPLATE_BYTECODE_CACHE_DIR),
+            # Las plantillas no cambian en caliente: sin stat() del fichero en cada get_template
+            auto_reload=False,
+        )
+        self._templates: Optional[dict[str, PrerenderedTemplate]] = None
+        self._headers: dict[str, tuple[bytes, bytes]] = {}
+        self._campaign_templates: dict[str, PrerenderedTemplate] = {}
+        # Conexiones autenticadas reutilizadas entre envíos (TLS + AUTH una vez por conexión)
+        self.smtp_pool = SMTPConnectionPool(
+            hostname=self.smtp_server,
+            port=self.smtp_port,
+            username=self.sender_email,
+            password=self.sender_password,
+            size=settings.SMTP_POOL_SIZE,
+            idle_timeout=settings.SMTP_POOL_IDLE_TIMEOUT_SECONDS,
+            healthcheck_after=settings.SMTP_POOL_HEALTHCHECK_SECONDS,
+            max_messages=settings.SMTP_POOL_MAX_MESSAGES_PER_CONNECTION,
+            timeout=settings.SMTP_TIMEOUT_SECONDS,
         )
 
-    async def _send_email(self, to_email: str, subject: str, html_content: str) -> bool:
-        try:
+    def precompile(self) -> int:
+        """
+        Compila todas las plantillas de templates/email y prepara las de los emails que
+        se envían. Se llama al arrancar la app; devuelve cuántas plantillas ha cargado.
+        """
+        names = self.env.list_templates(extensions=["html"])
+        for name in names:
+            self.env.get_template(name)
+        self._templates = {
+            "welcome": PrerenderedTemplate(self.env.get_template("welcome.html"), ("username",)),
+            "password_reset": PrerenderedTemplate(
+                self.env.get_template("password_reset.html"),
+                ("reset_url",),
+                expiration_minutes=settings.PASSWORD_RESET_TOKEN_EXPIRE_MINUTES,
+            ),
+        }
+        return len(names)
+
+    @property
+    def templates(self) -> dict[str, PrerenderedTemplate]:
+        if self._templates is None:
+            self.precompile()
+        return self._templates
+
+    def _static_headers(self, subject: str) -> tuple[bytes, bytes]:
+        """Cabeceras comunes a todos los emails con este asunto: (antes de To, después de To)."""
+        cached = self._headers.get(subject)
+        if cached is not None:
+            return cached
+        encoded_subject = Header(subject, "utf-8").encode().replace("\n", "\r\n")
+        before = f"From: {self.sender_email}\r\n".encode()
+        after = (
+            f"Subject: {encoded_subject}\r\n"
+            "MIME-Version: 1.0\r\n"
+            f'Content-Type: multipart/mixed; boundary="{MIME_BOUNDARY}"\r\n'
+            "\r\n"
+            f"--{MIME_BOUNDARY}\r\n"
+            'Content-Type: text/html; charset="utf-8"\r\n'
+            "MIME-Version: 1.0\r\n"
+            "Content-Transfer-Encoding: base64\r\n"
+            "\r\n"
+        ).encode()
+        self._headers[subject] = (before, after)
+        return before, after
+
+    def build_message(self, to_email: str, subject: str, html_content: str) -> bytes:
+        """
+        El mismo mensaje multipart/HTML que construía MIMEMultipart, serializado a mano:
+        las cabeceras se reutilizan y solo se añaden el destinatario y el cuerpo.
+        """
+        if "\r" in to_email or "\n" in to_email:
+            raise ValueError("Dirección de destino no válida")
+        if not (to_email.isascii() and self.sender_email.isascii()):
             msg = MIMEMultipart()
             msg["From"] = self.sender_email
             msg["To"] = to_email
             msg["Subject"] = subject
-
             msg.attach(MIMEText(html_content, "html"))
+            return msg.as_bytes()
+        before, after = self._static_headers(subject)
+        body = base64.encodebytes(html_content.encode()).replace(b"\n", b"\r\n")
+        return b"".join((
+            before, b"To: ", to_email.encode(), b"\r\n", after,
+            body, f"--{MIME_BOUNDARY}--\r\n".encode(),
+        ))
+
+    async def send(self, to_email: str, subject: str, html_content: str) -> None:
+        """Envía el email; lanza la excepción si falla (la usa el outbox para reintentar)."""
+        message = self.build_message(to_email, subject, html_content)
+        await self.smtp_pool.sendmail(self.sender_email, [to_email], message)
 
-            context = ssl.create_default_context()
-            smtp = aiosmtplib.SMTP(
-                hostname=self.smtp_server,
-                port=self.smtp_port,
-                use_tls=True,
-                tls_context=context
-            )
-            
-            await smtp.connect()
-            await smtp.login(self.sender_email, self.sender_password)
-            await smtp.send_message(msg)
-            await smtp.quit()
+    async def _send_email(self, to_email: str, subject: str, html_content: str) -> bool:
+        try:
+            await self.send(to_email, subject, html_content)
             return True
         except Exception as e:
             print(f"Error sending email: {str(e)}")
             return False
 
+    def render_welcome(self, username: str) -> tuple[str, str]:
+        return "¡Bienvenido a nuestra plataforma!", self.templates["welcome"].render(username=username)
+
+    def render_password_reset(self, reset_token: str) -> tuple[str, str]:
+        base_url = f"https://{settings.URL}" if not settings.URL.startswith('http') else settings.URL
+        reset_url = f"{base_url}/auth/password-reset?token={reset_token}"
+
+        html_content = self.templates["password_reset"].render(reset_url=reset_url)
+        return "Restablecimiento de contraseña", html_content
+
+    def campaign_template(self, name: str) -> PrerenderedTemplate:
+        """Plantilla de campaña (src/campaigns); la única variable por destinatario es full_name."""
+        template = self._campaign_templates.get(name)
+        if template is None:
+            template = PrerenderedTemplate(self.env.get_template(name), ("full_name",))
+            self._campaign_templates[name] = template
+        return template
+
+    def render_campaign(self, template: str, subject: str, full_name: str) -> tuple[str, str]:
+        return subject, self.campaign_template(template).render(full_name=full_name)
+
+    def render(self, kind: str, payload: dict) -> tuple[str, str]:
+        """(asunto, html) de un email del outbox según su tipo."""
+        renderers = {
+            "welcome": self.render_welcome,
+            "password_reset": self.render_password_reset,
+            "campaign": self.render_campaign,
+        }
+        return renderers[kind](**payload)
+
     async def send_welcome_email(self, to_email: str, username: str) -> bool:
-        template = self.env.get_template("welcome.html")
-        html_content = template.render(username=username)
+        subject, html_content = self.render_welcome(username)
         return await self._send_email(
             to_email=to_email,
-            subject="¡Bienvenido a nuestra plataforma!",
+            subject=subject,
             html_content=html_content
         )
 
     async def send_password_reset_email(self, to_email: str, reset_token: str) -> bool:
-        base_url = f"https://{settings.URL}" if not settings.URL.startswith('http') else settings.URL
-        reset_url = f"{base_url}/auth/password-reset?token={reset_token}"
-        
-        template = self.env.get_template("password_reset.html")
-        html_content = template.render(
-            reset_url=reset_url,
-            expiration_minutes=settings.PASSWORD_RESET_TOKEN_EXPIRE_MINUTES
-        )
+        subject, html_content = self.render_password_reset(reset_token)
         return await self._send_email(
             to_email=to_email,
-            subject="Restablecimiento de contraseña",
+            subject=subject,
             html_content=html_content
         )
+
+
+email_service = EmailService()
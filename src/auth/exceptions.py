@@ -58,4 +58,11 @@ class InvalidPasswordException(AuthException):
         super().__init__(
             detail=message,
             status_code=status.HTTP_400_BAD_REQUEST
-        ) 
\ No newline at end of file
+        ) 
+class HashingBusyException(AuthException):
+    def __init__(self):
+        super().__init__(
+            detail="El servidor está ocupado. Por favor, intente nuevamente en unos segundos",
+            status_code=status.HTTP_503_SERVICE_UNAVAILABLE
+        )
+        self.headers = {"Retry-After": "1"}
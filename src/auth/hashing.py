@@ -0,0 +1,242 @@
+import asyncio
+import logging
+import multiprocessing
+import os
+import threading
+import time
+from bisect import bisect_left
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from typing import Optional
+
+from passlib.context import CryptContext
+
+from src.auth import exceptions
+from src.config import get_settings
+
+settings = get_settings()
+logger = logging.getLogger(__name__)
+
+
+def build_crypt_context() -> CryptContext:
+    """
+    El primer esquema es el que se usa para hashes nuevos; el resto solo se verifica y
+    queda marcado como obsoleto, igual que los hashes con un coste distinto al configurado.
+    """
+    if settings.PASSWORD_HASH_SCHEME == "argon2":
+        # Requiere argon2-cffi; los hashes bcrypt existentes se migran al iniciar sesión
+        return CryptContext(
+            schemes=["argon2", "bcrypt"],
+            deprecated="auto",
+            argon2__type="ID",
+            argon2__time_cost=settings.ARGON2_TIME_COST,
+            argon2__memory_cost=settings.ARGON2_MEMORY_COST,
+            argon2__parallelism=settings.ARGON2_PARALLELISM,
+            bcrypt__rounds=settings.BCRYPT_ROUNDS,
+        )
+    return CryptContext(schemes=["bcrypt"], deprecated="auto", bcrypt__rounds=settings.BCRYPT_ROUNDS)
+
+
+pwd_context = build_crypt_context()
+
+# Límites superiores (ms) de los buckets de espera en cola y de ejecución
+LATENCY_BUCKETS_MS = (1, 5, 10, 25, 50, 100, 250, 500, 1000, 5000)
+
+
+def _timed(func, *args):
+    # Se ejecuta en el proceso hijo: devuelve el resultado y lo que tardó solo el cálculo
+    start = time.perf_counter()
+    result = func(*args)
+    return result, time.perf_counter() - start
+
+
+def _hash(password: str) -> str:
+    return pwd_context.hash(password)
+
+
+def _verify(plain_password: str, hashed_password: str) -> bool:
+    return pwd_context.verify(plain_password, hashed_password)
+
+
+def _verify_and_update(plain_password: str, hashed_password: str) -> tuple[bool, Optional[str]]:
+    return pwd_context.verify_and_update(plain_password, hashed_password)
+
+
+class _Latency:
+    def __init__(self):
+        self.buckets = [0] * (len(LATENCY_BUCKETS_MS) + 1)
+        self.count = 0
+        self.total_ms = 0.0
+        self.max_ms = 0.0
+
+    def record(self, seconds: float) -> None:
+        ms = seconds * 1000
+        self.buckets[bisect_left(LATENCY_BUCKETS_MS, ms)] += 1
+        self.count += 1
+        self.total_ms += ms
+        self.max_ms = max(self.max_ms, ms)
+
+    def snapshot(self) -> dict:
+        labels = [f"<={limit}ms" for limit in LATENCY_BUCKETS_MS] + [f">{LATENCY_BUCKETS_MS[-1]}ms"]
+        return {
+            "count": self.count,
+            "avg_ms": round(self.total_ms / self.count, 2) if self.count else 0.0,
+            "max_ms": round(self.max_ms, 2),
+            "histogram": dict(zip(labels, self.buckets)),
+        }
+
+
+class PasswordHasher:
+    """
+    Ejecuta el hashing de contraseñas en un pool de procesos propio para no bloquear el event loop.
+    La cola está acotada: si hay demasiadas operaciones pendientes se rechaza al
+    momento con 503 en lugar de acumular latencia para todas las peticiones.
+    """
+
+    def __init__(self, workers: Optional[int], max_pending: int):
+        self.workers = workers or os.cpu_count() or 1
+        self.max_pending = max_pending
+        self._lock = threading.Lock()
+        self._executor: Optional[ProcessPoolExecutor] = None
+        self._closed = False
+        self.pending = 0
+        self.reset()
+
+    def reset(self) -> None:
+        with self._lock:
+            self.peak_pending = self.pending
+            self.completed = 0
+            self.rejected = 0
+            self.wait = _Latency()
+            self.run_time = _Latency()
+
+    def start(self) -> None:
+        with self._lock:
+            self._closed = False
+            self._ensure_executor()
+
+    def _ensure_executor(self) -> ProcessPoolExecutor:
+        # Con self._lock tomado
+        if self._executor is None:
+            # spawn: el proceso de la app ya tiene hilos (pool de conexiones, logging)
+            self._executor = ProcessPoolExecutor(
+                max_workers=self.workers,
+                mp_context=multiprocessing.get_context("spawn"),
+            )
+        return self._executor
+
+    def _get_executor(self) -> ProcessPoolExecutor:
+        """
+        Pool para la siguiente operación; se recrea si se rompió. Tras shutdown() se rechaza:
+        nunca se calcula un hash fuera del pool de procesos.
+        """
+        with self._lock:
+            if self._closed:
+                raise exceptions.HashingBusyException()
+            return self._ensure_executor()
+
+    def _discard(self, executor: ProcessPoolExecutor) -> None:
+        # Solo si sigue siendo el actual: otra petición puede haberlo recreado ya
+        with self._lock:
+            if self._executor is executor:
+                self._executor = None
+        executor.shutdown(wait=False, cancel_futures=True)
+
+    def shutdown(self) -> None:
+        with self._lock:
+            self._closed = True
+            executor, self._executor = self._executor, None
+        if executor is not None:
+            executor.shutdown(wait=False, cancel_futures=True)
+
+    def _acquire(self) -> None:
+        with self._lock:
+            if self.pending >= self.max_pending:
+                self.rejected += 1
+                raise exceptions.HashingBusyException()
+            self.pending += 1
+            self.peak_pending = max(self.peak_pending, self.pending)
+
+    def _release(self, total: float, run: Optional[float]) -> None:
+        with self._lock:
+            self.pending -= 1
+            if run is not None:
+                self.completed += 1
+                self.run_time.record(run)
+                self.wait.record(max(total - run, 0.0))
+
+    async def _submit(self, func, *args):
+        self._acquire()
+        start = time.perf_counter()
+        run = None
+        try:
+            executor = self._get_executor()
+            try:
+                future = asyncio.get_running_loop().run_in_executor(executor, _timed, func, *args)
+            except RuntimeError:
+                # El pool se cerró entre _get_executor y el envío (shutdown de la app)
+                raise exceptions.HashingBusyException()
+            try:
+                result, run = await future
+            except asyncio.CancelledError:
+                # La cancela shutdown() (cancel_futures), no la propia petición: 503 como el resto
+                if asyncio.current_task().cancelling():
+                    raise
+                raise exceptions.HashingBusyException()
+            return result
+        except BrokenProcessPool:
+            # Un proceso hijo murió (p. ej. OOM): se recrea el pool para las siguientes peticiones
+            logger.error("El pool de hashing se rompió; se vuelve a crear")
+            self._discard(executor)
+            raise exceptions.HashingBusyException()
+        finally:
+            self._release(time.perf_counter() - start, run)
+
+    async def hash(self, password: str) -> str:
+        return await self._submit(_hash, password)
+
+    async def verify(self, plain_password: str, hashed_password: str) -> bool:
+        return await self._submit(_verify, plain_password, hashed_password)
+
+    async def verify_and_update(self, plain_password: str, hashed_password: str) -> tuple[bool, Optional[str]]:
+        """
+        Verifica y, si el hash usa un esquema o coste obsoleto, devuelve también el hash
+        nuevo calculado en la misma operación (None si no hace falta actualizarlo).
+        """
+        return await self._submit(_verify_and_update, plain_password, hashed_password)
+
+    async def verify_any(self, plain_password: str, hashed_passwords: list[str]) -> bool:
+        """
+        Comprueba la contraseña contra varios hashes en paralelo y devuelve True con la
+        primera coincidencia, cancelando las verificaciones que aún no han empezado.
+        """
+        if not hashed_passwords:
+            return False
+        tasks = [asyncio.ensure_future(self.verify(plain_password, hashed)) for hashed in hashed_passwords]
+        try:
+            for next_done in asyncio.as_completed(tasks):
+                if await next_done:
+                    return True
+            return False
+        finally:
+            for task in tasks:
+                task.cancel()
+
+    def snapshot(self) -> dict:
+        with self._lock:
+            return {
+                "workers": self.workers,
+                "max_pending": self.max_pending,
+                "pending": self.pending,
+                "peak_pending": self.peak_pending,
+                "completed": self.completed,
+                "rejected": self.rejected,
+                "wait": self.wait.snapshot(),
+                "run": self.run_time.snapshot(),
+            }
+
+
+password_hasher = PasswordHasher(
+    workers=settings.PASSWORD_HASH_WORKERS,
+    max_pending=settings.PASSWORD_HASH_MAX_PENDING,
+)
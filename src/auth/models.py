@@ -2,18 +2,23 @@ import uuid
 from datetime import datetime
 from uuid import UUID
 
-from sqlalchemy import Boolean, Column, DateTime, ForeignKey, String, Integer
+from sqlalchemy import Boolean, Column, DateTime, ForeignKey, String, Integer, Index, Text, text
 from sqlalchemy.orm import relationship
-from sqlalchemy.dialects.postgresql import UUID as PGUUID
+from sqlalchemy.dialects.postgresql import JSONB, UUID as PGUUID
 from sqlalchemy import func
 
 from src.database import Base
+from src.utils import uuid7
 
 
 class User(Base):
     __tablename__ = "users"
+    __table_args__ = (
+        # Listado paginado de usuarios (GET /auth/users)
+        Index("ix_users_created_at_id", "created_at", "id"),
+    )
 
-    id = Column(PGUUID(as_uuid=True), primary_key=True, index=True, default=uuid.uuid4)
+    id = Column(PGUUID(as_uuid=True), primary_key=True, default=uuid7)
     email = Column(String, unique=True, index=True, nullable=False)
     full_name = Column(String, nullable=False)
     phone_number = Column(String, unique=True, index=True, nullable=False)
@@ -34,13 +39,20 @@ class User(Base):
     failed_login_attempts = Column(Integer, server_default='0', nullable=False)
     locked_until = Column(DateTime(timezone=True), nullable=True)
 
+    # Se incrementa al pedir o usar un enlace de restablecimiento: invalida los enlaces anteriores
+    token_version = Column(Integer, default=0, server_default='0', nullable=False)
+
     password_history = relationship("PasswordHistory", back_populates="user", cascade="all, delete-orphan")
 
 
 class PasswordHistory(Base):
     __tablename__ = "password_history"
+    __table_args__ = (
+        # Últimas N contraseñas de un usuario (ORDER BY created_at DESC LIMIT N)
+        Index("ix_password_history_user_id_created_at", "user_id", "created_at"),
+    )
 
-    id = Column(PGUUID(as_uuid=True), primary_key=True, index=True, default=uuid.uuid4)
+    id = Column(PGUUID(as_uuid=True), primary_key=True, default=uuid7)
     user_id = Column(PGUUID(as_uuid=True), ForeignKey("users.id", ondelete="CASCADE"), nullable=False)
     hashed_password = Column(String, nullable=False)
     created_at = Column(DateTime(timezone=True), server_default=func.now(), nullable=False)
@@ -48,11 +60,29 @@ class PasswordHistory(Base):
     user = relationship("User", back_populates="password_history")
 
 
-class UsedToken(Base):
-    __tablename__ = "used_tokens"
-    
-    id = Column(PGUUID(as_uuid=True), primary_key=True, index=True, default=uuid.uuid4)
-    token_hash = Column(String, unique=True, index=True, nullable=False)
-    token_type = Column(String, nullable=False)
-    user_id = Column(PGUUID(as_uuid=True), ForeignKey("users.id", ondelete="CASCADE"), nullable=False)
-    used_at = Column(DateTime(timezone=True), server_default=func.now(), nullable=False)
+class EmailOutbox(Base):
+    """
+    Emails pendientes de enviar. Se insertan en la misma transacción que el cambio que los
+    provoca y los envía en segundo plano src/auth/outbox.py, con reintentos.
+    """
+    __tablename__ = "email_outbox"
+    __table_args__ = (
+        # Cola de envío: solo las filas pendientes, por orden de próximo intento
+        Index(
+            "ix_email_outbox_pending_next_attempt_at",
+            "next_attempt_at",
+            postgresql_where=text("status = 'pending'"),
+        ),
+    )
+
+    id = Column(PGUUID(as_uuid=True), primary_key=True, default=uuid7)
+    kind = Column(String, nullable=False)  # Plantilla: "welcome", "password_reset", ...
+    to_email = Column(String, nullable=False)
+    payload = Column(JSONB, nullable=False, default=dict)  # Variables de la plantilla
+    status = Column(String, nullable=False, default="pending", server_default="pending")  # pending | sent | dead
+    attempts = Column(Integer, nullable=False, default=0, server_default="0")
+    next_attempt_at = Column(DateTime(timezone=True), server_default=func.now(), nullable=False)
+    expires_at = Column(DateTime(timezone=True), nullable=True)  # Pasado este momento ya no tiene sentido enviarlo
+    last_error = Column(Text, nullable=True)
+    created_at = Column(DateTime(timezone=True), server_default=func.now(), nullable=False)
+    sent_at = Column(DateTime(timezone=True), nullable=True)
@@ -0,0 +1,218 @@
+"""
+Outbox de emails.
+
+Las rutas no envían emails: insertan una fila en email_outbox dentro de la misma
+transacción que el cambio que los provoca (registro, solicitud de restablecimiento) y
+responden en cuanto se hace el commit. Si la transacción se deshace, el email no existe.
+
+El worker (EmailOutboxWorker.run, lanzado desde el lifespan de la app) reclama lotes de
+filas pendientes con FOR UPDATE SKIP LOCKED, así que varios workers o procesos pueden
+vaciar la cola a la vez sin enviar dos veces el mismo email. Al reclamar una fila se
+aplaza su next_attempt_at durante EMAIL_OUTBOX_LEASE_SECONDS: si el proceso muere a mitad
+de envío, la fila vuelve a la cola cuando vence ese plazo (entrega al menos una vez).
+
+Los fallos se reintentan con backoff exponencial con jitter; tras EMAIL_OUTBOX_MAX_ATTEMPTS
+intentos, o si el email caduca antes de poder enviarse (enlaces de restablecimiento), la
+fila pasa a "dead". Una fila "dead" se puede reencolar poniendo status = 'pending'.
+"""
+import asyncio
+import logging
+import random
+import threading
+from datetime import datetime, timedelta, timezone
+from typing import Optional
+
+from sqlalchemy import event, func, select, update
+from sqlalchemy.engine import Row
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from src.auth import models
+from src.auth.emails import email_service
+from src.config import get_settings
+from src.database import RoutingSession, async_engine
+
+settings = get_settings()
+logger = logging.getLogger(__name__)
+
+_outbox = models.EmailOutbox.__table__
+
+
+def enqueue_email(
+    db: AsyncSession,
+    kind: str,
+    to_email: str,
+    payload: dict,
+    expires_at: Optional[datetime] = None,
+) -> models.EmailOutbox:
+    """Añade el email a la transacción actual; se envía cuando esta hace commit."""
+    message = models.EmailOutbox(kind=kind, to_email=to_email, payload=payload, expires_at=expires_at)
+    db.add(message)
+    db.info["email_outbox_enqueued"] = True
+    return message
+
+
+def enqueue_welcome_email(db: AsyncSession, to_email: str, username: str) -> models.EmailOutbox:
+    return enqueue_email(db, "welcome", to_email, {"username": username})
+
+
+def enqueue_password_reset_email(db: AsyncSession, to_email: str, reset_token: str) -> models.EmailOutbox:
+    # Un enlace caducado no sirve de nada: si no se ha podido enviar antes, se descarta
+    expires_at = datetime.now(timezone.utc) + timedelta(minutes=settings.PASSWORD_RESET_TOKEN_EXPIRE_MINUTES)
+    return enqueue_email(db, "password_reset", to_email, {"reset_token": reset_token}, expires_at=expires_at)
+
+
+def backoff_seconds(attempts: int) -> float:
+    """Espera antes del siguiente intento: base * 2^(n-1), con tope y jitter del 50 %."""
+    delay = min(
+        settings.EMAIL_OUTBOX_BACKOFF_BASE_SECONDS * 2 ** max(attempts - 1, 0),
+        settings.EMAIL_OUTBOX_BACKOFF_MAX_SECONDS,
+    )
+    return delay * random.uniform(0.5, 1.0)
+
+
+class EmailOutboxWorker:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._wakeup = asyncio.Event()
+        self.reset()
+
+    def reset(self) -> None:
+        with self._lock:
+            self.stats = {"claimed": 0, "sent": 0, "retried": 0, "dead": 0, "errors": 0}
+            self.last_error: Optional[str] = None
+
+    def _record(self, outcome: str, error: Optional[str] = None) -> None:
+        with self._lock:
+            self.stats[outcome] += 1
+            if error is not None:
+                self.last_error = error
+
+    def wake(self) -> None:
+        """Adelanta la siguiente pasada (llamado tras el commit que encola un email)."""
+        self._wakeup.set()
+
+    async def _claim(self) -> list[Row]:
+        due = (
+            select(_outbox.c.id)
+            .where(_outbox.c.status == "pending", _outbox.c.next_attempt_at <= func.now())
+            .order_by(_outbox.c.next_attempt_at)
+            .limit(settings.EMAIL_OUTBOX_BATCH_SIZE)
+            .with_for_update(skip_locked=True)
+        )
+        async with async_engine.begin() as conn:
+            result = await conn.execute(
+                update(_outbox)
+                .where(_outbox.c.id.in_(due.scalar_subquery()))
+                .values(
+                    attempts=_outbox.c.attempts + 1,
+                    next_attempt_at=func.now() + timedelta(seconds=settings.EMAIL_OUTBOX_LEASE_SECONDS),
+                )
+                .returning(
+                    _outbox.c.id, _outbox.c.kind, _outbox.c.to_email, _outbox.c.payload,
+                    _outbox.c.attempts, _outbox.c.expires_at,
+                )
+            )
+            return result.all()
+
+    async def _finish(self, row: Row, **values) -> None:
+        # attempts hace de testigo: si el plazo venció y otro worker reclamó la fila, no se pisa su resultado
+        async with async_engine.begin() as conn:
+            await conn.execute(
+                update(_outbox)
+                .where(_outbox.c.id == row.id, _outbox.c.attempts == row.attempts)
+                .values(**values)
+            )
+
+    async def _dead(self, row: Row, error: str) -> None:
+        values = {"status": "dead", "last_error": error}
+        if row.expires_at is not None:
+            # Los emails con caducidad llevan tokens: no se guardan una vez descartados
+            values["payload"] = {}
+        await self._finish(row, **values)
+        self._record("dead", error)
+        logger.warning(f"Email {row.id} ({row.kind}) descartado tras {row.attempts} intentos: {error}")
+
+    async def _deliver(self, row: Row) -> None:
+        if row.expires_at is not None and row.expires_at <= datetime.now(timezone.utc):
+            await self._dead(row, "Caducado antes de poder enviarse")
+            return
+        try:
+            subject, html_content = email_service.render(row.kind, row.payload)
+        except Exception as e:
+            # Un error de plantilla no se arregla reintentando
+            await self._dead(row, f"Error al generar el email: {type(e).__name__}: {e}")
+            return
+        try:
+            await asyncio.wait_for(
+                email_service.send(row.to_email, subject, html_content),
+                timeout=settings.EMAIL_OUTBOX_SEND_TIMEOUT_SECONDS,
+            )
+        except Exception as e:
+            error = f"{type(e).__name__}: {e}"[:1000]
+            if row.attempts >= settings.EMAIL_OUTBOX_MAX_ATTEMPTS:
+                await self._dead(row, error)
+                return
+            await self._finish(
+                row,
+                last_error=error,
+                next_attempt_at=datetime.now(timezone.utc) + timedelta(seconds=backoff_seconds(row.attempts)),
+            )
+            self._record("retried", error)
+            return
+        await self._finish(row, status="sent", sent_at=func.now(), payload={}, last_error=None)
+        self._record("sent")
+
+    async def drain_once(self) -> int:
+        """Reclama y procesa un lote; devuelve cuántas filas se reclamaron."""
+        rows = await self._claim()
+        if not rows:
+            return 0
+        with self._lock:
+            self.stats["claimed"] += len(rows)
+        semaphore = asyncio.Semaphore(settings.EMAIL_OUTBOX_CONCURRENCY)
+
+        async def deliver(row: Row) -> None:
+            async with semaphore:
+                await self._deliver(row)
+
+        results = await asyncio.gather(*(deliver(row) for row in rows), return_exceptions=True)
+        for result in results:
+            if isinstance(result, Exception):
+                # Fallo al actualizar la fila: vuelve a la cola cuando vence el plazo
+                logger.error(f"Error al actualizar el outbox de emails: {result}")
+                self._record("errors", str(result))
+        return len(rows)
+
+    async def run(self) -> None:
+        """Tarea de fondo de la app: vacía la cola y espera a un commit con emails o al siguiente sondeo."""
+        while True:
+            self._wakeup.clear()
+            try:
+                claimed = await self.drain_once()
+            except Exception:
+                logger.exception("Error en el worker del outbox de emails")
+                claimed = 0
+            if claimed >= settings.EMAIL_OUTBOX_BATCH_SIZE:
+                continue
+            try:
+                await asyncio.wait_for(self._wakeup.wait(), timeout=settings.EMAIL_OUTBOX_POLL_SECONDS)
+            except asyncio.TimeoutError:
+                pass
+
+    def snapshot(self) -> dict:
+        with self._lock:
+            return {**self.stats, "last_error": self.last_error}
+
+
+email_outbox = EmailOutboxWorker()
+
+
+@event.listens_for(RoutingSession, "after_commit")
+def _wake_after_commit(session) -> None:
+    if session.info.pop("email_outbox_enqueued", False):
+        email_outbox.wake()
+
+
+@event.listens_for(RoutingSession, "after_rollback")
+def _forget_after_rollback(session) -> None:
+    session.info.pop("email_outbox_enqueued", None)
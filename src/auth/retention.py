@@ -0,0 +1,101 @@
+"""
+Retención de password_history y email_outbox.
+
+Del historial de contraseñas se conservan las PASSWORD_HISTORY_SIZE más recientes por
+usuario. Del outbox de emails se borran las filas enviadas o descartadas hace más de
+EMAIL_OUTBOX_RETENTION_DAYS; las pendientes no se tocan.
+
+Uso:
+    python -m src.auth.retention              # una pasada del job
+"""
+import asyncio
+import logging
+from datetime import datetime, timedelta, timezone
+from typing import Optional
+
+from sqlalchemy import delete, func, select, text
+from sqlalchemy.ext.asyncio import AsyncConnection
+
+from src.auth import models
+from src.config import get_settings
+from src.database import async_engine
+
+settings = get_settings()
+logger = logging.getLogger(__name__)
+
+# Clave del advisory lock que evita que varios workers ejecuten el job a la vez
+RETENTION_LOCK_KEY = 0x5E7E_4710
+# update_user compara con las últimas 3 contraseñas: nunca recortar por debajo
+MIN_PASSWORD_HISTORY = 3
+
+
+async def _try_lock(conn: AsyncConnection) -> bool:
+    # Lock de transacción: funciona también detrás de PgBouncer en modo transacción
+    return await conn.scalar(text("SELECT pg_try_advisory_xact_lock(:key)"), {"key": RETENTION_LOCK_KEY})
+
+
+async def _trim_password_history(conn: AsyncConnection, keep: int, batch_size: int) -> Optional[int]:
+    ranked = select(
+        models.PasswordHistory.id,
+        func.row_number().over(
+            partition_by=models.PasswordHistory.user_id,
+            order_by=models.PasswordHistory.created_at.desc(),
+        ).label("recency"),
+    ).subquery()
+    surplus = select(ranked.c.id).where(ranked.c.recency > keep).limit(batch_size)
+    total = 0
+    while True:
+        async with conn.begin():
+            if not await _try_lock(conn):
+                return None
+            result = await conn.execute(delete(models.PasswordHistory).where(models.PasswordHistory.id.in_(surplus)))
+        total += result.rowcount
+        if result.rowcount < batch_size:
+            return total
+
+
+async def _purge_email_outbox(conn: AsyncConnection, cutoff: datetime, batch_size: int) -> Optional[int]:
+    finished = (
+        select(models.EmailOutbox.id)
+        .where(models.EmailOutbox.status.in_(("sent", "dead")), models.EmailOutbox.created_at < cutoff)
+        .limit(batch_size)
+    )
+    total = 0
+    while True:
+        async with conn.begin():
+            if not await _try_lock(conn):
+                return None
+            result = await conn.execute(delete(models.EmailOutbox).where(models.EmailOutbox.id.in_(finished)))
+        total += result.rowcount
+        if result.rowcount < batch_size:
+            return total
+
+
+async def run_retention() -> None:
+    """Una pasada completa del job. Si otro worker la está ejecutando, no hace nada."""
+    keep = max(settings.PASSWORD_HISTORY_SIZE, MIN_PASSWORD_HISTORY)
+    async with async_engine.connect() as conn:
+        history = await _trim_password_history(conn, keep, settings.RETENTION_BATCH_SIZE)
+        if history is None:
+            logger.info("Retención en curso en otro worker; se omite esta pasada")
+            return
+        outbox_cutoff = datetime.now(timezone.utc) - timedelta(days=settings.EMAIL_OUTBOX_RETENTION_DAYS)
+        emails = await _purge_email_outbox(conn, outbox_cutoff, settings.RETENTION_BATCH_SIZE)
+    logger.info(
+        f"Retención: {history} filas de password_history recortadas, {emails or 0} emails del outbox borrados"
+    )
+
+
+async def retention_loop() -> None:
+    """Tarea de fondo de la app: una pasada cada RETENTION_INTERVAL_MINUTES."""
+    while True:
+        await asyncio.sleep(settings.RETENTION_INTERVAL_MINUTES * 60)
+        try:
+            await run_retention()
+        except Exception:
+            logger.exception("Error en el job de retención")
+
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO)
+    asyncio.run(run_retention())
@@ -1,18 +1,23 @@
 import hashlib
 from datetime import timedelta, datetime, timezone
 from pathlib import Path
+from typing import Optional
 
 from fastapi import APIRouter, Depends, HTTPException, Request, status, Form
 from fastapi.responses import HTMLResponse, JSONResponse, RedirectResponse
 from fastapi.security import HTTPBearer
 from fastapi.templating import Jinja2Templates
 from jose import jwt
-from sqlalchemy.orm import Session
+from sqlalchemy.ext.asyncio import AsyncSession
 
 from src.auth import service, schemas, models
-from src.auth.service import email_service, get_password_hash
+from src.auth.outbox import enqueue_password_reset_email
+from src.auth.service import get_password_hash
+from src.auth.tokens import decode_token
 from src.config import get_settings
-from src.database import get_db
+from src.database import get_async_db, get_read_db
+from src.pagination import CursorParams
+from src.rate_limit import rate_limiter
 from src.validators.password import validate_password
 
 router = APIRouter(prefix="/auth", tags=["auth"])
@@ -33,7 +38,12 @@ settings = get_settings()
             },
             status_code=status.HTTP_201_CREATED,
             summary="Registrar nuevo usuario")
-async def register_user(user: schemas.UserCreate, db: Session = Depends(get_db)) -> dict:
+async def register_user(
+        request: Request,
+        user: schemas.UserCreate,
+        db: AsyncSession = Depends(get_async_db)
+) -> dict:
+    await rate_limiter.check("register", request, email=user.email)
     created_user = await service.create_user(db=db, user=user)
     return {
         "status_code": 201,
@@ -52,16 +62,18 @@ async def register_user(user: schemas.UserCreate, db: Session = Depends(get_db))
                 422: {"description": "Error de validación", "model": schemas.ValidationError}
             },
             summary="Iniciar sesión")
-def login_for_access_token(
+async def login_for_access_token(
+        request: Request,
         login_data: schemas.LoginRequest,
-        db: Session = Depends(get_db)
+        db: AsyncSession = Depends(get_async_db)
 ) -> dict:
+    await rate_limiter.check("login", request, email=login_data.email)
     if not login_data.email or not login_data.password:
         raise HTTPException(
             status_code=400,
             detail="El email y la contraseña son requeridos"
         )
-    user = service.authenticate_user(db, login_data.email, login_data.password)
+    user = await service.authenticate_user(db, login_data.email, login_data.password)
     if not user:
         raise HTTPException(
             status_code=400,
@@ -97,9 +109,9 @@ def login_for_access_token(
                 422: {"description": "Error de validación", "model": schemas.ValidationError}
             },
             summary="Refrescar token de acceso")
-def refresh_token(
+async def refresh_token(
         refresh_token: str = Form(..., description="Token de refresco"),
-        db: Session = Depends(get_db)
+        db: AsyncSession = Depends(get_async_db)
 ) -> dict:
     # Validar que se proporcionó el token
     if not refresh_token:
@@ -113,11 +125,7 @@ def refresh_token(
         )
     # Decodificar y validar el token
     try:
-        payload = jwt.decode(
-            refresh_token,
-            settings.SECRET_KEY, 
-            algorithms=[settings.ALGORITHM]
-        )
+        payload = decode_token(refresh_token)
         user_id = payload.get("sub")
         token_type = payload.get("type")
         if not user_id or token_type != "refresh":
@@ -148,7 +156,7 @@ def refresh_token(
             }
         )
     # Verificar que el usuario existe
-    user = db.query(models.User).filter(models.User.id == user_id).first()
+    user = await service.get_user_by_id(db, user_id)
     if not user:
         return JSONResponse(
             status_code=401,
@@ -188,10 +196,11 @@ def refresh_token(
 async def request_password_reset(
         request: Request,
         reset_request: schemas.PasswordResetRequest,
-        db: Session = Depends(get_db)
+        db: AsyncSession = Depends(get_async_db)
 ) -> dict:
+    await rate_limiter.check("password_reset", request, email=reset_request.email)
     # Verificar si el usuario existe
-    user = db.query(models.User).filter(models.User.email == reset_request.email).first()
+    user = await service.get_user_by_email(db, reset_request.email)
     if not user:
         return {
             "status_code": 200,
@@ -210,21 +219,15 @@ async def request_password_reset(
         # Resetear contadores si ya pasó el tiempo de bloqueo
         user.reset_attempts = 0
         user.reset_lockout_until = None
-    # Generar y enviar token
+    # Invalidar los enlaces anteriores, generar el token y encolar el email
+    # (se envía en segundo plano cuando la transacción hace commit)
+    await service.invalidate_previous_tokens(db, user)
     token = await service.create_password_reset_token(user)
-    try:
-        await email_service.send_password_reset_email(user.email, token)
-    except Exception as e:
-        print(f"Error al enviar email: {str(e)}")
-        raise HTTPException(
-            status_code=500,
-            detail="Error al enviar el email de restablecimiento"
-        )
+    enqueue_password_reset_email(db, user.email, token)
     # Incrementar contador de intentos
     user.reset_attempts = (user.reset_attempts or 0) + 1
     if user.reset_attempts >= 3:
         user.reset_lockout_until = datetime.now(timezone.utc) + timedelta(minutes=15)
-    db.commit()
     return {
         "status_code": 200,
         "message": "Solicitud de restablecimiento enviada",
@@ -245,11 +248,11 @@ async def request_password_reset(
 async def get_password_reset_form(
         request: Request,
         token: str,
-        db: Session = Depends(get_db)
+        db: AsyncSession = Depends(get_async_db)
 ) -> HTMLResponse:
     try:
         # Validar el token de restablecimiento
-        token_data = service.validate_password_reset_form_token(token=token, db=db)
+        token_data = await service.validate_password_reset_form_token(token=token, db=db)
 
         # Si el token es válido, mostrar el formulario
         return templates.TemplateResponse(
@@ -294,11 +297,11 @@ async def get_password_reset_form(
 async def reset_password(
         token: str = Form(...),
         new_password: str = Form(...),
-        db: Session = Depends(get_db)
+        db: AsyncSession = Depends(get_async_db)
 ) -> RedirectResponse:
     try:
         # Validar el token y restablecer la contraseña
-        service.reset_password(token=token, new_password=new_password, db=db)
+        await service.reset_password(token=token, new_password=new_password, db=db)
 
         # Si todo es exitoso, redirigir a la página de éxito
         return RedirectResponse(url="/auth/password-reset-success", status_code=status.HTTP_303_SEE_OTHER)
@@ -331,7 +334,7 @@ async def password_reset_expired(request: Request):
                 422: {"description": "Error de validación", "model": schemas.ValidationError}
             },
             summary="Obtener datos del usuario actual")
-async def get_me(current_user: models.User = Depends(service.get_current_user)) -> dict:
+async def get_me(current_user: schemas.User = Depends(service.get_current_user)) -> dict:
     return {
         "status_code": 200,
         "message": "Datos del usuario obtenidos exitosamente",
@@ -349,6 +352,30 @@ async def get_me(current_user: models.User = Depends(service.get_current_user))
     }
 
 
+@router.get("/users",
+            response_model=schemas.UserListResponse,
+            responses={
+                200: {"description": "Página de usuarios"},
+                400: {"model": schemas.ErrorResponse, "description": "Cursor inválido"},
+                401: {"model": schemas.ErrorResponse, "description": "No autorizado"},
+                403: {"model": schemas.ErrorResponse, "description": "Solo administradores"}
+            },
+            summary="Listar usuarios (administración)")
+async def list_users(
+        page: CursorParams = Depends(),
+        is_active: Optional[bool] = None,
+        current_user: schemas.User = Depends(service.get_current_user),
+        db: AsyncSession = Depends(get_read_db)
+) -> dict:
+    if not current_user.is_superuser:
+        raise HTTPException(status_code=403, detail="No autorizado")
+    return {
+        "status_code": 200,
+        "message": "Usuarios obtenidos exitosamente",
+        "data": await service.get_users_page(db, page, is_active)
+    }
+
+
 @router.put("/me", 
             response_model=schemas.UserUpdateResponse,
             responses={
@@ -358,12 +385,12 @@ async def get_me(current_user: models.User = Depends(service.get_current_user))
                 404: {"model": schemas.ErrorResponse, "description": "Usuario no encontrado"}
             },
             summary="Actualizar perfil de usuario")
-def update_user_me(
+async def update_user_me(
         user_update: schemas.UserUpdate,
         current_user: schemas.User = Depends(service.get_current_user),
-        db: Session = Depends(get_db)
+        db: AsyncSession = Depends(get_async_db)
 ) -> dict:
-    updated_user = service.update_user(
+    updated_user = await service.update_user(
         db=db,
         user_id=current_user.id,
         user_update=user_update,
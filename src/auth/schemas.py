@@ -4,6 +4,7 @@ from uuid import UUID
 
 from pydantic import BaseModel, EmailStr, constr, field_validator, ConfigDict, Field
 
+from src.pagination import CursorPage
 from src.validators.password import validate_password
 
 
@@ -113,6 +114,13 @@ class UserResponse(SuccessResponse):
     data: User
 
 
+UserPage = CursorPage[User]
+
+
+class UserListResponse(SuccessResponse):
+    data: UserPage
+
+
 class PasswordResetRequestResponse(SuccessResponse):
     pass
 
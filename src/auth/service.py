@@ -1,39 +1,48 @@
-import hashlib
 from datetime import datetime, timedelta, timezone
 from typing import Optional
 from uuid import UUID
-from sqlalchemy.orm import Session
-from sqlalchemy.exc import SQLAlchemyError
-from sqlalchemy import or_
-import secrets
-import hmac
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.dialects.postgresql import UUID as PGUUID
+from sqlalchemy.exc import IntegrityError, SQLAlchemyError
+from sqlalchemy import insert, lambda_stmt, literal, or_, select, update
+from sqlalchemy.orm.attributes import set_committed_value
 
 from fastapi import Depends, HTTPException, status
 from fastapi.security import HTTPBearer, HTTPAuthorizationCredentials
 from jose import jwt
-from passlib.context import CryptContext
 
-from src.auth import models, schemas, emails, exceptions, utils
+from src.auth import models, schemas, exceptions, utils
+from src.auth.cache import invalidate_user, to_current_user, user_cache
+from src.auth.hashing import password_hasher
+from src.auth.outbox import enqueue_password_reset_email, enqueue_welcome_email
+from src.auth.tokens import decode_token, decode_token_cached
 from src.config import get_settings
-from src.database import get_db
+from src.counters import counter_store
+from src.database import commit_now, get_async_db
+from src.pagination import CursorPage, CursorParams, SortKey, paginate
+from src.utils import uuid7
 from src.validators.password import validate_password
 
 settings = get_settings()
-pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
-email_service = emails.EmailService()
 security = HTTPBearer()
 
 MAX_RESET_ATTEMPTS = 4
 BASE_LOCKOUT_MINUTES = 5
 MAX_LOCKOUT_MINUTES = 60
 
+# Índices únicos de users -> mensaje del 409 correspondiente
+USER_UNIQUE_VIOLATIONS = {
+    "ix_users_email": "El email ya está registrado por otro usuario",
+    "ix_users_phone_number": "El número de celular ya está registrado por otro usuario",
+}
 
-def verify_password(plain_password: str, hashed_password: str) -> bool:
-    return pwd_context.verify(plain_password, hashed_password)
 
+async def verify_password(plain_password: str, hashed_password: str) -> bool:
+    return await password_hasher.verify(plain_password, hashed_password)
 
-def get_password_hash(password: str) -> str:
-    return pwd_context.hash(password)
+
+async def get_password_hash(password: str) -> str:
+    return await password_hasher.hash(password)
 
 
 def create_access_token(data: dict, expires_delta: Optional[timedelta] = None) -> str:
@@ -57,7 +66,8 @@ def create_refresh_token(data: dict) -> str:
 
 async def create_password_reset_token(data: dict | models.User) -> str:
     if isinstance(data, models.User):
-        to_encode = {"sub": str(data.id)}
+        # "ver" ata el enlace a la versión actual: invalidarlo es incrementar token_version
+        to_encode = {"sub": str(data.id), "ver": data.token_version}
     else:
         to_encode = data.copy()
     expire = utils.get_future_datetime(minutes=settings.PASSWORD_RESET_TOKEN_EXPIRE_MINUTES)
@@ -66,18 +76,60 @@ async def create_password_reset_token(data: dict | models.User) -> str:
     return encoded_jwt
 
 
-def authenticate_user(db: Session, email: str, password: str) -> models.User:
+# Las búsquedas más frecuentes usan lambda_stmt: la construcción del SELECT y su
+# compilación se cachean por código fuente y solo cambian los parámetros.
+async def get_user_by_id(db: AsyncSession, user_id: UUID | str) -> Optional[models.User]:
+    result = await db.execute(lambda_stmt(lambda: select(models.User).where(models.User.id == user_id)))
+    return result.scalars().first()
+
+
+async def get_users_page(db: AsyncSession, params: CursorParams, is_active: Optional[bool] = None) -> CursorPage:
+    """Usuarios del más reciente al más antiguo (índice created_at, id), para administración."""
+    stmt = select(models.User)
+    if is_active is not None:
+        stmt = stmt.where(models.User.is_active == is_active)
+    return await paginate(db, stmt, [SortKey(models.User.created_at, True)], models.User.id, params)
+
+
+async def get_user_by_email(db: AsyncSession, email: str) -> Optional[models.User]:
+    result = await db.execute(lambda_stmt(lambda: select(models.User).where(models.User.email == email)))
+    return result.scalars().first()
+
+
+async def get_user_by_phone(db: AsyncSession, phone_number: str) -> Optional[models.User]:
+    result = await db.execute(select(models.User).where(models.User.phone_number == phone_number))
+    return result.scalars().first()
+
+
+async def _get_recent_password_hashes(db: AsyncSession, user_id: UUID, limit: int) -> list[str]:
+    result = await db.execute(
+        select(models.PasswordHistory.hashed_password)
+        .where(models.PasswordHistory.user_id == user_id)
+        .order_by(models.PasswordHistory.created_at.desc())
+        .limit(limit)
+    )
+    return list(result.scalars().all())
+
+
+async def _is_in_password_history(db: AsyncSession, user_id: UUID, new_password: str, limit: int) -> bool:
+    # Las verificaciones se reparten por el pool de hashing y paran en la primera coincidencia
+    recent_hashes = await _get_recent_password_hashes(db, user_id, limit)
+    return await password_hasher.verify_any(new_password, recent_hashes)
+
+
+async def authenticate_user(db: AsyncSession, email: str, password: str) -> models.User:
     """
     Autenticar usuario solo por email.
     """
-    user = db.query(models.User).filter(models.User.email == email).first()
+    user = await get_user_by_email(db, email)
     if not user:
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
             detail="Credenciales inválidas"
         )
 
-    # Verificar si la cuenta está bloqueada
+    # Verificar si la cuenta está bloqueada; un bloqueo expirado simplemente se ignora
+    # y se limpia en la fila solo cuando el usuario vuelve a entrar
     if user.is_locked and user.locked_until and user.locked_until > datetime.now(timezone.utc):
         remaining_time = user.locked_until - datetime.now(timezone.utc)
         minutes = int(remaining_time.total_seconds() / 60)
@@ -85,50 +137,55 @@ def authenticate_user(db: Session, email: str, password: str) -> models.User:
             status_code=status.HTTP_401_UNAUTHORIZED,
             detail=f"Demasiados intentos fallidos. Por favor, intente nuevamente en {minutes} minutos"
         )
-    elif user.is_locked and (not user.locked_until or user.locked_until <= datetime.now(timezone.utc)):
-        # Si el bloqueo expiró, desbloquear la cuenta
-        user.is_locked = False
-        user.failed_login_attempts = 0
-        user.locked_until = None
-        db.commit()
 
-    # Verificar contraseña
-    if not verify_password(password, user.hashed_password):
-        # Incrementar intentos fallidos de inicio de sesión
-        user.failed_login_attempts = (user.failed_login_attempts or 0) + 1
-        
+    # Los intentos fallidos viven en el almacén de contadores, no en la fila del usuario
+    failures_key = f"login_failures:{user.id}"
+
+    # Verificar contraseña; si el hash usa un coste o esquema obsoleto se recalcula a la vez
+    verified, new_hash = await password_hasher.verify_and_update(password, user.hashed_password)
+    if not verified:
+        failed_attempts = await counter_store.incr(failures_key, settings.LOGIN_FAILURES_WINDOW_MINUTES * 60)
+
         # Calcular tiempo de bloqueo incremental
-        if user.failed_login_attempts >= settings.MAX_LOGIN_ATTEMPTS:
+        if failed_attempts >= settings.MAX_LOGIN_ATTEMPTS:
             # Tiempo base de bloqueo
             lockout_minutes = settings.ACCOUNT_LOCKOUT_MINUTES
             # Incrementar el tiempo por cada bloqueo adicional
-            additional_attempts = user.failed_login_attempts - settings.MAX_LOGIN_ATTEMPTS
+            additional_attempts = failed_attempts - settings.MAX_LOGIN_ATTEMPTS
             lockout_minutes = lockout_minutes * (2 ** additional_attempts)  # Duplicar el tiempo por cada bloqueo adicional
-            
+
+            # Solo el bloqueo se persiste: debe sobrevivir a reinicios y aplicarse en todos los workers
+            user.failed_login_attempts = failed_attempts
             user.is_locked = True
             user.locked_until = datetime.now(timezone.utc) + timedelta(minutes=lockout_minutes)
-            db.commit()
+            invalidate_user(db, user.id)
+            # El bloqueo debe persistir aunque la petición termine en 401
+            await commit_now(db)
+            await counter_store.delete(failures_key)
             raise HTTPException(
                 status_code=status.HTTP_401_UNAUTHORIZED,
                 detail=f"Demasiados intentos fallidos. Por favor, intente nuevamente en {lockout_minutes} minutos"
             )
-        
-        db.commit()
+
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
             detail="Credenciales inválidas"
         )
 
-    # Si la autenticación es exitosa, resetear los intentos
-    user.failed_login_attempts = 0
-    user.is_locked = False
-    user.locked_until = None
-    db.commit()
+    # Si la autenticación es exitosa, resetear los intentos (sin UPDATE si no había nada que limpiar)
+    await counter_store.delete(failures_key)
+    if user.is_locked or user.failed_login_attempts or user.locked_until is not None:
+        user.failed_login_attempts = 0
+        user.is_locked = False
+        user.locked_until = None
+        invalidate_user(db, user.id)
+    if new_hash:
+        user.hashed_password = new_hash
 
     return user
 
 
-async def create_user(db: Session, user: schemas.UserCreate) -> models.User:
+async def create_user(db: AsyncSession, user: schemas.UserCreate) -> models.User:
     # Validar formato de email
     if not user.email or "@" not in user.email:
         raise HTTPException(
@@ -156,63 +213,83 @@ async def create_user(db: Session, user: schemas.UserCreate) -> models.User:
             status_code=400,
             detail="La contraseña debe tener al menos 8 caracteres"
         )
-    # Verificar si el email ya existe
-    existing_email = db.query(models.User).filter(models.User.email == user.email).first()
-    if existing_email:
+    # La unicidad de email y celular la comprueban los índices únicos en el mismo INSERT:
+    # sin SELECT previos ni carrera entre la comprobación y la inserción
+    hashed_password = await get_password_hash(user.password)
+    try:
+        result = await db.execute(
+            select(models.User).from_statement(_insert_user_with_history(user, hashed_password))
+        )
+        db_user = result.scalar_one()
+    except IntegrityError as e:
+        await db.rollback()
         raise HTTPException(
             status_code=409,
-            detail="El email ya está registrado por otro usuario"
+            detail=USER_UNIQUE_VIOLATIONS.get(
+                _violated_constraint(e), "Ya existe un usuario con ese email o número de celular"
+            )
         )
-    # Verificar si el número de celular ya existe
-    existing_phone = db.query(models.User).filter(models.User.phone_number == user.phone_number).first()
-    if existing_phone:
+    except SQLAlchemyError:
+        await db.rollback()
         raise HTTPException(
-            status_code=409,
-            detail="El número de celular ya está registrado por otro usuario"
+            status_code=500,
+            detail="Error interno del servidor al crear el usuario"
         )
-    try:
-        hashed_password = get_password_hash(user.password)
-        db_user = models.User(
+    # Se envía en segundo plano tras el commit (src/auth/outbox.py)
+    enqueue_welcome_email(db, db_user.email, db_user.full_name)
+    return db_user
+
+
+def _violated_constraint(error: IntegrityError) -> Optional[str]:
+    # asyncpg expone la restricción en la excepción original; psycopg2 en diag
+    original = getattr(error.orig, "__cause__", None) or error.orig
+    name = getattr(original, "constraint_name", None)
+    if name is None and getattr(original, "diag", None) is not None:
+        name = original.diag.constraint_name
+    return name
+
+
+def _insert_user_with_history(user: schemas.UserCreate, hashed_password: str):
+    """
+    Una sola sentencia (un viaje a la base de datos) que inserta el usuario y su primera
+    entrada del historial de contraseñas y devuelve la fila del usuario:
+
+        WITH new_user AS (INSERT INTO users ... RETURNING *),
+             new_history AS (INSERT INTO password_history SELECT ... FROM new_user)
+        SELECT * FROM new_user
+    """
+    users = models.User.__table__
+    new_user = (
+        insert(users)
+        .values(
+            id=uuid7(),
             email=user.email,
             full_name=user.full_name,
             phone_number=user.phone_number,
             address=user.address,
-            hashed_password=hashed_password
-        )
-        db.add(db_user)
-        db.commit()
-        db.refresh(db_user)
-        password_history = models.PasswordHistory(
-            user_id=db_user.id,
-            hashed_password=hashed_password
-        )
-        db.add(password_history)
-        db.commit()
-        try:
-            await email_service.send_welcome_email(db_user.email, db_user.full_name)
-        except Exception as email_error:
-            print(f"Error al enviar email de bienvenida: {str(email_error)}")
-        return db_user
-    except SQLAlchemyError as e:
-        db.rollback()
-        if "duplicate key value violates unique constraint" in str(e):
-            raise HTTPException(
-                status_code=409,
-                detail="Ya existe un usuario con ese email o número de celular"
-            )
-        raise HTTPException(
-            status_code=500,
-            detail="Error interno del servidor al crear el usuario"
+            hashed_password=hashed_password,
+            is_active=True,
+            is_superuser=False,
+            reset_attempts=0,
+            token_version=0,
         )
+        .returning(*users.c)
+        .cte("new_user")
+    )
+    new_history = insert(models.PasswordHistory.__table__).from_select(
+        ["id", "user_id", "hashed_password"],
+        select(literal(uuid7(), PGUUID(as_uuid=True)), new_user.c.id, new_user.c.hashed_password),
+    ).cte("new_history")
+    return select(new_user).add_cte(new_history)
 
 
-def update_user(
-        db: Session,
+async def update_user(
+        db: AsyncSession,
         user_id: int,
         user_update: schemas.UserUpdate,
         current_password: Optional[str] = None
 ) -> models.User:
-    user = db.query(models.User).filter(models.User.id == user_id).first()
+    user = await get_user_by_id(db, user_id)
     if not user:
         raise HTTPException(
             status_code=404,
@@ -225,33 +302,30 @@ def update_user(
                 status_code=400,
                 detail="Se requiere la contraseña actual para cambiarla"
             )
-        if not verify_password(current_password, user.hashed_password):
+        if not await verify_password(current_password, user.hashed_password):
             raise HTTPException(
                 status_code=400,
                 detail="La contraseña actual es incorrecta"
             )
-        hashed_new_password = get_password_hash(update_data["new_password"])
-        recent_passwords = db.query(models.PasswordHistory).filter(
-            models.PasswordHistory.user_id == user_id
-        ).order_by(models.PasswordHistory.created_at.desc()).limit(3).all()
-        for old_password in recent_passwords:
-            if verify_password(update_data["new_password"], old_password.hashed_password):
-                raise HTTPException(
-                    status_code=400,
-                    detail="La nueva contraseña no puede ser igual a una de las últimas 3 contraseñas utilizadas"
-                )
+        if await _is_in_password_history(db, user_id, update_data["new_password"], 3):
+            raise HTTPException(
+                status_code=400,
+                detail="La nueva contraseña no puede ser igual a una de las últimas 3 contraseñas utilizadas"
+            )
+        # Solo se calcula el hash nuevo cuando la contraseña ya pasó todas las comprobaciones
+        hashed_new_password = await get_password_hash(update_data["new_password"])
         user.hashed_password = hashed_new_password
         db.add(models.PasswordHistory(user_id=user_id, hashed_password=hashed_new_password))
         del update_data["new_password"]
     if "email" in update_data and update_data["email"] != user.email:
-        existing_user = db.query(models.User).filter(models.User.email == update_data["email"]).first()
+        existing_user = await get_user_by_email(db, update_data["email"])
         if existing_user:
             raise HTTPException(
                 status_code=400,
                 detail="El email ya está registrado por otro usuario"
             )
     if "phone_number" in update_data and update_data["phone_number"] != user.phone_number:
-        existing_user = db.query(models.User).filter(models.User.phone_number == update_data["phone_number"]).first()
+        existing_user = await get_user_by_phone(db, update_data["phone_number"])
         if existing_user:
             raise HTTPException(
                 status_code=400,
@@ -259,57 +333,56 @@ def update_user(
             )
     for key, value in update_data.items():
         setattr(user, key, value)
+    invalidate_user(db, user.id)
     try:
-        db.commit()
-        db.refresh(user)
+        await db.flush()
+        await db.refresh(user)
         return user
     except SQLAlchemyError:
-        db.rollback()
+        await db.rollback()
         raise HTTPException(
             status_code=400,
             detail="Error al actualizar el perfil. Por favor, intente nuevamente"
         )
 
 
-def delete_user(db: Session, user_id: int) -> bool:
-    db_user = db.query(models.User).filter(models.User.id == user_id).first()
+async def delete_user(db: AsyncSession, user_id: int) -> bool:
+    db_user = await get_user_by_id(db, user_id)
     if not db_user:
         return False
 
-    db.delete(db_user)
-    db.commit()
+    await db.delete(db_user)
+    invalidate_user(db, db_user.id)
+    await db.flush()
     return True
 
 
-async def request_password_reset(db: Session, email: str) -> bool:
-    user = db.query(models.User).filter(models.User.email == email).first()
+async def request_password_reset(db: AsyncSession, email: str) -> bool:
+    user = await get_user_by_email(db, email)
     if not user:
         return False
 
     # Verificar límites de intentos
-    _check_reset_rate_limits(db, user)
+    await _check_reset_rate_limits(db, user)
 
     # Invalidar tokens de restablecimiento anteriores para este usuario
-    invalidate_previous_tokens(db, user.id, "password_reset")
+    await invalidate_previous_tokens(db, user)
 
     # Crear nuevo token
     token = await create_password_reset_token(user)
     
-    # Enviar email
-    success = await _send_password_reset_email(email, token)
-    if not success:
-        return False
+    # Encolar el email en la misma transacción
+    enqueue_password_reset_email(db, email, token)
 
     # Actualizar contadores
     user.reset_attempts = (user.reset_attempts or 0) + 1
     if user.reset_attempts >= 3:
         user.reset_lockout_until = datetime.now(timezone.utc) + timedelta(minutes=15)
     
-    db.commit()
     return True
 
 
-def _check_reset_rate_limits(db: Session, user: models.User) -> None:
+async def _check_reset_rate_limits(db: AsyncSession, user: models.User) -> None:
     """
     Verifica y aplica límites de intentos de restablecimiento de contraseña.
     
@@ -335,10 +408,9 @@ def _check_reset_rate_limits(db: Session, user: models.User) -> None:
         # Si el bloqueo expiró, resetear contadores
         user.reset_attempts = 0
         user.reset_lockout_until = None
-        db.commit()
 
 
-def _create_new_reset_token(db: Session, user: models.User) -> str:
+async def _create_new_reset_token(db: AsyncSession, user: models.User) -> str:
     """
     Invalida los tokens anteriores de restablecimiento y crea uno nuevo.
     
@@ -350,102 +422,40 @@ def _create_new_reset_token(db: Session, user: models.User) -> str:
         str: Token de restablecimiento generado
     """
     # Invalidar cualquier token anterior para este usuario
-    invalidate_previous_tokens(db, user.id, "password_reset")
+    await invalidate_previous_tokens(db, user)
 
     # Crear nuevo token
-    reset_token = create_password_reset_token({"sub": str(user.id)})
-    db.commit()
+    reset_token = await create_password_reset_token(user)
 
     return reset_token
 
 
-async def _send_password_reset_email(to_email: str, reset_token: str) -> bool:
+async def invalidate_previous_tokens(db: AsyncSession, user: models.User) -> None:
     """
-    Envía un email con el enlace para restablecer la contraseña.
-    
-    Args:
-        to_email: Email del destinatario
-        reset_token: Token de restablecimiento
-        
-    Returns:
-        bool: True si el email se envió correctamente, False en caso contrario
+    Invalida todos los enlaces de restablecimiento emitidos hasta ahora incrementando
+    token_version. El UPDATE es atómico y devuelve el valor nuevo en la misma consulta.
     """
-    try:
-        await email_service.send_password_reset_email(to_email, reset_token)
-        return True
-    except Exception as e:
-        print(f"Error al enviar email: {str(e)}")
-        return False
-
-
-def invalidate_previous_tokens(db: Session, user_id: UUID, token_type: str) -> None:
-    """
-    Marca todos los tokens existentes del tipo especificado como utilizados para un usuario.
-    Esto se usa para invalidar tokens anteriores cuando se emite uno nuevo.
-    """
-    # Crear un identificador único para la invalidación
-    invalidation_data = f"invalidation_{token_type}_{user_id}_{utils.get_utc_now().isoformat()}"
-    
-    # Usar Blake2b seguro en lugar de SHA-256 simple
-    token_hash = _create_secure_token_hash(invalidation_data)
-    
-    invalidation_token = models.UsedToken(
-        token_hash=token_hash,
-        token_type=f"invalidation_{token_type}",
-        user_id=user_id
+    result = await db.execute(
+        update(models.User)
+        .where(models.User.id == user.id)
+        .values(token_version=models.User.token_version + 1)
+        .returning(models.User.token_version)
+        .execution_options(synchronize_session=False)
     )
-    db.add(invalidation_token)
-    db.commit()
+    set_committed_value(user, "token_version", result.scalar_one())
 
 
-def is_token_valid(db: Session, token: str, user_id: UUID, token_type: str) -> bool:
+def _is_current_reset_token(payload: dict, user: models.User) -> bool:
     """
-    Verifica si un token es válido: no ha sido utilizado y no ha sido invalidado por
-    una solicitud posterior.
+    Un enlace es válido si su versión coincide con la del usuario (ya cargado): pedir otro
+    enlace o usarlo incrementa la versión. Los enlaces sin "ver" (emitidos antes de
+    token_version) se rechazan: caducan en PASSWORD_RESET_TOKEN_EXPIRE_MINUTES y basta con
+    pedir uno nuevo.
     """
-    # Usar Blake2b seguro para crear el hash del token
-    token_hash = _create_secure_token_hash(token)
-    
-    used_token = db.query(models.UsedToken).filter(
-        models.UsedToken.token_hash == token_hash
-    ).first()
-
-    if used_token:
-        return False
-
-    if token_type == "password_reset":
-        return True
-
-    try:
-        payload = jwt.decode(token, settings.SECRET_KEY, algorithms=[settings.ALGORITHM])
-        if 'iat' not in payload:  # Si no tiene fecha de emisión, usamos la fecha de expiración
-            # Estimamos la fecha de emisión basada en la expiración y duración estándar
-            if 'exp' in payload and payload.get('type') == token_type:
-                estimated_iat = payload['exp'] - (settings.PASSWORD_RESET_TOKEN_EXPIRE_MINUTES * 60)
-            else:
-                return False  # No podemos determinar emisión - no válido
-        else:
-            estimated_iat = payload['iat']
-
-        # Buscar tokens de invalidación posterior a la emisión de este token
-        invalidation_tokens = db.query(models.UsedToken).filter(
-            models.UsedToken.user_id == user_id,
-            models.UsedToken.token_type == f"invalidation_{token_type}",
-            models.UsedToken.used_at > datetime.fromtimestamp(estimated_iat)
-        ).all()
-
-        if invalidation_tokens:
-            return False
+    return "ver" in payload and payload["ver"] == user.token_version
 
-    except jwt.ExpiredSignatureError:
-        return False
-    except jwt.JWTError:
-        return False
 
-    return True
-
-
-def reset_password(db: Session, token: str, new_password: str) -> bool:
+async def reset_password(db: AsyncSession, token: str, new_password: str) -> bool:
     """
     Restablece la contraseña de un usuario utilizando un token de restablecimiento.
     
@@ -466,16 +476,16 @@ def reset_password(db: Session, token: str, new_password: str) -> bool:
     """
     try:
         # Validar el token y obtener el usuario
-        user = _validate_reset_token(db, token)
+        user = await _validate_reset_token(db, token)
 
         # Validar los requisitos de la contraseña
         _validate_password_requirements(new_password)
 
         # Verificar que la contraseña no esté en el historial reciente
-        _check_password_history(db, user, new_password)
+        await _check_password_history(db, user, new_password)
 
         # Actualizar la contraseña del usuario
-        _update_user_password(db, user, new_password, token)
+        await _update_user_password(db, user, new_password)
 
         return True
     except jwt.ExpiredSignatureError:
@@ -484,7 +494,7 @@ def reset_password(db: Session, token: str, new_password: str) -> bool:
         raise exceptions.InvalidTokenException()
 
 
-def _validate_reset_token(db: Session, token: str) -> models.User:
+async def _validate_reset_token(db: AsyncSession, token: str) -> models.User:
     """
     Válida un token de restablecimiento y devuelve el usuario asociado.
     
@@ -499,7 +509,7 @@ def _validate_reset_token(db: Session, token: str) -> models.User:
         InvalidTokenException: Si el token no es válido o ya fue utilizado
         UserNotFoundException: Si no se encuentra el usuario
     """
-    payload = jwt.decode(token, settings.SECRET_KEY, algorithms=[settings.ALGORITHM])
+    payload = decode_token(token)
 
     if payload.get("type") != "password_reset":
         raise exceptions.InvalidTokenException()
@@ -508,19 +518,14 @@ def _validate_reset_token(db: Session, token: str) -> models.User:
     if user_id is None:
         raise exceptions.InvalidTokenException()
 
-    user = db.query(models.User).filter(models.User.id == user_id).first()
+    user = await get_user_by_id(db, user_id)
     if not user:
         raise exceptions.UserNotFoundException()
 
-    # Verificar si el token ya ha sido utilizado usando Blake2b seguro
-    token_hash = _create_secure_token_hash(token)
-    used_token = db.query(models.UsedToken).filter(
-        models.UsedToken.token_hash == token_hash
-    ).first()
-
-    if used_token:
+    # Verificar que el enlace no se haya utilizado ni sustituido por otro más reciente
+    if not _is_current_reset_token(payload, user):
         raise exceptions.InvalidTokenException(
-            "Este enlace ya ha sido utilizado para restablecer tu contraseña. Por favor solicita un nuevo enlace si lo necesitas.")
+            "Este enlace ya ha sido utilizado o se ha solicitado uno más reciente. Por favor solicita un nuevo enlace si lo necesitas.")
 
     return user
 
@@ -543,7 +548,7 @@ def _validate_password_requirements(new_password: str) -> None:
         raise exceptions.InvalidPasswordException(error_message)
 
 
-def _check_password_history(db: Session, user: models.User, new_password: str) -> None:
+async def _check_password_history(db: AsyncSession, user: models.User, new_password: str) -> None:
     """
     Verifica que la contraseña no esté en el historial reciente del usuario.
     
@@ -555,18 +560,11 @@ def _check_password_history(db: Session, user: models.User, new_password: str) -
     Raises:
         PasswordHistoryException: Si la contraseña está en el historial reciente
     """
-    recent_passwords = db.query(models.PasswordHistory).filter(
-        models.PasswordHistory.user_id == user.id
-    ).order_by(models.PasswordHistory.created_at.desc()).limit(
-        settings.PASSWORD_HISTORY_SIZE
-    ).all()
+    if await _is_in_password_history(db, user.id, new_password, settings.PASSWORD_HISTORY_SIZE):
+        raise exceptions.PasswordHistoryException()
 
-    for old_password in recent_passwords:
-        if verify_password(new_password, old_password.hashed_password):
-            raise exceptions.PasswordHistoryException()
 
-
-def _update_user_password(db: Session, user: models.User, new_password: str, token: str) -> None:
+async def _update_user_password(db: AsyncSession, user: models.User, new_password: str) -> None:
     """
     Actualiza la contraseña del usuario y registra el cambio.
     
@@ -574,10 +572,9 @@ def _update_user_password(db: Session, user: models.User, new_password: str, tok
         db: Sesión de la base de datos
         user: Usuario
         new_password: Nueva contraseña
-        token: Token utilizado para el restablecimiento
     """
     # Cifrar la nueva contraseña
-    hashed_new_password = get_password_hash(new_password)
+    hashed_new_password = await get_password_hash(new_password)
 
     # Actualizar la contraseña del usuario
     user.hashed_password = hashed_new_password
@@ -589,28 +586,21 @@ def _update_user_password(db: Session, user: models.User, new_password: str, tok
     )
     db.add(password_history)
 
-    # Marcar el token como utilizado usando Blake2b seguro
-    token_hash = _create_secure_token_hash(token)
-    used_token = models.UsedToken(
-        token_hash=token_hash,
-        token_type="password_reset",
-        user_id=user.id
-    )
-    db.add(used_token)
+    # Invalidar el enlace utilizado (y cualquier otro pendiente)
+    await invalidate_previous_tokens(db, user)
 
     # Reiniciar contadores de intentos
     user.reset_attempts = 0
     user.reset_lockout_until = None
+    invalidate_user(db, user.id)
 
-    db.commit()
 
-
-def get_user_from_token(db: Session, token: str) -> models.User:
+async def get_user_from_token(db: AsyncSession, token: str) -> models.User:
     """
     Válida un token y devuelve el usuario asociado.
     """
     try:
-        payload = jwt.decode(token, settings.SECRET_KEY, algorithms=[settings.ALGORITHM])
+        payload = decode_token_cached(token)
         user_id: str = payload.get("sub")
         token_type: str = payload.get("type", "")
 
@@ -620,7 +610,7 @@ def get_user_from_token(db: Session, token: str) -> models.User:
         if token_type not in ["refresh", "access"]:
             raise exceptions.InvalidTokenException("Token inválido: se requiere un token de acceso o refresco")
 
-        user = db.query(models.User).filter(models.User.id == user_id).first()
+        user = await get_user_by_id(db, user_id)
         if user is None:
             raise exceptions.UserNotFoundException()
 
@@ -633,12 +623,12 @@ def get_user_from_token(db: Session, token: str) -> models.User:
 
 async def get_current_user(
         credentials: HTTPAuthorizationCredentials = Depends(security),
-        db: Session = Depends(get_db)
-) -> models.User:
+        db: AsyncSession = Depends(get_async_db)
+) -> schemas.User:
     try:
         token = credentials.credentials
         
-        payload = jwt.decode(token, settings.SECRET_KEY, algorithms=[settings.ALGORITHM])
+        payload = decode_token_cached(token)
         user_id: str = payload.get("sub")
         token_type: str = payload.get("type", "access")
 
@@ -659,14 +649,22 @@ async def get_current_user(
             headers={"WWW-Authenticate": "Bearer"},
         )
 
-    user = db.query(models.User).filter(models.User.id == user_id).first()
+    # Las rutas solo leen atributos del usuario: se devuelve la proyección cacheada
+    # y no la instancia ORM, que quedaría ligada a la sesión de otra petición
+    current_user = user_cache.get(user_id)
+    if current_user is not None:
+        return current_user
+
+    user = await get_user_by_id(db, user_id)
     if user is None:
         raise exceptions.UserNotFoundException()
 
-    return user
+    current_user = to_current_user(user)
+    user_cache.set(user_id, current_user)
+    return current_user
 
 
-def validate_password_reset_form_token(db: Session, token: str) -> models.User:
+async def validate_password_reset_form_token(db: AsyncSession, token: str) -> models.User:
     """
     Válida un token para el formulario de restablecimiento de contraseña y devuelve el usuario.
     
@@ -681,7 +679,7 @@ def validate_password_reset_form_token(db: Session, token: str) -> models.User:
         HTTPException: Si el token no es válido por cualquier motivo.
     """
     try:
-        payload = jwt.decode(token, settings.SECRET_KEY, algorithms=[settings.ALGORITHM])
+        payload = decode_token(token)
 
         # Verificar que sea un token de restablecimiento de contraseña
         if payload.get("type") != "password_reset":
@@ -707,30 +705,18 @@ def validate_password_reset_form_token(db: Session, token: str) -> models.User:
             )
 
         # Buscar el usuario
-        user = db.query(models.User).filter(models.User.id == user_id).first()
+        user = await get_user_by_id(db, user_id)
         if user is None:
             raise HTTPException(
                 status_code=status.HTTP_404_NOT_FOUND,
                 detail="No se encontró ningún usuario asociado a este enlace."
             )
 
-        # Verificar si el token ya ha sido utilizado usando Blake2b seguro
-        token_hash = _create_secure_token_hash(token)
-        used_token = db.query(models.UsedToken).filter(
-            models.UsedToken.token_hash == token_hash
-        ).first()
-
-        if used_token:
+        # Verificar que no se haya utilizado ni sustituido por un enlace más reciente
+        if not _is_current_reset_token(payload, user):
              raise HTTPException(
                 status_code=status.HTTP_400_BAD_REQUEST,
-                detail="Este enlace ya ha sido utilizado para restablecer la contraseña. Por favor, solicita uno nuevo si necesitas cambiar tu contraseña."
-            )
-
-        # Verificar si ha sido invalidado por un token más reciente
-        if not is_token_valid(db, token, user.id, "password_reset"):
-             raise HTTPException(
-                status_code=status.HTTP_400_BAD_REQUEST,
-                detail="Este enlace ya no es válido porque se ha solicitado uno más reciente. Por favor, utiliza el enlace más reciente que enviamos a tu correo."
+                detail="Este enlace ya no es válido porque se utilizó o se ha solicitado uno más reciente. Por favor, utiliza el enlace más reciente que enviamos a tu correo."
             )
 
         # Token válido, devolver el usuario
@@ -752,62 +738,3 @@ def validate_password_reset_form_token(db: Session, token: str) -> models.User:
             status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
             detail="Error interno del servidor al validar el token de restablecimiento."
         )
-
-
-def _create_secure_token_hash(token: str) -> str:
-    """
-    Crea un hash seguro para tokens usando Blake2b con clave secreta.
-    Blake2b es más rápido y seguro que SHA-256 para identificadores únicos.
-    """
-    try:
-        # Usar Blake2b con la SECRET_KEY como clave
-        secret_key = settings.SECRET_KEY.encode('utf-8')[:64]  # Blake2b acepta hasta 64 bytes
-        token_bytes = token.encode('utf-8')
-        
-        # Blake2b con clave es criptográficamente seguro y rápido
-        return hashlib.blake2b(token_bytes, key=secret_key, digest_size=32).hexdigest()
-    except Exception:
-        # Fallback a HMAC-SHA256 si Blake2b no está disponible
-        secret_key = settings.SECRET_KEY.encode('utf-8')
-        token_bytes = token.encode('utf-8')
-        return hmac.new(secret_key, token_bytes, hashlib.sha256).hexdigest()
-
-
-def generate_password_reset_token(self, db: Session, email: str) -> str:
-    """
-    Generar token seguro para restablecer contraseña.
-    """
-    user = db.query(models.User).filter(models.User.email == email).first()
-    if not user:
-        raise exceptions.UserNotFoundException()
-
-    # Generar token aleatorio seguro
-    token = secrets.token_urlsafe(32)
-    
-    # Crear hash del token usando la función segura
-    token_hash = _create_secure_token_hash(token)
-    
-    # Guardar el hash del token en la base de datos
-    user.password_reset_token = token_hash
-    user.password_reset_token_expires = datetime.now(timezone.utc) + timedelta(minutes=settings.PASSWORD_RESET_TOKEN_EXPIRE_MINUTES)
-    db.commit()
-    
-    return token
-
-
-def verify_password_reset_token(self, db: Session, token: str) -> models.User:
-    """
-    Verificar token de restablecimiento de contraseña.
-    """
-    # Crear hash del token usando la función segura
-    token_hash = _create_secure_token_hash(token)
-    
-    user = db.query(models.User).filter(
-        models.User.password_reset_token == token_hash,
-        models.User.password_reset_token_expires > datetime.now(timezone.utc)
-    ).first()
-    
-    if not user:
-        raise exceptions.InvalidTokenException()
-            
-    return user
@@ -0,0 +1,199 @@
+import asyncio
+import ssl
+import threading
+import time
+from contextlib import asynccontextmanager
+from email.message import Message
+from typing import AsyncIterator, Awaitable, Callable, Optional
+
+import aiosmtplib
+
+# Errores tras los que la conexión ya no es utilizable
+CONNECTION_ERRORS = (aiosmtplib.SMTPServerDisconnected, aiosmtplib.SMTPConnectError, ConnectionError, asyncio.TimeoutError)
+
+
+class _PooledConnection:
+    def __init__(self, smtp: aiosmtplib.SMTP):
+        self.smtp = smtp
+        self.messages = 0
+        self.last_used = time.monotonic()
+
+
+class SMTPConnectionPool:
+    """
+    Conexiones SMTP autenticadas que se reutilizan entre envíos: el handshake TLS y el AUTH
+    se pagan una vez por conexión en lugar de una vez por email.
+
+    - Como mucho `size` conexiones abiertas; el resto de envíos espera turno.
+    - Una conexión que lleva más de `healthcheck_after` segundos sin usarse se comprueba con
+      NOOP antes de usarla; si lleva más de `idle_timeout` se cierra sin probarla (el
+      servidor ya la habrá cortado).
+    - Tras `max_messages` emails se abre una nueva (muchos servidores limitan los mensajes
+      por conexión).
+    - Si un envío falla por un error de conexión sobre una conexión reutilizada, se
+      descarta y se reintenta una vez con una conexión nueva.
+    """
+
+    def __init__(
+        self,
+        hostname: str,
+        port: int,
+        username: Optional[str],
+        password: Optional[str],
+        size: int = 4,
+        idle_timeout: float = 60,
+        healthcheck_after: float = 15,
+        max_messages: int = 100,
+        timeout: float = 30,
+        use_tls: bool = True,
+        tls_context: Optional[ssl.SSLContext] = None,
+    ):
+        self.hostname = hostname
+        self.port = port
+        self.username = username
+        self.password = password
+        self.size = size
+        self.idle_timeout = idle_timeout
+        self.healthcheck_after = healthcheck_after
+        self.max_messages = max_messages
+        self.timeout = timeout
+        self.use_tls = use_tls
+        # Un único contexto SSL: cargar los certificados raíz en cada conexión cuesta milisegundos
+        self.tls_context = tls_context or (ssl.create_default_context() if use_tls else None)
+        self._semaphore = asyncio.Semaphore(size)
+        self._idle: list[_PooledConnection] = []
+        self._in_use = 0
+        self._lock = threading.Lock()
+        self.reset()
+
+    def reset(self) -> None:
+        with self._lock:
+            self.stats = {
+                "connections_opened": 0,
+                "connections_reused": 0,
+                "connections_discarded": 0,
+                "healthcheck_failures": 0,
+                "reconnects": 0,
+                "messages_sent": 0,
+            }
+
+    def _record(self, name: str) -> None:
+        with self._lock:
+            self.stats[name] += 1
+
+    async def _open(self) -> _PooledConnection:
+        smtp = aiosmtplib.SMTP(
+            hostname=self.hostname,
+            port=self.port,
+            timeout=self.timeout,
+            use_tls=self.use_tls,
+            start_tls=False,
+            tls_context=self.tls_context,
+        )
+        await smtp.connect()
+        try:
+            if self.username:
+                await smtp.login(self.username, self.password)
+        except Exception:
+            smtp.close()
+            raise
+        self._record("connections_opened")
+        return _PooledConnection(smtp)
+
+    async def _discard(self, connection: _PooledConnection, polite: bool = False) -> None:
+        self._record("connections_discarded")
+        if polite and connection.smtp.is_connected:
+            try:
+                await asyncio.wait_for(connection.smtp.quit(), timeout=2)
+                return
+            except Exception:
+                pass
+        connection.smtp.close()
+
+    async def _checkout(self) -> tuple[_PooledConnection, bool]:
+        """Conexión idle válida (reutilizada=True) o una nueva."""
+        while self._idle:
+            connection = self._idle.pop()
+            idle_for = time.monotonic() - connection.last_used
+            if not connection.smtp.is_connected or idle_for > self.idle_timeout:
+                await self._discard(connection)
+                continue
+            if idle_for > self.healthcheck_after:
+                try:
+                    await connection.smtp.noop()
+                except Exception:
+                    self._record("healthcheck_failures")
+                    await self._discard(connection)
+                    continue
+            self._record("connections_reused")
+            return connection, True
+        return await self._open(), False
+
+    def _checkin(self, connection: _PooledConnection) -> None:
+        connection.last_used = time.monotonic()
+        self._idle.append(connection)
+
+    @asynccontextmanager
+    async def _slot(self) -> AsyncIterator[None]:
+        async with self._semaphore:
+            self._in_use += 1
+            try:
+                yield
+            finally:
+                self._in_use -= 1
+
+    @asynccontextmanager
+    async def connection(self) -> AsyncIterator[aiosmtplib.SMTP]:
+        """Presta una conexión autenticada; si el bloque falla, la conexión se descarta."""
+        async with self._slot():
+            connection, _ = await self._checkout()
+            try:
+                yield connection.smtp
+            except BaseException:
+                await self._discard(connection)
+                raise
+            self._checkin(connection)
+
+    async def _deliver(self, send: Callable[[aiosmtplib.SMTP], Awaitable]) -> None:
+        async with self._slot():
+            connection, reused = await self._checkout()
+            try:
+                await send(connection.smtp)
+            except CONNECTION_ERRORS:
+                await self._discard(connection)
+                if not reused:
+                    raise
+                # La conexión del pool estaba muerta aunque pareciera abierta: una nueva, una vez
+                self._record("reconnects")
+                connection = await self._open()
+                try:
+                    await send(connection.smtp)
+                except BaseException:
+                    await self._discard(connection)
+                    raise
+            except BaseException:
+                # Rechazo del servidor (destinatario, tamaño...): la sesión puede quedar a medias
+                await self._discard(connection, polite=True)
+                raise
+            self._record("messages_sent")
+            connection.messages += 1
+            if connection.messages >= self.max_messages:
+                await self._discard(connection, polite=True)
+            else:
+                self._checkin(connection)
+
+    async def send_message(self, message: Message) -> None:
+        await self._deliver(lambda smtp: smtp.send_message(message))
+
+    async def sendmail(self, sender: str, recipients: list[str], message: bytes) -> None:
+        """Envía un mensaje ya serializado (CRLF) sin pasar por el paquete email."""
+        await self._deliver(lambda smtp: smtp.sendmail(sender, recipients, message))
+
+    async def close(self) -> None:
+        idle, self._idle = self._idle, []
+        for connection in idle:
+            await self._discard(connection, polite=True)
+
+    def snapshot(self) -> dict:
+        with self._lock:
+            return {"size": self.size, "idle": len(self._idle), "in_use": self._in_use, **self.stats}
@@ -0,0 +1,56 @@
+import hashlib
+import time
+
+import jwt as pyjwt
+from jose import jwt as jose_jwt
+from jose.exceptions import ExpiredSignatureError, JWTError
+
+from src.auth.cache import token_cache
+from src.config import get_settings
+
+settings = get_settings()
+
+
+def _decode_jose(token: str) -> dict:
+    return jose_jwt.decode(token, settings.SECRET_KEY, algorithms=[settings.ALGORITHM])
+
+
+def _decode_pyjwt(token: str) -> dict:
+    # Se traducen las excepciones a las de python-jose, que son las que captura el resto del código
+    try:
+        return pyjwt.decode(token, settings.SECRET_KEY, algorithms=[settings.ALGORITHM])
+    except pyjwt.ExpiredSignatureError as e:
+        raise ExpiredSignatureError(str(e))
+    except pyjwt.InvalidTokenError as e:
+        raise JWTError(str(e))
+
+
+DECODERS = {
+    "jose": _decode_jose,
+    "pyjwt": _decode_pyjwt,
+}
+
+
+def decode_token(token: str) -> dict:
+    """
+    Verifica la firma y la expiración con el backend configurado (JWT_DECODER_BACKEND).
+    Lanza ExpiredSignatureError o JWTError de python-jose sea cual sea el backend.
+    """
+    return DECODERS[settings.JWT_DECODER_BACKEND](token)
+
+
+def decode_token_cached(token: str) -> dict:
+    """
+    Igual que decode_token, pero recuerda los claims de los tokens ya verificados por un
+    digest del token, como mucho hasta su exp. Los tokens inválidos no se guardan.
+    """
+    key = hashlib.blake2b(token.encode(), digest_size=16).digest()
+    claims = token_cache.get(key)
+    if claims is not None:
+        if claims.get("exp") is None or claims["exp"] > time.time():
+            return claims
+        token_cache.invalidate(key)
+    claims = decode_token(token)
+    exp = claims.get("exp")
+    token_cache.set(key, claims, ttl_seconds=exp - time.time() if exp is not None else None)
+    return claims
@@ -0,0 +1,23 @@
+from sqlalchemy import Column, DateTime, Integer, String, Text, func
+from sqlalchemy.dialects.postgresql import UUID as PGUUID
+
+from src.database import Base
+from src.utils import uuid7
+
+
+class EmailCampaign(Base):
+    """Envío masivo a los usuarios activos; last_user_id es el punto de reanudación."""
+    __tablename__ = "email_campaigns"
+
+    id = Column(PGUUID(as_uuid=True), primary_key=True, default=uuid7)
+    template = Column(String, nullable=False)  # Ruta dentro de templates/email
+    subject = Column(String, nullable=False)
+    status = Column(String, nullable=False, default="running", server_default="running")  # running | paused | finished
+    # Todos los usuarios con id <= last_user_id ya se han procesado (los ids uuid7 se ordenan por creación)
+    last_user_id = Column(PGUUID(as_uuid=True), nullable=True)
+    sent = Column(Integer, nullable=False, default=0, server_default="0")
+    failed = Column(Integer, nullable=False, default=0, server_default="0")  # Reencolados en el outbox de emails
+    last_error = Column(Text, nullable=True)
+    created_at = Column(DateTime(timezone=True), server_default=func.now(), nullable=False)
+    updated_at = Column(DateTime(timezone=True), server_default=func.now(), onupdate=func.now(), nullable=False)
+    finished_at = Column(DateTime(timezone=True), nullable=True)
@@ -0,0 +1,273 @@
+"""
+Envío masivo de emails (campañas) a todos los usuarios activos.
+
+Los destinatarios se leen de users por orden de id con un cursor de servidor (stream +
+yield_per), en tramos de CAMPAIGN_CURSOR_SEGMENT filas: cada tramo abre su propio cursor
+y su propia transacción, para no mantener un snapshot abierto durante toda la campaña.
+
+Los emails se envían por CAMPAIGN_SMTP_CONNECTIONS conexiones SMTP propias (un pool
+aparte del de los emails transaccionales, que así no esperan detrás de la campaña), cada
+una con su worker, y sin superar CAMPAIGN_MAX_PER_SECOND envíos por segundo en total.
+La plantilla se renderiza una vez con PrerenderedTemplate y por destinatario solo se
+sustituye full_name.
+
+Cada CAMPAIGN_CHECKPOINT_EVERY envíos se guarda en email_campaigns el mayor id hasta el
+que todo está procesado; una campaña interrumpida se reanuda desde ahí. Los envíos en
+vuelo en el momento del corte pueden repetirse al reanudar (entrega al menos una vez).
+Los envíos fallidos se reencolan en el outbox de emails, que los reintenta con backoff.
+
+Uso:
+    python -m src.campaigns.sender start <plantilla> "<asunto>" [max_envios]
+    python -m src.campaigns.sender resume <id_campaña> [max_envios]
+
+<plantilla> es una ruta dentro de templates/email, p. ej. campaigns/politica.html.
+max_envios corta la ejecución (p. ej. por la cuota diaria del proveedor) dejando la
+campaña en pausa para reanudarla más tarde.
+"""
+import asyncio
+import logging
+import sys
+import time
+from collections import deque
+from contextlib import aclosing
+from datetime import datetime, timezone
+from typing import AsyncIterator, Optional
+from uuid import UUID
+
+from sqlalchemy import select, update
+from sqlalchemy.engine import Row
+
+from src.auth.emails import email_service
+from src.auth.models import User
+from src.auth.outbox import enqueue_email
+from src.auth.smtp import SMTPConnectionPool
+from src.campaigns.models import EmailCampaign
+from src.config import get_settings
+from src.database import AsyncSessionLocal, async_engine
+
+settings = get_settings()
+logger = logging.getLogger(__name__)
+
+
+class RateCap:
+    """Token bucket: como mucho `rate` envíos por segundo entre todos los workers."""
+
+    def __init__(self, rate: float, burst: Optional[float] = None):
+        self.rate = rate
+        self.capacity = burst or max(1.0, rate)
+        self.tokens = 1.0
+        self.updated = time.monotonic()
+        self._lock = asyncio.Lock()
+
+    async def acquire(self) -> None:
+        async with self._lock:
+            while True:
+                now = time.monotonic()
+                self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+                self.updated = now
+                if self.tokens >= 1:
+                    self.tokens -= 1
+                    return
+                await asyncio.sleep((1 - self.tokens) / self.rate)
+
+
+async def stream_recipients(after: Optional[UUID]) -> AsyncIterator[Row]:
+    """Usuarios activos con id > after, por orden de id, en tramos con cursor de servidor."""
+    while True:
+        query = (
+            select(User.id, User.email, User.full_name)
+            .where(User.is_active.is_(True))
+            .order_by(User.id)
+            .limit(settings.CAMPAIGN_CURSOR_SEGMENT)
+            .execution_options(yield_per=settings.CAMPAIGN_CURSOR_BATCH)
+        )
+        if after is not None:
+            query = query.where(User.id > after)
+        rows = 0
+        async with async_engine.connect() as conn:
+            result = await conn.stream(query)
+            async for row in result:
+                rows += 1
+                after = row.id
+                yield row
+        if rows < settings.CAMPAIGN_CURSOR_SEGMENT:
+            return
+
+
+class _Pending:
+    __slots__ = ("user_id", "done")
+
+    def __init__(self, user_id: UUID):
+        self.user_id = user_id
+        self.done = False
+
+
+class CampaignSender:
+    def __init__(self, campaign: EmailCampaign, pool: SMTPConnectionPool, rate_cap: RateCap):
+        self.campaign_id = campaign.id
+        self.template = campaign.template
+        self.subject = campaign.subject
+        self.checkpoint: Optional[UUID] = campaign.last_user_id
+        self.pool = pool
+        self.rate_cap = rate_cap
+        # Destinatarios en orden de lectura; el checkpoint avanza hasta el primero sin terminar
+        self._pending: deque[_Pending] = deque()
+        self._failures: list[tuple[Row, str]] = []
+        self._sent = 0
+        self._failed = 0
+        self._since_checkpoint = 0
+        self._last_error: Optional[str] = None
+        self._save_lock = asyncio.Lock()
+
+    def _complete(self, entry: _Pending) -> None:
+        entry.done = True
+        while self._pending and self._pending[0].done:
+            self.checkpoint = self._pending.popleft().user_id
+        self._since_checkpoint += 1
+
+    async def _send(self, row: Row, entry: _Pending) -> None:
+        await self.rate_cap.acquire()
+        try:
+            subject, html_content = email_service.render_campaign(self.template, self.subject, row.full_name)
+            message = email_service.build_message(row.email, subject, html_content)
+            await self.pool.sendmail(email_service.sender_email, [row.email], message)
+            self._sent += 1
+        except Exception as e:
+            error = f"{type(e).__name__}: {e}"[:1000]
+            self._failures.append((row, error))
+            self._failed += 1
+            self._last_error = error
+        self._complete(entry)
+
+    async def _save(self, status: Optional[str] = None) -> None:
+        """Guarda el checkpoint y reencola en el outbox los fallos ya cubiertos por él, en una transacción."""
+        # Lo que se guarda se toma y se pone a cero antes de esperar a la BD: otro worker puede seguir enviando
+        self._since_checkpoint = 0
+        checkpoint = self.checkpoint
+        covered = []
+        if checkpoint is not None:
+            covered = [f for f in self._failures if f[0].id <= checkpoint]
+            self._failures = [f for f in self._failures if f[0].id > checkpoint]
+        sent, failed, last_error = self._sent, self._failed, self._last_error
+        self._sent = self._failed = 0
+        self._last_error = None
+
+        values = {
+            "last_user_id": checkpoint,
+            "sent": EmailCampaign.sent + sent,
+            "failed": EmailCampaign.failed + failed,
+        }
+        if last_error is not None:
+            values["last_error"] = last_error
+        if status is not None:
+            values["status"] = status
+            if status == "finished":
+                values["finished_at"] = datetime.now(timezone.utc)
+        async with self._save_lock:
+            async with AsyncSessionLocal() as db:
+                for row, _ in covered:
+                    enqueue_email(db, "campaign", row.email, {
+                        "template": self.template, "subject": self.subject, "full_name": row.full_name,
+                    })
+                await db.execute(update(EmailCampaign).where(EmailCampaign.id == self.campaign_id).values(**values))
+                await db.commit()
+
+    async def run(self, max_messages: Optional[int] = None) -> str:
+        """Envía hasta terminar o hasta max_messages; devuelve el estado final de la campaña."""
+        queue: asyncio.Queue = asyncio.Queue(maxsize=self.pool.size * 2)
+
+        async def worker() -> None:
+            while (item := await queue.get()) is not None:
+                await self._send(*item)
+                if self._since_checkpoint >= settings.CAMPAIGN_CHECKPOINT_EVERY:
+                    await self._save()
+                    logger.info(f"Campaña {self.campaign_id}: checkpoint en {self.checkpoint}")
+
+        workers = [asyncio.create_task(worker()) for _ in range(self.pool.size)]
+        status = "paused"
+        try:
+            produced = 0
+            async with aclosing(stream_recipients(self.checkpoint)) as recipients:
+                async for row in recipients:
+                    if max_messages is not None and produced >= max_messages:
+                        break
+                    entry = _Pending(row.id)
+                    self._pending.append(entry)
+                    await queue.put((row, entry))
+                    produced += 1
+                else:
+                    status = "finished"
+            for _ in workers:
+                await queue.put(None)
+            await asyncio.gather(*workers)
+        except BaseException:
+            for task in workers:
+                task.cancel()
+            status = "paused"
+            raise
+        finally:
+            # También si se interrumpe: lo enviado hasta el primer destinatario pendiente queda registrado
+            await self._save(status)
+            await self.pool.close()
+        return status
+
+
+def _campaign_pool() -> SMTPConnectionPool:
+    return SMTPConnectionPool(
+        hostname=email_service.smtp_server,
+        port=email_service.smtp_port,
+        username=email_service.sender_email,
+        password=email_service.sender_password,
+        size=settings.CAMPAIGN_SMTP_CONNECTIONS,
+        idle_timeout=settings.SMTP_POOL_IDLE_TIMEOUT_SECONDS,
+        healthcheck_after=settings.SMTP_POOL_HEALTHCHECK_SECONDS,
+        max_messages=settings.SMTP_POOL_MAX_MESSAGES_PER_CONNECTION,
+        timeout=settings.SMTP_TIMEOUT_SECONDS,
+    )
+
+
+async def run_campaign(campaign_id: UUID, max_messages: Optional[int] = None) -> str:
+    async with AsyncSessionLocal() as db:
+        campaign = await db.get(EmailCampaign, campaign_id)
+        if campaign is None:
+            raise ValueError(f"No existe la campaña {campaign_id}")
+        if campaign.status == "finished":
+            logger.info(f"La campaña {campaign_id} ya terminó")
+            return campaign.status
+        campaign.status = "running"
+        await db.commit()
+    sender = CampaignSender(campaign, _campaign_pool(), RateCap(settings.CAMPAIGN_MAX_PER_SECOND))
+    status = await sender.run(max_messages)
+    logger.info(f"Campaña {campaign_id}: {status}, último usuario procesado {sender.checkpoint}")
+    return status
+
+
+async def start_campaign(template: str, subject: str, max_messages: Optional[int] = None) -> UUID:
+    # Falla antes de crear la campaña si la plantilla no existe
+    email_service.campaign_template(template)
+    async with AsyncSessionLocal() as db:
+        campaign = EmailCampaign(template=template, subject=subject)
+        db.add(campaign)
+        await db.commit()
+    logger.info(f"Campaña {campaign.id} creada")
+    await run_campaign(campaign.id, max_messages)
+    return campaign.id
+
+
+async def main(args: list[str]) -> None:
+    try:
+        if args[0] == "start":
+            await start_campaign(args[1], args[2], int(args[3]) if len(args) > 3 else None)
+        elif args[0] == "resume":
+            await run_campaign(UUID(args[1]), int(args[2]) if len(args) > 2 else None)
+        else:
+            raise SystemExit(__doc__)
+    finally:
+        await async_engine.dispose()
+
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO)
+    if len(sys.argv) < 3:
+        raise SystemExit(__doc__)
+    asyncio.run(main(sys.argv[1:]))
@@ -1,6 +1,6 @@
 from pydantic_settings import BaseSettings
 from functools import lru_cache
-from typing import Optional, Dict, Any, List, Union
+from typing import Optional, Dict, Any, List, Literal, Union
 from pydantic import PostgresDsn, validator, Field
 
 class Settings(BaseSettings):
@@ -15,10 +15,51 @@ class Settings(BaseSettings):
     POSTGRES_DB: str
     POSTGRES_PORT: str = "5432"
 
+    # Configuración del pool de conexiones
+    DB_POOL_SIZE: int = 10
+    DB_MAX_OVERFLOW: int = 10
+    DB_POOL_TIMEOUT: int = 30  # Segundos esperando una conexión libre antes de fallar
+    DB_POOL_RECYCLE: int = 1800  # Segundos antes de reciclar una conexión
+    DB_POOL_PRE_PING: bool = True
+    DB_POOL_WAIT_WARNING_MS: int = 500  # Avisar en el log si esperar una conexión tarda más
+    DB_PGBOUNCER_TRANSACTION_MODE: bool = False  # PgBouncer en modo transacción: sin pool ni prepared statements locales
+    DB_COMPILED_CACHE_SIZE: int = 1200  # Sentencias SQL compiladas que SQLAlchemy guarda por engine
+    DB_PREPARED_STATEMENT_CACHE_SIZE: int = 256  # Prepared statements de asyncpg por conexión
+
+    # Réplica de lectura (opcional): si no se define, todas las consultas van al primario
+    POSTGRES_REPLICA_SERVER: Optional[str] = None
+    POSTGRES_REPLICA_PORT: Optional[str] = None
+    DB_REPLICA_READ_YOUR_WRITES_SECONDS: int = 10  # Tras escribir, las lecturas del usuario van al primario
+
+    # Contador de consultas por petición
+    DB_QUERY_BUDGET: int = 30  # Máximo de consultas por petición (0 = sin límite)
+    DB_QUERY_BUDGETS: Dict[str, int] = {}  # Presupuestos por ruta, p. ej. {"GET /store/cart": 5}
+    DB_QUERY_STRICT: bool = False  # Lanzar QueryBudgetExceeded al superar el presupuesto (tests)
+    DB_N_PLUS_ONE_THRESHOLD: int = 5  # Repeticiones de la misma sentencia para marcarla como N+1
+
+    # Registro de consultas lentas
+    DB_SLOW_QUERY_MS: int = 200  # Umbral para considerar lenta una sentencia
+    DB_SLOW_QUERY_EXPLAIN_SAMPLE_RATE: float = 0.1  # Fracción de consultas lentas con EXPLAIN capturado
+    DB_SLOW_QUERY_EXPLAIN_ANALYZE: bool = False  # EXPLAIN ANALYZE (vuelve a ejecutar los SELECT muestreados)
+    DB_SLOW_QUERY_LOG_FILE: Optional[str] = "logs/slow_queries.log"  # None para no escribir fichero
+    DB_SLOW_QUERY_LOG_MAX_BYTES: int = 10 * 1024 * 1024
+    DB_SLOW_QUERY_LOG_BACKUPS: int = 5
+
     @property
     def DATABASE_URL(self) -> str:
         return f"postgresql://{self.POSTGRES_USER}:{self.POSTGRES_PASSWORD}@{self.POSTGRES_SERVER}:{self.POSTGRES_PORT}/{self.POSTGRES_DB}"
 
+    @property
+    def ASYNC_DATABASE_URL(self) -> str:
+        return f"postgresql+asyncpg://{self.POSTGRES_USER}:{self.POSTGRES_PASSWORD}@{self.POSTGRES_SERVER}:{self.POSTGRES_PORT}/{self.POSTGRES_DB}"
+
+    @property
+    def ASYNC_REPLICA_DATABASE_URL(self) -> Optional[str]:
+        if not self.POSTGRES_REPLICA_SERVER:
+            return None
+        port = self.POSTGRES_REPLICA_PORT or self.POSTGRES_PORT
+        return f"postgresql+asyncpg://{self.POSTGRES_USER}:{self.POSTGRES_PASSWORD}@{self.POSTGRES_REPLICA_SERVER}:{port}/{self.POSTGRES_DB}"
+
     # JWT
     SECRET_KEY: str
     ALGORITHM: str = "HS256"
@@ -32,10 +73,39 @@ class Settings(BaseSettings):
     SMTP_PASSWORD: str
     SENDER_EMAIL: str
     URL: str
+    SMTP_POOL_SIZE: int = 4  # Conexiones SMTP autenticadas abiertas como máximo por proceso
+    SMTP_POOL_IDLE_TIMEOUT_SECONDS: float = 60  # Más tiempo sin uso: se cierra en lugar de reutilizarla
+    SMTP_POOL_HEALTHCHECK_SECONDS: float = 15  # Más tiempo sin uso: NOOP antes de reutilizarla
+    SMTP_POOL_MAX_MESSAGES_PER_CONNECTION: int = 100
+    SMTP_TIMEOUT_SECONDS: float = 30
+    EMAIL_TEMPLATE_BYTECODE_CACHE_DIR: Optional[str] = None  # None: directorio temporal del sistema
+
+    # Campañas de email masivas (src/campaigns/sender.py)
+    CAMPAIGN_SMTP_CONNECTIONS: int = 4  # Conexiones SMTP propias de la campaña
+    CAMPAIGN_MAX_PER_SECOND: float = 10  # Tope global de envíos por segundo
+    CAMPAIGN_CURSOR_BATCH: int = 1000  # Filas por viaje del cursor de servidor
+    CAMPAIGN_CURSOR_SEGMENT: int = 5000  # Filas por cursor/transacción antes de abrir otro
+    CAMPAIGN_CHECKPOINT_EVERY: int = 500  # Envíos entre checkpoints
 
     PASSWORD_RESET_TOKEN_EXPIRE_MINUTES: int = 30
     PASSWORD_HISTORY_SIZE: int = 5
 
+    # Outbox de emails (src/auth/outbox.py)
+    EMAIL_OUTBOX_ENABLED: bool = True  # False para no lanzar el worker desde esta instancia
+    EMAIL_OUTBOX_POLL_SECONDS: float = 5  # Sondeo de reintentos; los emails nuevos despiertan al worker tras el commit
+    EMAIL_OUTBOX_BATCH_SIZE: int = 20  # Filas reclamadas por pasada
+    EMAIL_OUTBOX_CONCURRENCY: int = 4  # Envíos simultáneos por worker
+    EMAIL_OUTBOX_MAX_ATTEMPTS: int = 8  # Después la fila pasa a "dead"
+    EMAIL_OUTBOX_BACKOFF_BASE_SECONDS: int = 30
+    EMAIL_OUTBOX_BACKOFF_MAX_SECONDS: int = 3600
+    EMAIL_OUTBOX_SEND_TIMEOUT_SECONDS: int = 60
+    EMAIL_OUTBOX_LEASE_SECONDS: int = 120  # Debe superar el timeout de envío
+    EMAIL_OUTBOX_RETENTION_DAYS: int = 7  # Filas enviadas o descartadas que borra el job de retención
+
+    # Job de retención de password_history y email_outbox (src/auth/retention.py)
+    RETENTION_INTERVAL_MINUTES: int = 60  # 0 para no lanzarlo desde la app (p. ej. si se usa cron)
+    RETENTION_BATCH_SIZE: int = 5000  # Filas borradas por transacción
+
     DO_SPACES_KEY: str
     DO_SPACES_SECRET: str
     DO_SPACES_ENDPOINT: str
@@ -53,9 +123,41 @@ class Settings(BaseSettings):
     # Configuración de intentos de inicio de sesión y bloqueo
     MAX_LOGIN_ATTEMPTS: int = 5  # Número máximo de intentos fallidos antes de bloquear
     ACCOUNT_LOCKOUT_MINUTES: int = 15  # Tiempo de bloqueo en minutos
+    LOGIN_FAILURES_WINDOW_MINUTES: int = 24 * 60  # Los intentos fallidos se olvidan pasado este tiempo
+    COUNTER_STORE_URL: Optional[str] = None  # vacío = en memoria; shm://nombre = entre workers; redis://... = entre máquinas
+
+    # Rate limiting de los endpoints de autenticación: "<ámbito>:ip|email|global" -> "peticiones/segundos"
+    RATE_LIMIT_ENABLED: bool = True
+    RATE_LIMITS: Dict[str, str] = {
+        "login:ip": "20/60",
+        "login:email": "10/60",
+        "login:global": "100/1",
+        "register:ip": "10/3600",
+        "register:global": "20/1",
+        "password_reset:ip": "10/3600",
+        "password_reset:email": "3/3600",
+        "password_reset:global": "10/1",
+    }
+    RATE_LIMIT_TRUST_FORWARDED_FOR: bool = False  # Solo detrás de un proxy que añada X-Forwarded-For
+
+    # Caché del usuario autenticado en get_current_user (por proceso)
+    AUTH_USER_CACHE_TTL_SECONDS: int = 30  # 0 para desactivarla
+    AUTH_USER_CACHE_MAX_SIZE: int = 10_000
+
+    # Verificación de JWT
+    JWT_DECODER_BACKEND: Literal["jose", "pyjwt"] = "jose"  # Comparar con python -m benchmarks.jwt_decode
+    AUTH_TOKEN_CACHE_TTL_SECONDS: int = 300  # Nunca más allá del exp del token; 0 para desactivarla
+    AUTH_TOKEN_CACHE_MAX_SIZE: int = 10_000
 
     # Configuración de contraseñas
     MIN_PASSWORD_LENGTH: int = 8
+    PASSWORD_HASH_WORKERS: Optional[int] = None  # Procesos para bcrypt (None = núcleos disponibles)
+    PASSWORD_HASH_MAX_PENDING: int = 64  # Operaciones en cola o en curso antes de responder 503
+    PASSWORD_HASH_SCHEME: Literal["bcrypt", "argon2"] = "bcrypt"  # argon2 usa argon2id y requiere argon2-cffi
+    BCRYPT_ROUNDS: int = 12  # Coste de bcrypt; calibrar con python -m src.auth.calibrate
+    ARGON2_TIME_COST: int = 3
+    ARGON2_MEMORY_COST: int = 65536  # KiB por hash
+    ARGON2_PARALLELISM: int = 1  # El paralelismo ya lo da el pool de procesos
 
     # API Key para BuilderBot WhatsApp
     BUILDERBOT_API_KEY: str
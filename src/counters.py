@@ -0,0 +1,178 @@
+import asyncio
+import os
+import random
+import sqlite3
+import threading
+import time
+from abc import ABC, abstractmethod
+from collections import OrderedDict
+from typing import Optional
+
+from src.config import get_settings
+
+
+class CounterStore(ABC):
+    """
+    Contadores con expiración para estado efímero (intentos fallidos, límites de peticiones)
+    que no merece una escritura en la base de datos.
+    """
+
+    @abstractmethod
+    async def incr(self, key: str, ttl_seconds: int) -> int:
+        """Incrementa el contador; la expiración se fija al crearlo y no se renueva."""
+
+    @abstractmethod
+    async def get(self, key: str) -> int:
+        ...
+
+    @abstractmethod
+    async def delete(self, key: str) -> None:
+        ...
+
+
+class MemoryCounterStore(CounterStore):
+    """
+    Contadores en memoria del proceso. Cada worker cuenta por separado, así que con varios
+    workers los límites efectivos se multiplican; para compartirlos usar Redis.
+    """
+
+    def __init__(self, max_keys: int = 100_000):
+        self.max_keys = max_keys
+        self._lock = threading.Lock()
+        self._data: OrderedDict[str, tuple[int, float]] = OrderedDict()
+
+    async def incr(self, key: str, ttl_seconds: int) -> int:
+        now = time.monotonic()
+        with self._lock:
+            value, expires_at = self._data.get(key, (0, 0.0))
+            if expires_at <= now:
+                value, expires_at = 0, now + ttl_seconds
+            value += 1
+            self._data[key] = (value, expires_at)
+            # LRU: al llenarse se descarta la clave usada hace más tiempo, en O(1)
+            self._data.move_to_end(key)
+            if len(self._data) > self.max_keys:
+                self._data.popitem(last=False)
+            return value
+
+    async def get(self, key: str) -> int:
+        with self._lock:
+            value, expires_at = self._data.get(key, (0, 0.0))
+            if expires_at > time.monotonic():
+                return value
+            self._data.pop(key, None)
+            return 0
+
+    async def delete(self, key: str) -> None:
+        with self._lock:
+            self._data.pop(key, None)
+
+
+class SharedMemoryCounterStore(CounterStore):
+    """
+    Contadores compartidos por todos los workers de la misma máquina, en una base SQLite
+    sobre /dev/shm (memoria, sin disco). SQLite serializa las escrituras entre procesos y
+    cada operación es una única sentencia, así que no hace falta más sincronización.
+
+    sqlite3 es bloqueante (y con otro worker escribiendo puede esperar hasta el timeout),
+    así que las operaciones se ejecutan en el pool de hilos con asyncio.to_thread, con una
+    conexión por hilo.
+    """
+
+    CLEANUP_PROBABILITY = 0.001
+
+    def __init__(self, path: str):
+        self.path = path
+        self._local = threading.local()
+        with self._connection() as connection:
+            connection.execute("PRAGMA journal_mode=WAL")
+            connection.execute(
+                "CREATE TABLE IF NOT EXISTS counters (key TEXT PRIMARY KEY, value INTEGER NOT NULL, expires_at REAL NOT NULL)"
+            )
+
+    def _connection(self) -> sqlite3.Connection:
+        connection = getattr(self._local, "connection", None)
+        if connection is None:
+            connection = sqlite3.connect(self.path, timeout=1, isolation_level=None)
+            connection.execute("PRAGMA synchronous=OFF")
+            self._local.connection = connection
+        return connection
+
+    def _incr(self, key: str, ttl_seconds: int) -> int:
+        now = time.time()
+        connection = self._connection()
+        value = connection.execute(
+            """
+            INSERT INTO counters (key, value, expires_at) VALUES (?1, 1, ?2)
+            ON CONFLICT (key) DO UPDATE SET
+                value = CASE WHEN expires_at <= ?3 THEN 1 ELSE value + 1 END,
+                expires_at = CASE WHEN expires_at <= ?3 THEN excluded.expires_at ELSE expires_at END
+            RETURNING value
+            """,
+            (key, now + ttl_seconds, now),
+        ).fetchone()[0]
+        if random.random() < self.CLEANUP_PROBABILITY:
+            connection.execute("DELETE FROM counters WHERE expires_at <= ?", (now,))
+        return value
+
+    def _get(self, key: str) -> int:
+        row = self._connection().execute(
+            "SELECT value FROM counters WHERE key = ? AND expires_at > ?", (key, time.time())
+        ).fetchone()
+        return row[0] if row else 0
+
+    def _delete(self, key: str) -> None:
+        self._connection().execute("DELETE FROM counters WHERE key = ?", (key,))
+
+    async def incr(self, key: str, ttl_seconds: int) -> int:
+        return await asyncio.to_thread(self._incr, key, ttl_seconds)
+
+    async def get(self, key: str) -> int:
+        return await asyncio.to_thread(self._get, key)
+
+    async def delete(self, key: str) -> None:
+        await asyncio.to_thread(self._delete, key)
+
+
+class RedisCounterStore(CounterStore):
+    """Contadores compartidos entre workers en cualquier servidor compatible con Redis."""
+
+    def __init__(self, url: str, prefix: str = "ecostylo:"):
+        try:
+            import redis.asyncio as redis
+        except ImportError as e:
+            raise RuntimeError("Para usar un COUNTER_STORE_URL redis:// hay que instalar el paquete redis") from e
+        self.prefix = prefix
+        self._client = redis.from_url(url)
+
+    async def incr(self, key: str, ttl_seconds: int) -> int:
+        key = self.prefix + key
+        async with self._client.pipeline(transaction=True) as pipe:
+            # SET NX crea el contador con su expiración solo si no existía
+            pipe.set(key, 0, ex=ttl_seconds, nx=True)
+            pipe.incr(key)
+            _, value = await pipe.execute()
+        return int(value)
+
+    async def get(self, key: str) -> int:
+        value = await self._client.get(self.prefix + key)
+        return int(value) if value is not None else 0
+
+    async def delete(self, key: str) -> None:
+        await self._client.delete(self.prefix + key)
+
+
+def build_counter_store(url: Optional[str]) -> CounterStore:
+    """
+    vacío      -> en memoria del proceso
+    shm://name -> compartido entre workers de la máquina (/dev/shm/name.sqlite)
+    redis://.. -> compartido entre máquinas
+    """
+    if url and url.startswith(("redis://", "rediss://", "unix://")):
+        return RedisCounterStore(url)
+    if url and url.startswith("shm://"):
+        return SharedMemoryCounterStore(os.path.join("/dev/shm", url.removeprefix("shm://") + ".sqlite"))
+    return MemoryCounterStore()
+
+
+counter_store = build_counter_store(get_settings().COUNTER_STORE_URL)
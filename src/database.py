@@ -1,19 +1,160 @@
-from sqlalchemy import create_engine
-from sqlalchemy.orm import sessionmaker, declarative_base
+import threading
+import time
+from uuid import UUID, uuid4
+
+from sqlalchemy import Select
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker, create_async_engine
+from sqlalchemy.orm import Session, declarative_base
+from sqlalchemy.pool import NullPool
 
 from src.config import get_settings
+from src.monitoring.pool import InstrumentedAsyncAdaptedQueuePool, instrument_pool
+from src.monitoring.queries import instrument_queries, track_queries
 
 settings = get_settings()
 
-engine = create_engine(settings.DATABASE_URL)
-SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+
+def _pool_options() -> dict:
+    if settings.DB_PGBOUNCER_TRANSACTION_MODE:
+        # PgBouncer ya reparte las conexiones; un pool local solo retendría backends ajenos
+        return {"poolclass": NullPool, "query_cache_size": settings.DB_COMPILED_CACHE_SIZE}
+    return {
+        "query_cache_size": settings.DB_COMPILED_CACHE_SIZE,
+        "pool_size": settings.DB_POOL_SIZE,
+        "max_overflow": settings.DB_MAX_OVERFLOW,
+        "pool_timeout": settings.DB_POOL_TIMEOUT,
+        "pool_recycle": settings.DB_POOL_RECYCLE,
+        "pool_pre_ping": settings.DB_POOL_PRE_PING,
+    }
+
+
+def _async_engine_options(instrumented: bool = True) -> dict:
+    options = _pool_options()
+    if settings.DB_PGBOUNCER_TRANSACTION_MODE:
+        # En modo transacción los prepared statements no sobreviven entre transacciones.
+        # asyncpg sigue preparando sentencias con nombre aunque no las guarde; con nombres
+        # únicos no chocan con las que otro cliente dejó en el mismo backend de PgBouncer
+        options["connect_args"] = {
+            "statement_cache_size": 0,
+            "prepared_statement_cache_size": 0,
+            "prepared_statement_name_func": lambda: f"__asyncpg_{uuid4()}__",
+        }
+    else:
+        # Prepared statements del servidor reutilizados por conexión (caché LRU de asyncpg)
+        options["connect_args"] = {"prepared_statement_cache_size": settings.DB_PREPARED_STATEMENT_CACHE_SIZE}
+        if instrumented:
+            options["poolclass"] = InstrumentedAsyncAdaptedQueuePool
+    return options
+
+
+# Motor asíncrono (asyncpg) para los endpoints async: no bloquea el event loop
+async_engine = create_async_engine(settings.ASYNC_DATABASE_URL, **_async_engine_options())
+instrument_pool(async_engine.sync_engine)
+instrument_queries(async_engine.sync_engine)
+
+# Réplica de solo lectura; None si no está configurada
+replica_async_engine = (
+    create_async_engine(settings.ASYNC_REPLICA_DATABASE_URL, **_async_engine_options(instrumented=False))
+    if settings.ASYNC_REPLICA_DATABASE_URL
+    else None
+)
+if replica_async_engine is not None:
+    instrument_queries(replica_async_engine.sync_engine)
+
+
+class RoutingSession(Session):
+    """
+    Sesión que envía los SELECT a la réplica cuando se marca con info["use_replica"].
+    Los flush y cualquier escritura siempre van al primario.
+    """
+
+    def get_bind(self, mapper=None, clause=None, **kw):
+        # lambda_stmt(): se mira el Select que envuelve
+        statement = getattr(clause, "_resolved", clause)
+        if (
+            replica_async_engine is not None
+            and self.info.get("use_replica")
+            and not self._flushing
+            and isinstance(statement, Select)
+        ):
+            return replica_async_engine.sync_engine
+        return async_engine.sync_engine
+
+
+AsyncSessionLocal = async_sessionmaker(
+    class_=AsyncSession,
+    sync_session_class=RoutingSession,
+    autoflush=False,
+    expire_on_commit=False,
+)
 
 Base = declarative_base()
 
-# Dependency
-def get_db():
-    db = SessionLocal()
-    try:
-        yield db
-    finally:
-        db.close() 
\ No newline at end of file
+
+class _PrimaryPins:
+    """
+    Recuerda qué usuarios escribieron hace poco para leer sus datos del primario
+    (read-your-writes) mientras la réplica se pone al día. Es por proceso.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._until: dict[UUID, float] = {}
+
+    def pin(self, user_id: UUID) -> None:
+        now = time.monotonic()
+        with self._lock:
+            if len(self._until) > 10_000:
+                self._until = {k: v for k, v in self._until.items() if v > now}
+            self._until[user_id] = now + settings.DB_REPLICA_READ_YOUR_WRITES_SECONDS
+
+    def is_pinned(self, user_id: UUID) -> bool:
+        with self._lock:
+            until = self._until.get(user_id)
+            if until is None:
+                return False
+            if until <= time.monotonic():
+                del self._until[user_id]
+                return False
+            return True
+
+
+primary_pins = _PrimaryPins()
+
+
+def mark_user_write(user_id: UUID) -> None:
+    primary_pins.pin(user_id)
+
+
+def use_replica(db: AsyncSession, user_id: UUID | None = None) -> AsyncSession:
+    """
+    Marca la sesión para leer de la réplica, salvo que el usuario haya escrito recientemente.
+    """
+    db.info["use_replica"] = user_id is None or not primary_pins.is_pinned(user_id)
+    return db
+
+async def commit_now(db: AsyncSession) -> None:
+    """
+    Confirma ya lo pendiente en la sesión, fuera de la unidad de trabajo de la petición.
+    Solo para cambios que deben persistir aunque la petición termine en error
+    (p. ej. contadores de intentos fallidos y bloqueos).
+    """
+    await db.commit()
+
+# Dependency asíncrona: una sola transacción por petición (unidad de trabajo).
+# Los servicios solo hacen flush; aquí se confirma al final o se revierte si hubo error.
+async def get_async_db():
+    async with AsyncSessionLocal() as db:
+        with track_queries():
+            try:
+                yield db
+                await db.commit()
+            except Exception:
+                await db.rollback()
+                raise
+
+# Dependency asíncrona de solo lectura (réplica si está configurada)
+async def get_read_db():
+    async with AsyncSessionLocal() as db:
+        with track_queries():
+            yield use_replica(db)
@@ -49,6 +49,14 @@ class ForbiddenError(BaseAPIException):
             detail=detail
         )
 
+class RateLimitExceeded(BaseAPIException):
+    def __init__(self, retry_after: int):
+        super().__init__(
+            status_code=status.HTTP_429_TOO_MANY_REQUESTS,
+            detail="Demasiadas solicitudes. Por favor, espera antes de intentarlo nuevamente.",
+            headers={"Retry-After": str(retry_after)}
+        )
+
 class AuthException(HTTPException):
     def __init__(self, detail: str, status_code: int = status.HTTP_400_BAD_REQUEST):
         super().__init__(status_code=status_code, detail=detail)
@@ -1,3 +1,6 @@
+import asyncio
+from contextlib import asynccontextmanager
+
 from fastapi import FastAPI, Request
 from fastapi.middleware.cors import CORSMiddleware
 from fastapi.responses import HTMLResponse
@@ -7,19 +10,43 @@ from fastapi.exceptions import RequestValidationError
 from fastapi.responses import JSONResponse
 import os
 
+from src.auth.emails import email_service
+from src.auth.hashing import password_hasher
+from src.auth.outbox import email_outbox
+from src.auth.retention import retention_loop
 from src.auth.router import router as auth_router
 from src.config import get_settings
+from src.monitoring.context import RequestContextMiddleware
+from src.monitoring.router import router as monitoring_router
 from src.store.router import router as store_router
 
 settings = get_settings()
 
 oauth2_scheme = OAuth2PasswordBearer(tokenUrl="/auth/token")
 
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # Arrancar los procesos de hashing antes de la primera petición de login
+    password_hasher.start()
+    # Compilar las plantillas de email antes del primer envío
+    email_service.precompile()
+    retention_task = asyncio.create_task(retention_loop()) if settings.RETENTION_INTERVAL_MINUTES > 0 else None
+    outbox_task = asyncio.create_task(email_outbox.run()) if settings.EMAIL_OUTBOX_ENABLED else None
+    yield
+    for task in (retention_task, outbox_task):
+        if task is not None:
+            task.cancel()
+    await email_service.smtp_pool.close()
+    password_hasher.shutdown()
+
+
 app = FastAPI(
     title="API de EcoStylo ",
     description="API para manejo de autenticación, usuarios y compras",
     version="1.0.0",
     swagger_ui_parameters={"defaultModelsExpandDepth": -1},
+    lifespan=lifespan,
 )
 
 app.add_middleware(
@@ -29,11 +56,13 @@ app.add_middleware(
     allow_methods=["*"],
     allow_headers=["*"],
 )
+app.add_middleware(RequestContextMiddleware)
 
 app.swagger_ui_init_oauth = {"usePkceWithAuthorizationCodeGrant": True}
 
 app.include_router(auth_router)
 app.include_router(store_router)
+app.include_router(monitoring_router)
 
 # Usar ruta absoluta para los templates
 templates_path = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "templates")
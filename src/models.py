@@ -9,5 +9,6 @@ class TimestampMixin:
     updated_at = Column(DateTime(timezone=True), onupdate=func.now())
 
 # Import all models to ensure they are registered with SQLAlchemy
-from src.auth.models import User, PasswordHistory, UsedToken
+from src.auth.models import User, PasswordHistory, EmailOutbox
 from src.store.models import Product, Cart, CartProduct, Order, OrderProduct
+from src.campaigns.models import EmailCampaign
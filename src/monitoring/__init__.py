@@ -0,0 +1,3 @@
+from src.monitoring.pool import pool_monitor
+from src.monitoring.queries import query_monitor
+from src.monitoring.slow_queries import slow_query_log
@@ -0,0 +1,36 @@
+from contextvars import ContextVar
+from typing import Optional
+
+# Scope ASGI de la petición en curso; Starlette completa scope["route"] al enrutar
+request_scope: ContextVar[Optional[dict]] = ContextVar("request_scope", default=None)
+
+
+def get_route_label() -> str:
+    """
+    Devuelve "METODO /ruta/{param}" para la petición actual, o "-" fuera de una petición.
+    Se usa la plantilla de la ruta para no generar una etiqueta por cada UUID.
+    """
+    scope = request_scope.get()
+    if scope is None:
+        return "-"
+    route = scope.get("route")
+    path = getattr(route, "path", None) or scope.get("path", "-")
+    return f"{scope.get('method', '')} {path}".strip()
+
+
+class RequestContextMiddleware:
+    """
+    Middleware ASGI que expone el scope de la petición a los eventos del engine.
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            return await self.app(scope, receive, send)
+        token = request_scope.set(scope)
+        try:
+            await self.app(scope, receive, send)
+        finally:
+            request_scope.reset(token)
@@ -0,0 +1,10 @@
+from fastapi import Depends, HTTPException
+
+from src.auth import schemas
+from src.auth.service import get_current_user
+
+
+async def get_current_superuser(current_user: schemas.User = Depends(get_current_user)) -> schemas.User:
+    if not current_user.is_superuser:
+        raise HTTPException(status_code=403, detail="No autorizado")
+    return current_user
@@ -0,0 +1,134 @@
+import logging
+import threading
+import time
+from bisect import bisect_left
+
+from sqlalchemy import event, exc
+from sqlalchemy.pool import AsyncAdaptedQueuePool
+
+from src.config import get_settings
+from src.monitoring.context import get_route_label
+
+settings = get_settings()
+logger = logging.getLogger(__name__)
+
+# Límites superiores (ms) de los buckets del histograma de espera
+WAIT_BUCKETS_MS = (1, 5, 10, 25, 50, 100, 250, 500, 1000, 5000)
+
+
+class PoolMonitor:
+    """
+    Métricas en vivo del pool: espera para obtener conexión y tiempo que cada ruta la retiene.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.pool = None
+        self.reset()
+
+    def reset(self) -> None:
+        with self._lock:
+            self.wait_buckets = [0] * (len(WAIT_BUCKETS_MS) + 1)
+            self.wait_count = 0
+            self.wait_total_ms = 0.0
+            self.wait_max_ms = 0.0
+            self.timeouts = 0
+            self.hold_by_route: dict[str, dict] = {}
+
+    def record_wait(self, seconds: float) -> None:
+        ms = seconds * 1000
+        with self._lock:
+            self.wait_buckets[bisect_left(WAIT_BUCKETS_MS, ms)] += 1
+            self.wait_count += 1
+            self.wait_total_ms += ms
+            self.wait_max_ms = max(self.wait_max_ms, ms)
+        if ms >= settings.DB_POOL_WAIT_WARNING_MS:
+            logger.warning(f"Espera de {ms:.0f} ms para obtener conexión del pool ({get_route_label()})")
+
+    def record_timeout(self) -> None:
+        with self._lock:
+            self.timeouts += 1
+        logger.error(f"Timeout esperando conexión del pool ({get_route_label()}): {self.status()}")
+
+    def record_hold(self, route: str, seconds: float) -> None:
+        ms = seconds * 1000
+        with self._lock:
+            stats = self.hold_by_route.setdefault(route, {"count": 0, "total_ms": 0.0, "max_ms": 0.0})
+            stats["count"] += 1
+            stats["total_ms"] += ms
+            stats["max_ms"] = max(stats["max_ms"], ms)
+
+    def status(self) -> str:
+        return self.pool.status() if self.pool is not None else "sin pool"
+
+    def snapshot(self, top: int = 10) -> dict:
+        pool = self.pool
+        with self._lock:
+            buckets = [f"<={limit}ms" for limit in WAIT_BUCKETS_MS] + [f">{WAIT_BUCKETS_MS[-1]}ms"]
+            leaderboard = sorted(
+                (
+                    {
+                        "route": route,
+                        "count": stats["count"],
+                        "total_ms": round(stats["total_ms"], 2),
+                        "avg_ms": round(stats["total_ms"] / stats["count"], 2),
+                        "max_ms": round(stats["max_ms"], 2),
+                    }
+                    for route, stats in self.hold_by_route.items()
+                ),
+                key=lambda item: item["total_ms"],
+                reverse=True,
+            )[:top]
+            return {
+                "pool_class": type(pool).__name__ if pool is not None else None,
+                "size": pool.size() if hasattr(pool, "size") else None,
+                "checked_out": pool.checkedout() if hasattr(pool, "checkedout") else None,
+                "checked_in": pool.checkedin() if hasattr(pool, "checkedin") else None,
+                "overflow": pool.overflow() if hasattr(pool, "overflow") else None,
+                "timeouts": self.timeouts,
+                "wait": {
+                    "count": self.wait_count,
+                    "avg_ms": round(self.wait_total_ms / self.wait_count, 2) if self.wait_count else 0.0,
+                    "max_ms": round(self.wait_max_ms, 2),
+                    "histogram": dict(zip(buckets, self.wait_buckets)),
+                },
+                "hold_leaderboard": leaderboard,
+            }
+
+
+pool_monitor = PoolMonitor()
+
+
+class InstrumentedAsyncAdaptedQueuePool(AsyncAdaptedQueuePool):
+    """
+    Pool asíncrono que mide cuánto espera cada checkout y cuenta los timeouts.
+    """
+
+    def _do_get(self):
+        start = time.perf_counter()
+        try:
+            return super()._do_get()
+        except exc.TimeoutError:
+            pool_monitor.record_timeout()
+            raise
+        finally:
+            pool_monitor.record_wait(time.perf_counter() - start)
+
+
+def instrument_pool(engine) -> None:
+    """
+    Registra los eventos de checkout/checkin para medir el tiempo de retención por ruta.
+    """
+    pool_monitor.pool = engine.pool
+
+    @event.listens_for(engine, "checkout")
+    def _on_checkout(dbapi_connection, connection_record, connection_proxy):
+        connection_record.info["checkout_at"] = time.perf_counter()
+        connection_record.info["checkout_route"] = get_route_label()
+
+    @event.listens_for(engine, "checkin")
+    def _on_checkin(dbapi_connection, connection_record):
+        checkout_at = connection_record.info.pop("checkout_at", None)
+        route = connection_record.info.pop("checkout_route", "-")
+        if checkout_at is not None:
+            pool_monitor.record_hold(route, time.perf_counter() - checkout_at)
@@ -0,0 +1,151 @@
+import logging
+import threading
+import time
+from collections import Counter
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Optional
+
+from sqlalchemy import event
+
+from src.config import get_settings
+from src.monitoring.context import get_route_label
+from src.monitoring.slow_queries import slow_query_log
+
+settings = get_settings()
+logger = logging.getLogger(__name__)
+
+
+class QueryBudgetExceeded(RuntimeError):
+    """
+    Se lanza en modo estricto cuando una ruta supera su presupuesto de consultas.
+    """
+
+
+class QueryStats:
+    """
+    Consultas emitidas durante una petición: total, tiempo en BD y repeticiones por SQL.
+    """
+
+    def __init__(self, route: str):
+        self.route = route
+        self.count = 0
+        self.total_ms = 0.0
+        self.statements: Counter[str] = Counter()
+
+    @property
+    def budget(self) -> int:
+        return settings.DB_QUERY_BUDGETS.get(self.route, settings.DB_QUERY_BUDGET)
+
+    def record(self, statement: str, seconds: float) -> None:
+        self.count += 1
+        self.total_ms += seconds * 1000
+        self.statements[statement] += 1
+        if settings.DB_QUERY_STRICT and 0 < self.budget < self.count:
+            raise QueryBudgetExceeded(
+                f"{self.route} superó su presupuesto de {self.budget} consultas"
+            )
+
+    def n_plus_one_candidates(self) -> dict[str, int]:
+        threshold = settings.DB_N_PLUS_ONE_THRESHOLD
+        return {sql: n for sql, n in self.statements.items() if n >= threshold}
+
+
+current_query_stats: ContextVar[Optional[QueryStats]] = ContextVar("current_query_stats", default=None)
+
+
+class QueryMonitor:
+    """
+    Agregado por ruta de las estadísticas de cada petición.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.reset()
+
+    def reset(self) -> None:
+        with self._lock:
+            self.routes: dict[str, dict] = {}
+
+    def record_request(self, stats: QueryStats) -> None:
+        candidates = stats.n_plus_one_candidates()
+        with self._lock:
+            route = self.routes.setdefault(
+                stats.route,
+                {"requests": 0, "queries": 0, "max_queries": 0, "db_ms": 0.0, "n_plus_one": {}},
+            )
+            route["requests"] += 1
+            route["queries"] += stats.count
+            route["max_queries"] = max(route["max_queries"], stats.count)
+            route["db_ms"] += stats.total_ms
+            for sql, n in candidates.items():
+                route["n_plus_one"][sql] = max(route["n_plus_one"].get(sql, 0), n)
+
+    def snapshot(self) -> list[dict]:
+        with self._lock:
+            return sorted(
+                (
+                    {
+                        "route": name,
+                        "requests": route["requests"],
+                        "avg_queries": round(route["queries"] / route["requests"], 2),
+                        "max_queries": route["max_queries"],
+                        "avg_db_ms": round(route["db_ms"] / route["requests"], 2),
+                        "n_plus_one": [
+                            {"statement": sql, "repetitions": n}
+                            for sql, n in sorted(route["n_plus_one"].items(), key=lambda item: -item[1])
+                        ],
+                    }
+                    for name, route in self.routes.items()
+                ),
+                key=lambda item: item["avg_queries"],
+                reverse=True,
+            )
+
+
+query_monitor = QueryMonitor()
+
+
+@contextmanager
+def track_queries():
+    """
+    Cuenta las consultas ejecutadas dentro del bloque. Si ya hay un contador activo
+    (varias sesiones en la misma petición), se reutiliza.
+    """
+    if current_query_stats.get() is not None:
+        yield current_query_stats.get()
+        return
+    stats = QueryStats(get_route_label())
+    current_query_stats.set(stats)
+    try:
+        yield stats
+    finally:
+        current_query_stats.set(None)
+        query_monitor.record_request(stats)
+        for sql, n in stats.n_plus_one_candidates().items():
+            logger.warning(f"Posible N+1 en {stats.route}: {n} ejecuciones de {sql[:200]!r}")
+        logger.debug(f"{stats.route}: {stats.count} consultas, {stats.total_ms:.1f} ms en BD")
+
+
+def instrument_queries(engine) -> None:
+    """
+    Registra los eventos que alimentan el contador de la petición activa.
+    """
+
+    @event.listens_for(engine, "before_cursor_execute")
+    def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        conn.info.setdefault("query_start", []).append(time.perf_counter())
+
+    @event.listens_for(engine, "after_cursor_execute")
+    def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        elapsed = time.perf_counter() - conn.info["query_start"].pop()
+        slow_query_log.maybe_record(conn, statement, parameters, executemany, elapsed)
+        stats = current_query_stats.get()
+        if stats is not None:
+            stats.record(statement, elapsed)
+
+    @event.listens_for(engine, "handle_error")
+    def _handle_error(exception_context):
+        connection = exception_context.connection
+        if connection is not None and connection.info.get("query_start"):
+            connection.info["query_start"].pop()
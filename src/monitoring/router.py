@@ -0,0 +1,95 @@
+from fastapi import APIRouter, Depends, Query
+
+from src.auth.emails import email_service
+from src.auth.hashing import password_hasher
+from src.auth.outbox import email_outbox
+from src.cache import caches
+from src.monitoring import schemas
+from src.monitoring.dependencies import get_current_superuser
+from src.monitoring.pool import pool_monitor
+from src.monitoring.queries import query_monitor
+from src.monitoring.slow_queries import slow_query_log
+from src.rate_limit import rate_limiter
+
+router = APIRouter(prefix="/monitoring", tags=["monitoring"], dependencies=[Depends(get_current_superuser)])
+
+
+@router.get("/pool", response_model=schemas.PoolStats, summary="Estado del pool de conexiones")
+async def pool_stats(top: int = Query(10, ge=1, le=100)):
+    return pool_monitor.snapshot(top=top)
+
+
+@router.delete("/pool", status_code=204, summary="Reiniciar métricas del pool")
+async def reset_pool_stats():
+    pool_monitor.reset()
+
+
+@router.get("/hashing", response_model=schemas.HashingStats, summary="Cola y latencia del pool de hashing de contraseñas")
+async def hashing_stats():
+    return password_hasher.snapshot()
+
+
+@router.delete("/hashing", status_code=204, summary="Reiniciar métricas del pool de hashing")
+async def reset_hashing_stats():
+    password_hasher.reset()
+
+
+@router.get("/queries", response_model=list[schemas.RouteQueryStats], summary="Consultas por ruta y posibles N+1")
+async def query_stats():
+    return query_monitor.snapshot()
+
+
+@router.delete("/queries", status_code=204, summary="Reiniciar métricas de consultas")
+async def reset_query_stats():
+    query_monitor.reset()
+
+
+@router.get("/slow-queries", response_model=list[schemas.SlowQuery], summary="Consultas lentas recientes")
+async def slow_queries(limit: int = Query(50, ge=1, le=200)):
+    return slow_query_log.snapshot(limit=limit)
+
+
+@router.delete("/slow-queries", status_code=204, summary="Vaciar el registro de consultas lentas en memoria")
+async def reset_slow_queries():
+    slow_query_log.reset()
+
+
+@router.get("/caches", response_model=list[schemas.CacheStats], summary="Aciertos y fallos de las cachés en memoria")
+async def cache_stats():
+    return [cache.stats() for cache in caches.values()]
+
+
+@router.delete("/caches", status_code=204, summary="Reiniciar contadores de las cachés")
+async def reset_cache_stats():
+    for cache in caches.values():
+        cache.reset()
+
+
+@router.get("/rate-limits", response_model=list[schemas.RateLimitStats], summary="Peticiones admitidas y rechazadas por regla")
+async def rate_limit_stats():
+    return rate_limiter.snapshot()
+
+
+@router.delete("/rate-limits", status_code=204, summary="Reiniciar métricas de rate limiting")
+async def reset_rate_limit_stats():
+    rate_limiter.reset()
+
+
+@router.get("/email-outbox", response_model=schemas.EmailOutboxStats, summary="Envíos, reintentos y descartes del outbox de emails")
+async def email_outbox_stats():
+    return email_outbox.snapshot()
+
+
+@router.delete("/email-outbox", status_code=204, summary="Reiniciar métricas del outbox de emails")
+async def reset_email_outbox_stats():
+    email_outbox.reset()
+
+
+@router.get("/smtp", response_model=schemas.SMTPPoolStats, summary="Estado del pool de conexiones SMTP")
+async def smtp_pool_stats():
+    return email_service.smtp_pool.snapshot()
+
+
+@router.delete("/smtp", status_code=204, summary="Reiniciar métricas del pool SMTP")
+async def reset_smtp_pool_stats():
+    email_service.smtp_pool.reset()
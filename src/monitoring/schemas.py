@@ -0,0 +1,103 @@
+from typing import Any, Optional
+from pydantic import BaseModel
+
+
+class PoolWaitStats(BaseModel):
+    count: int
+    avg_ms: float
+    max_ms: float
+    histogram: dict[str, int]
+
+
+class HashingStats(BaseModel):
+    workers: int
+    max_pending: int
+    pending: int
+    peak_pending: int
+    completed: int
+    rejected: int
+    wait: PoolWaitStats
+    run: PoolWaitStats
+
+
+class RouteHoldStats(BaseModel):
+    route: str
+    count: int
+    total_ms: float
+    avg_ms: float
+    max_ms: float
+
+
+class PoolStats(BaseModel):
+    pool_class: Optional[str] = None
+    size: Optional[int] = None
+    checked_out: Optional[int] = None
+    checked_in: Optional[int] = None
+    overflow: Optional[int] = None
+    timeouts: int
+    wait: PoolWaitStats
+    hold_leaderboard: list[RouteHoldStats]
+
+
+class RepeatedStatement(BaseModel):
+    statement: str
+    repetitions: int
+
+
+class RouteQueryStats(BaseModel):
+    route: str
+    requests: int
+    avg_queries: float
+    max_queries: int
+    avg_db_ms: float
+    n_plus_one: list[RepeatedStatement]
+
+
+class SlowQuery(BaseModel):
+    timestamp: str
+    duration_ms: float
+    route: str
+    caller: str
+    statement: str
+    parameters: Any
+    plan: Optional[str] = None
+
+
+class CacheStats(BaseModel):
+    name: str
+    size: int
+    max_size: int
+    ttl_seconds: float
+    hits: int
+    misses: int
+    hit_ratio: float
+
+
+class RateLimitStats(BaseModel):
+    rule: str
+    limit: int
+    window_seconds: int
+    allowed: int
+    rejected: int
+    errors: int
+
+
+class EmailOutboxStats(BaseModel):
+    claimed: int
+    sent: int
+    retried: int
+    dead: int
+    errors: int
+    last_error: Optional[str] = None
+
+
+class SMTPPoolStats(BaseModel):
+    size: int
+    idle: int
+    in_use: int
+    connections_opened: int
+    connections_reused: int
+    connections_discarded: int
+    healthcheck_failures: int
+    reconnects: int
+    messages_sent: int
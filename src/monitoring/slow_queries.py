@@ -0,0 +1,200 @@
+import asyncio
+import json
+import logging
+import os
+import random
+import re
+import sys
+import threading
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timezone
+from logging.handlers import RotatingFileHandler
+
+import greenlet
+from sqlalchemy.ext.asyncio import AsyncEngine
+
+from src.config import get_settings
+from src.monitoring.context import get_route_label
+
+settings = get_settings()
+logger = logging.getLogger(__name__)
+
+# Módulos propios que no cuentan como "llamador" de la consulta
+_INFRA_MODULES = ("src.database", "src.monitoring")
+# SELECT ... FOR UPDATE/SHARE: con ANALYZE volvería a tomar los bloqueos
+_LOCKING_CLAUSE = re.compile(r"\bFOR\s+(NO\s+KEY\s+UPDATE|UPDATE|KEY\s+SHARE|SHARE)\b", re.IGNORECASE)
+
+
+def _redact(parameters):
+    """
+    Sustituye los valores de los parámetros por su tipo: nunca se guardan emails ni hashes.
+    """
+    if isinstance(parameters, dict):
+        return {key: f"<{type(value).__name__}>" for key, value in parameters.items()}
+    if isinstance(parameters, (list, tuple)):
+        return [f"<{type(value).__name__}>" for value in parameters]
+    return f"<{type(parameters).__name__}>"
+
+
+def _find_caller() -> str:
+    """
+    Busca la primera función de la aplicación en la pila. Con el engine async la consulta
+    corre en un greenlet hijo, así que se recorren también los frames del greenlet padre.
+    """
+    current = greenlet.getcurrent()
+    glet = current
+    while glet is not None:
+        frame = sys._getframe() if glet is current else glet.gr_frame
+        while frame is not None:
+            module = frame.f_globals.get("__name__", "")
+            if module.startswith("src.") and not module.startswith(_INFRA_MODULES):
+                return f"{module}.{frame.f_code.co_name}"
+            frame = frame.f_back
+        glet = glet.parent
+    return "-"
+
+
+class SlowQueryLog:
+    """
+    Registra las sentencias que superan DB_SLOW_QUERY_MS en un fichero rotativo y en memoria.
+
+    El plan de las consultas muestreadas se captura fuera de la petición, en segundo plano y
+    con una conexión propia del mismo engine, para no alargar más la petición que ya fue
+    lenta. La entrada se publica en memoria al momento y en el fichero cuando llega el plan.
+    """
+
+    # EXPLAIN pendientes como máximo; por encima se descartan los planes
+    MAX_PENDING_EXPLAINS = 4
+
+    def __init__(self, maxlen: int = 200):
+        self._lock = threading.Lock()
+        self.recent: deque[dict] = deque(maxlen=maxlen)
+        self._file_logger = None
+        self._pending_explains = 0
+        self._tasks: set[asyncio.Task] = set()
+        self._executor: ThreadPoolExecutor | None = None
+
+    def _get_file_logger(self):
+        if self._file_logger is None and settings.DB_SLOW_QUERY_LOG_FILE:
+            directory = os.path.dirname(settings.DB_SLOW_QUERY_LOG_FILE)
+            if directory:
+                os.makedirs(directory, exist_ok=True)
+            handler = RotatingFileHandler(
+                settings.DB_SLOW_QUERY_LOG_FILE,
+                maxBytes=settings.DB_SLOW_QUERY_LOG_MAX_BYTES,
+                backupCount=settings.DB_SLOW_QUERY_LOG_BACKUPS,
+                encoding="utf-8",
+            )
+            file_logger = logging.getLogger(f"{__name__}.file")
+            file_logger.addHandler(handler)
+            file_logger.setLevel(logging.INFO)
+            file_logger.propagate = False
+            self._file_logger = file_logger
+        return self._file_logger
+
+    def maybe_record(self, conn, statement, parameters, executemany, seconds: float) -> None:
+        duration_ms = seconds * 1000
+        if duration_ms < settings.DB_SLOW_QUERY_MS:
+            return
+        entry = {
+            "timestamp": datetime.now(timezone.utc).isoformat(),
+            "duration_ms": round(duration_ms, 2),
+            "route": get_route_label(),
+            "caller": _find_caller(),
+            "statement": statement,
+            "parameters": _redact(parameters),
+            "plan": None,
+        }
+        with self._lock:
+            self.recent.append(entry)
+        logger.warning(f"Consulta lenta ({entry['duration_ms']} ms) en {entry['caller']}")
+        sampled = not executemany and random.random() < settings.DB_SLOW_QUERY_EXPLAIN_SAMPLE_RATE
+        if not (sampled and self._schedule_explain(conn.engine, entry, statement, parameters)):
+            self._write_file(entry)
+
+    def _write_file(self, entry: dict) -> None:
+        file_logger = self._get_file_logger()
+        if file_logger is not None:
+            file_logger.info(json.dumps(entry, ensure_ascii=False, default=str))
+
+    def _schedule_explain(self, engine, entry: dict, statement: str, parameters) -> bool:
+        """Programa la captura del plan; False si ya hay demasiadas pendientes."""
+        with self._lock:
+            if self._pending_explains >= self.MAX_PENDING_EXPLAINS:
+                return False
+            self._pending_explains += 1
+        if engine.dialect.is_async:
+            # El evento se ejecuta en un greenlet del propio event loop
+            try:
+                loop = asyncio.get_running_loop()
+            except RuntimeError:
+                with self._lock:
+                    self._pending_explains -= 1
+                return False
+            task = loop.create_task(self._explain_async(engine, entry, statement, parameters))
+            self._tasks.add(task)
+            task.add_done_callback(self._tasks.discard)
+        else:
+            if self._executor is None:
+                self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="slow-query-explain")
+            self._executor.submit(self._explain_sync, engine, entry, statement, parameters)
+        return True
+
+    async def _explain_async(self, engine, entry: dict, statement: str, parameters) -> None:
+        try:
+            async with AsyncEngine(engine).connect() as conn:
+                entry["plan"] = await conn.run_sync(self._explain, statement, parameters)
+        except Exception as e:
+            logger.warning(f"No se pudo capturar el plan de la consulta lenta: {e}")
+        finally:
+            self._explain_done(entry)
+
+    def _explain_sync(self, engine, entry: dict, statement: str, parameters) -> None:
+        try:
+            with engine.connect() as conn:
+                entry["plan"] = self._explain(conn, statement, parameters)
+        except Exception as e:
+            logger.warning(f"No se pudo capturar el plan de la consulta lenta: {e}")
+        finally:
+            self._explain_done(entry)
+
+    def _explain_done(self, entry: dict) -> None:
+        with self._lock:
+            self._pending_explains -= 1
+        self._write_file(entry)
+
+    @staticmethod
+    def _explain(conn, statement: str, parameters) -> str:
+        """
+        EXPLAIN sin ejecutar la sentencia. Con DB_SLOW_QUERY_EXPLAIN_ANALYZE se usa ANALYZE
+        (que sí la ejecuta) solo en SELECT que no bloquean filas; aun así un SELECT que llame
+        a funciones con efectos (p. ej. nextval) los repite. La conexión es propia y se
+        devuelve al pool con ROLLBACK, y el cursor es el del driver, así que el EXPLAIN no
+        vuelve a pasar por los eventos de monitorización.
+        """
+        analyze = (
+            settings.DB_SLOW_QUERY_EXPLAIN_ANALYZE
+            and statement.lstrip().upper().startswith("SELECT")
+            and not _LOCKING_CLAUSE.search(statement)
+        )
+        options = "ANALYZE, BUFFERS, FORMAT TEXT" if analyze else "FORMAT TEXT"
+        explain_cursor = conn.connection.cursor()
+        try:
+            explain_cursor.execute(f"EXPLAIN ({options}) {statement}", parameters)
+            return "\n".join(row[0] for row in explain_cursor.fetchall())
+        except Exception as e:
+            return f"EXPLAIN falló: {e}"
+        finally:
+            explain_cursor.close()
+
+    def snapshot(self, limit: int = 50) -> list[dict]:
+        with self._lock:
+            return list(self.recent)[-limit:][::-1]
+
+    def reset(self) -> None:
+        with self._lock:
+            self.recent.clear()
+
+
+slow_query_log = SlowQueryLog()
@@ -1,29 +1,223 @@
-from typing import Generic, TypeVar, Optional
+"""
+Paginación por cursor (keyset) para cualquier select() de SQLAlchemy.
+
+Cada página continúa a partir de los valores de orden de la última fila devuelta
+(WHERE (orden, desempate) > (valores del cursor)), así que el coste no crece con la
+profundidad como con OFFSET. El desempate (normalmente la PK) hace el orden total y
+estable aunque varias filas compartan valor.
+
+Los cursores son opacos y van firmados con SECRET_KEY; además incluyen una huella de la
+consulta (filtros y orden), de modo que un cursor no se puede manipular ni reutilizar en
+otro listado o con otros filtros.
+
+El total es opcional:
+    none       sin total (por defecto): una sola consulta por página
+    exact      COUNT(*) de la consulta sin paginar
+    estimated  estimación del planificador: pg_class.reltuples si la consulta es una tabla
+               sin filtros, si no las filas estimadas por EXPLAIN; no recorre la tabla
+"""
+import base64
+import hashlib
+import hmac
+import json
+from datetime import date, datetime
+from decimal import Decimal
+from typing import Any, Generic, Literal, NamedTuple, Optional, Sequence, TypeVar
+from uuid import UUID
+
+from fastapi import HTTPException, Query
 from pydantic import BaseModel
+from sqlalchemy import Select, Table, and_, func, or_, select, text, tuple_
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.ext.compiler import compiles
+from sqlalchemy.sql.elements import ColumnElement
+from sqlalchemy.sql.expression import ClauseElement, Executable
+
+from src.config import get_settings
+
+settings = get_settings()
 
 T = TypeVar('T')
 
-class PaginationParams(BaseModel):
-    page: int = 1
-    size: int = 10
+TotalMode = Literal["none", "exact", "estimated"]
+
+
+class SortKey(NamedTuple):
+    column: ColumnElement
+    descending: bool = False
 
-class PaginatedResponse(BaseModel, Generic[T]):
+
+class CursorPage(BaseModel, Generic[T]):
     items: list[T]
-    total: int
-    page: int
-    size: int
-    pages: int
-
-def paginate(
-    items: list[T],
-    total: int,
-    page: int,
-    size: int
-) -> PaginatedResponse[T]:
-    return PaginatedResponse[T](
-        items=items,
-        total=total,
-        page=page,
-        size=size,
-        pages=(total + size - 1) // size
-    ) 
\ No newline at end of file
+    next_cursor: Optional[str] = None  # None en la última página
+    total: Optional[int] = None
+    total_is_estimate: bool = False
+
+
+class CursorParams:
+    """Parámetros de consulta comunes de los listados paginados (usar con Depends())."""
+
+    def __init__(
+        self,
+        limit: int = Query(20, ge=1, le=100),
+        cursor: Optional[str] = Query(None, description="next_cursor de la página anterior"),
+        total: TotalMode = Query("none", description="none, exact (COUNT) o estimated (estadísticas del planificador)"),
+    ):
+        self.limit = limit
+        self.cursor = cursor
+        self.total = total
+
+
+class _Explain(Executable, ClauseElement):
+    inherit_cache = False
+
+    def __init__(self, statement: Select):
+        self.statement = statement
+
+
+@compiles(_Explain, "postgresql")
+def _compile_explain(element: _Explain, compiler, **kw) -> str:
+    return "EXPLAIN (FORMAT JSON) " + compiler.process(element.statement, **kw)
+
+
+def _dump(value: Any) -> Any:
+    if isinstance(value, datetime):
+        return {"dt": value.isoformat()}
+    if isinstance(value, date):
+        return {"d": value.isoformat()}
+    if isinstance(value, UUID):
+        return {"u": str(value)}
+    if isinstance(value, Decimal):
+        return {"n": str(value)}
+    return value
+
+
+def _load(value: Any) -> Any:
+    if isinstance(value, dict):
+        (kind, raw), = value.items()
+        return {"dt": datetime.fromisoformat, "d": date.fromisoformat, "u": UUID, "n": Decimal}[kind](raw)
+    return value
+
+
+def _signature(payload: str) -> str:
+    digest = hmac.new(settings.SECRET_KEY.encode(), payload.encode(), hashlib.sha256).digest()[:16]
+    return base64.urlsafe_b64encode(digest).decode().rstrip("=")
+
+
+# Forma de la consulta (cache key de SQLAlchemy) -> su SQL compilado: compilar en cada
+# página costaría más que la propia consulta por índice
+_SHAPE_SQL: dict[tuple, str] = {}
+_SHAPE_SQL_MAX = 512
+
+
+def _fingerprint(stmt: Select) -> str:
+    """Huella del SQL y de los valores de sus parámetros; estable entre procesos."""
+    cache_key = stmt._generate_cache_key()
+    if cache_key is None:
+        compiled = stmt.compile()
+        sql, values = str(compiled), [compiled.params[name] for name in sorted(compiled.params)]
+    else:
+        sql = _SHAPE_SQL.get(cache_key.key)
+        if sql is None:
+            if len(_SHAPE_SQL) >= _SHAPE_SQL_MAX:
+                _SHAPE_SQL.clear()
+            sql = _SHAPE_SQL[cache_key.key] = str(stmt.compile())
+        values = [param.effective_value for param in cache_key.bindparams]
+    source = f"{sql}|{[repr(value) for value in values]}"
+    return hashlib.blake2b(source.encode(), digest_size=8).hexdigest()
+
+
+def encode_cursor(fingerprint: str, values: Sequence[Any]) -> str:
+    raw = json.dumps({"q": fingerprint, "v": [_dump(v) for v in values]}, separators=(",", ":"))
+    payload = base64.urlsafe_b64encode(raw.encode()).decode().rstrip("=")
+    return f"{payload}.{_signature(payload)}"
+
+
+def decode_cursor(fingerprint: str, cursor: str) -> list[Any]:
+    try:
+        payload, signature = cursor.split(".")
+        if not hmac.compare_digest(signature, _signature(payload)):
+            raise ValueError("firma incorrecta")
+        data = json.loads(base64.urlsafe_b64decode(payload + "=" * (-len(payload) % 4)))
+        if data["q"] != fingerprint:
+            raise ValueError("cursor de otra consulta")
+        return [_load(v) for v in data["v"]]
+    except (ValueError, KeyError, TypeError):
+        raise HTTPException(status_code=400, detail="Cursor de paginación inválido")
+
+
+def _after(keys: Sequence[SortKey], values: Sequence[Any]) -> ColumnElement:
+    """Filas posteriores a `values` en el orden de `keys`."""
+    if len({key.descending for key in keys}) == 1:
+        # Mismo sentido en todas las columnas: comparación de filas, que recorre el índice compuesto
+        row = tuple_(*(key.column for key in keys))
+        position = tuple_(*values)
+        return row < position if keys[0].descending else row > position
+    clauses = []
+    for i, key in enumerate(keys):
+        previous_equal = [keys[j].column == values[j] for j in range(i)]
+        clauses.append(and_(*previous_equal, key.column < values[i] if key.descending else key.column > values[i]))
+    return or_(*clauses)
+
+
+async def _estimated_total(db: AsyncSession, stmt: Select) -> int:
+    # Con clause=stmt RoutingSession envía estas consultas adonde iría el propio select
+    # (la réplica en las sesiones de lectura)
+    bind_arguments = {"clause": stmt}
+    froms = stmt.get_final_froms()
+    if stmt.whereclause is None and len(froms) == 1 and isinstance(froms[0], Table):
+        reltuples = await db.scalar(
+            text("SELECT reltuples::bigint FROM pg_class WHERE oid = CAST(:table AS regclass)"),
+            {"table": froms[0].name},
+            bind_arguments=bind_arguments,
+        )
+        # -1: la tabla nunca se ha analizado
+        if reltuples is not None and reltuples >= 0:
+            return reltuples
+    plan = (await db.execute(_Explain(stmt), bind_arguments=bind_arguments)).scalar()
+    if isinstance(plan, str):
+        plan = json.loads(plan)
+    return int(plan[0]["Plan"]["Plan Rows"])
+
+
+async def count_total(db: AsyncSession, stmt: Select, mode: TotalMode) -> Optional[int]:
+    stmt = stmt.order_by(None)
+    if mode == "exact":
+        return await db.scalar(select(func.count()).select_from(stmt.subquery()))
+    if mode == "estimated":
+        return await _estimated_total(db, stmt)
+    return None
+
+
+async def paginate(
+    db: AsyncSession,
+    stmt: Select,
+    order_by: Sequence[SortKey],
+    tie_breaker: ColumnElement,
+    params: CursorParams,
+    scalars: bool = True,
+) -> CursorPage:
+    """
+    Pagina `stmt` (con sus filtros, sin ORDER BY ni LIMIT) ordenando por `order_by` y,
+    en último lugar, por `tie_breaker`, que debe ser único (la PK). Las columnas de orden
+    deben ser NOT NULL y atributos de la entidad o columnas de la fila devuelta.
+    """
+    last_descending = order_by[-1].descending if order_by else False
+    keys = [*order_by, SortKey(tie_breaker, last_descending)]
+    ordered = stmt.order_by(*(key.column.desc() if key.descending else key.column.asc() for key in keys))
+    fingerprint = _fingerprint(ordered)
+    if params.cursor:
+        ordered = ordered.where(_after(keys, decode_cursor(fingerprint, params.cursor)))
+    # Una fila de más indica si hay página siguiente sin necesidad de COUNT
+    result = await db.execute(ordered.limit(params.limit + 1))
+    rows = result.scalars().all() if scalars else result.all()
+    next_cursor = None
+    if len(rows) > params.limit:
+        last = rows[params.limit - 1]
+        next_cursor = encode_cursor(fingerprint, [getattr(last, key.column.key) for key in keys])
+    return CursorPage(
+        items=rows[:params.limit],
+        next_cursor=next_cursor,
+        total=await count_total(db, stmt, params.total),
+        total_is_estimate=params.total == "estimated",
+    )
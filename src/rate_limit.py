@@ -0,0 +1,112 @@
+import hashlib
+import logging
+import math
+import threading
+import time
+from typing import Optional
+
+from fastapi import Request
+
+from src.config import get_settings
+from src.counters import CounterStore, counter_store
+from src.exceptions import RateLimitExceeded
+
+settings = get_settings()
+logger = logging.getLogger(__name__)
+
+
+def parse_rule(rule: str) -> tuple[int, int]:
+    """'20/60' -> (20 peticiones, ventana de 60 segundos)."""
+    limit, window = rule.split("/")
+    return int(limit), int(window)
+
+
+def client_ip(request: Request) -> str:
+    if settings.RATE_LIMIT_TRUST_FORWARDED_FOR:
+        forwarded = request.headers.get("x-forwarded-for")
+        if forwarded:
+            # La última entrada la añade el proxy de la plataforma; las anteriores las controla el cliente
+            return forwarded.split(",")[-1].strip()
+    return request.client.host if request.client else "desconocida"
+
+
+def _email_key(email: str) -> str:
+    # No se guardan emails en claro en el almacén de contadores
+    return hashlib.blake2b(email.strip().lower().encode(), digest_size=16).hexdigest()
+
+
+class RateLimiter:
+    """
+    Ventana deslizante aproximada sobre contadores de ventana fija: se suma el contador de la
+    ventana actual y la parte proporcional de la anterior. Necesita solo incr/get, así que
+    funciona con cualquier CounterStore (memoria, memoria compartida o Redis).
+    """
+
+    def __init__(self, store: CounterStore, rules: dict[str, str]):
+        self.store = store
+        self.rules = {name: parse_rule(rule) for name, rule in rules.items()}
+        self._lock = threading.Lock()
+        self.reset()
+
+    def reset(self) -> None:
+        with self._lock:
+            self.stats: dict[str, dict] = {
+                name: {"allowed": 0, "rejected": 0, "errors": 0} for name in self.rules
+            }
+
+    def _record(self, name: str, outcome: str) -> None:
+        with self._lock:
+            self.stats[name][outcome] += 1
+
+    async def _hit(self, name: str, key: str) -> Optional[int]:
+        """Cuenta la petición y devuelve los segundos de espera si supera el límite."""
+        limit, window = self.rules[name]
+        now = time.time()
+        current_window = int(now // window)
+        elapsed = now - current_window * window
+        current = await self.store.incr(f"rl:{name}:{key}:{current_window}", window * 2)
+        previous = await self.store.get(f"rl:{name}:{key}:{current_window - 1}")
+        weight = 1 - elapsed / window
+        if previous * weight + current <= limit:
+            return None
+        if current > limit or previous == 0:
+            return math.ceil(window - elapsed)
+        # Momento en que el peso de la ventana anterior baja lo suficiente
+        wait = window * (1 - (limit - current) / previous) - elapsed
+        return max(1, math.ceil(wait))
+
+    async def check(self, scope: str, request: Request, email: Optional[str] = None) -> None:
+        """
+        Aplica las reglas "<scope>:ip", "<scope>:email" y "<scope>:global" que estén
+        configuradas. Se llama al principio de la ruta, antes de tocar la base de datos
+        o calcular hashes. Si el almacén falla se deja pasar la petición.
+        """
+        if not settings.RATE_LIMIT_ENABLED:
+            return
+        checks = [(f"{scope}:ip", client_ip(request))]
+        if email:
+            checks.append((f"{scope}:email", _email_key(email)))
+        checks.append((f"{scope}:global", "all"))
+        for name, key in checks:
+            if name not in self.rules:
+                continue
+            try:
+                retry_after = await self._hit(name, key)
+            except Exception:
+                logger.exception(f"Error en el almacén de rate limiting ({name}); se deja pasar la petición")
+                self._record(name, "errors")
+                continue
+            if retry_after is not None:
+                self._record(name, "rejected")
+                raise RateLimitExceeded(retry_after)
+            self._record(name, "allowed")
+
+    def snapshot(self) -> list[dict]:
+        with self._lock:
+            return [
+                {"rule": name, "limit": self.rules[name][0], "window_seconds": self.rules[name][1], **stats}
+                for name, stats in self.stats.items()
+            ]
+
+
+rate_limiter = RateLimiter(counter_store, settings.RATE_LIMITS)
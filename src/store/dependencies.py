@@ -0,0 +1,14 @@
+from fastapi import Depends
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from src.auth import schemas
+from src.auth.service import get_current_user
+from src.database import get_async_db, use_replica
+
+
+async def get_user_read_db(
+        current_user: schemas.User = Depends(get_current_user),
+        db: AsyncSession = Depends(get_async_db)
+) -> AsyncSession:
+    # El usuario viene de la caché o del primario; el resto de lecturas puede ir a la réplica
+    return use_replica(db, current_user.id)
@@ -1,15 +1,23 @@
 import uuid
 from datetime import datetime
-from sqlalchemy import Column, String, Integer, Float, ForeignKey, DateTime, Boolean, Table
+from sqlalchemy import Column, String, Integer, Float, ForeignKey, DateTime, Boolean, Table, Index
 from sqlalchemy.orm import relationship
 from sqlalchemy.dialects.postgresql import UUID as PGUUID
-from sqlalchemy import func
+from sqlalchemy import func, text
 
 from src.database import Base
+from src.utils import uuid7
 
 class Product(Base):
     __tablename__ = "products"
-    id = Column(PGUUID(as_uuid=True), primary_key=True, index=True, default=uuid.uuid4)
+    __table_args__ = (
+        # Paginación por keyset del catálogo (GET /store/products): (columna de orden, id) de los activos
+        Index("ix_products_active_created_at_id", "created_at", "id", postgresql_where=text("is_active")),
+        Index("ix_products_active_price_id", "price", "id", postgresql_where=text("is_active")),
+        Index("ix_products_active_title_id", "title", "id", postgresql_where=text("is_active")),
+        Index("ix_products_in_stock_created_at_id", "created_at", "id", postgresql_where=text("is_active AND stock > 0")),
+    )
+    id = Column(PGUUID(as_uuid=True), primary_key=True, default=uuid7)
     image_url = Column(String, nullable=False)
     title = Column(String, nullable=False)
     description = Column(String, nullable=False)
@@ -23,7 +31,7 @@ class Product(Base):
 
 class Cart(Base):
     __tablename__ = "carts"
-    id = Column(PGUUID(as_uuid=True), primary_key=True, index=True, default=uuid.uuid4)
+    id = Column(PGUUID(as_uuid=True), primary_key=True, default=uuid7)
     user_id = Column(PGUUID(as_uuid=True), ForeignKey("users.id", ondelete="CASCADE"), unique=True, nullable=False)
     created_at = Column(DateTime(timezone=True), server_default=func.now(), nullable=False)
     updated_at = Column(DateTime(timezone=True), server_default=func.now(), onupdate=func.now(), nullable=False)
@@ -32,7 +40,11 @@ class Cart(Base):
 
 class CartProduct(Base):
     __tablename__ = "cart_products"
-    id = Column(PGUUID(as_uuid=True), primary_key=True, index=True, default=uuid.uuid4)
+    __table_args__ = (
+        # Un producto aparece una sola vez por carrito; también sirve para buscar por cart_id
+        Index("uq_cart_products_cart_id_product_id", "cart_id", "product_id", unique=True),
+    )
+    id = Column(PGUUID(as_uuid=True), primary_key=True, default=uuid7)
     cart_id = Column(PGUUID(as_uuid=True), ForeignKey("carts.id", ondelete="CASCADE"), nullable=False)
     product_id = Column(PGUUID(as_uuid=True), ForeignKey("products.id", ondelete="CASCADE"), nullable=False)
     quantity = Column(Integer, nullable=False, default=1)
@@ -41,7 +53,12 @@ class CartProduct(Base):
 
 class Order(Base):
     __tablename__ = "orders"
-    id = Column(PGUUID(as_uuid=True), primary_key=True, index=True, default=uuid.uuid4)
+    __table_args__ = (
+        Index("ix_orders_created_at", "created_at"),
+        # Pedidos de un usuario paginados del más reciente al más antiguo (GET /store/orders)
+        Index("ix_orders_user_id_created_at_id", "user_id", "created_at", "id"),
+    )
+    id = Column(PGUUID(as_uuid=True), primary_key=True, default=uuid7)
     order_number = Column(String, unique=True, nullable=False)
     user_id = Column(PGUUID(as_uuid=True), ForeignKey("users.id", ondelete="CASCADE"), nullable=False)
     full_name = Column(String, nullable=False)
@@ -55,7 +72,10 @@ class Order(Base):
 
 class OrderProduct(Base):
     __tablename__ = "order_products"
-    id = Column(PGUUID(as_uuid=True), primary_key=True, index=True, default=uuid.uuid4)
+    __table_args__ = (
+        Index("ix_order_products_order_id", "order_id"),
+    )
+    id = Column(PGUUID(as_uuid=True), primary_key=True, default=uuid7)
     order_id = Column(PGUUID(as_uuid=True), ForeignKey("orders.id", ondelete="CASCADE"), nullable=False)
     product_id = Column(PGUUID(as_uuid=True), ForeignKey("products.id", ondelete="CASCADE"), nullable=False)
     quantity = Column(Integer, nullable=False)
@@ -1,10 +1,12 @@
-from fastapi import APIRouter, Depends, HTTPException, status
-from sqlalchemy.orm import Session
-from typing import List, Optional
+from fastapi import APIRouter, Depends, HTTPException, Query, status
+from sqlalchemy.ext.asyncio import AsyncSession
+from typing import List, Optional, Union
 from uuid import UUID
 from src.store import service, schemas
 from src.auth.service import get_current_user
-from src.database import get_db
+from src.database import get_async_db, get_read_db
+from src.pagination import CursorParams
+from src.store.dependencies import get_user_read_db
 
 # Imports adicionales para WhatsApp
 from pydantic import BaseModel
@@ -26,54 +28,81 @@ twilio_client = Client(get_settings().TWILIO_ACCOUNT_SID, get_settings().TWILIO_
 router = APIRouter(prefix="/store", tags=["store"])
 
 # ========== TUS ENDPOINTS EXISTENTES (NO CAMBIAR) ==========
-@router.get("/products", response_model=List[schemas.Product])
-def list_products(db: Session = Depends(get_db)):
-    return service.get_products(db)
+@router.get("/products", response_model=Union[schemas.ProductPage, List[schemas.Product]])
+async def list_products(
+    page: CursorParams = Depends(),
+    sort: schemas.ProductSort = "newest",
+    min_price: Optional[float] = Query(None, ge=0),
+    max_price: Optional[float] = Query(None, ge=0),
+    in_stock: bool = False,
+    unpaginated: bool = Query(False, description="Catálogo completo sin paginar (respuesta anterior, una lista)"),
+    db: AsyncSession = Depends(get_read_db),
+):
+    if unpaginated:
+        return await service.get_products(db)
+    return await service.get_products_page(
+        db, page, sort=sort, min_price=min_price, max_price=max_price, in_stock=in_stock
+    )
 
 @router.get("/products/{product_id}", response_model=schemas.Product)
-def get_product(product_id: UUID, db: Session = Depends(get_db)):
-    product = service.get_product(db, product_id)
+async def get_product(product_id: UUID, db: AsyncSession = Depends(get_read_db)):
+    product = await service.get_product(db, product_id)
     if not product:
         raise HTTPException(status_code=404, detail="Producto no encontrado")
     return product
 
 @router.post("/products", response_model=schemas.Product, status_code=status.HTTP_201_CREATED)
-def create_product(product: schemas.ProductCreate, db: Session = Depends(get_db), current_user=Depends(get_current_user)):
+async def create_product(product: schemas.ProductCreate, db: AsyncSession = Depends(get_async_db), current_user=Depends(get_current_user)):
     if not current_user.is_superuser:
         raise HTTPException(status_code=403, detail="No autorizado")
-    return service.create_product(db, product)
+    return await service.create_product(db, product)
 
 @router.get("/cart", response_model=schemas.Cart)
-def get_cart(current_user=Depends(get_current_user), db: Session = Depends(get_db)):
-    cart = service.get_cart(db, current_user.id)
+async def get_cart(current_user=Depends(get_current_user), db: AsyncSession = Depends(get_user_read_db)):
+    cart = await service.get_cart(db, current_user.id)
     if not cart:
         raise HTTPException(status_code=404, detail="Carrito no encontrado")
     return cart
 
 @router.post("/cart/add", response_model=schemas.Cart)
-def add_to_cart(request: schemas.AddToCartRequest, current_user=Depends(get_current_user), db: Session = Depends(get_db)):
-    return service.add_to_cart(db, current_user, request.product_id, request.quantity)
+async def add_to_cart(request: schemas.AddToCartRequest, current_user=Depends(get_current_user), db: AsyncSession = Depends(get_async_db)):
+    return await service.add_to_cart(db, current_user, request.product_id, request.quantity)
 
 @router.put("/cart/update", response_model=schemas.Cart)
-def update_cart_item(request: schemas.UpdateCartItemRequest, current_user=Depends(get_current_user), db: Session = Depends(get_db)):
-    return service.update_cart_item(db, current_user, request.product_id, request.quantity)
+async def update_cart_item(request: schemas.UpdateCartItemRequest, current_user=Depends(get_current_user), db: AsyncSession = Depends(get_async_db)):
+    return await service.update_cart_item(db, current_user, request.product_id, request.quantity)
 
 @router.delete("/cart/remove", response_model=schemas.Cart)
-def remove_from_cart(request: schemas.RemoveFromCartRequest, current_user=Depends(get_current_user), db: Session = Depends(get_db)):
-    return service.remove_from_cart(db, current_user, request.product_id)
+async def remove_from_cart(request: schemas.RemoveFromCartRequest, current_user=Depends(get_current_user), db: AsyncSession = Depends(get_async_db)):
+    return await service.remove_from_cart(db, current_user, request.product_id)
 
 @router.delete("/cart/clear", response_model=schemas.Cart)
-def clear_cart(current_user=Depends(get_current_user), db: Session = Depends(get_db)):
-    return service.clear_cart(db, current_user)
+async def clear_cart(current_user=Depends(get_current_user), db: AsyncSession = Depends(get_async_db)):
+    return await service.clear_cart(db, current_user)
 
 @router.post("/cart/checkout")
-def checkout(current_user=Depends(get_current_user), db: Session = Depends(get_db)):
-    order = service.checkout_cart(db, current_user)
+async def checkout(current_user=Depends(get_current_user), db: AsyncSession = Depends(get_async_db)):
+    order = await service.checkout_cart(db, current_user)
     return {"status_code": 200, "message": "Compra realizada y confirmada por WhatsApp"}
 
+@router.get("/orders", response_model=schemas.OrderPage)
+async def list_my_orders(page: CursorParams = Depends(), current_user=Depends(get_current_user), db: AsyncSession = Depends(get_user_read_db)):
+    return await service.get_user_orders(db, current_user.id, page)
+
+@router.get("/admin/orders", response_model=schemas.OrderPage)
+async def list_all_orders(
+    page: CursorParams = Depends(),
+    order_status: Optional[str] = Query(None, alias="status"),
+    current_user=Depends(get_current_user),
+    db: AsyncSession = Depends(get_read_db),
+):
+    if not current_user.is_superuser:
+        raise HTTPException(status_code=403, detail="No autorizado")
+    return await service.get_all_orders(db, page, order_status)
+
 @router.get("/reports/sales", response_model=schemas.SalesReportResponse)
-def sales_report(current_user=Depends(get_current_user), db: Session = Depends(get_db)):
-    report = service.get_sales_report(db, current_user)
+async def sales_report(current_user=Depends(get_current_user), db: AsyncSession = Depends(get_user_read_db)):
+    report = await service.get_sales_report(db, current_user)
     return report
 
 # ========== NUEVOS SCHEMAS PARA WHATSAPP ==========
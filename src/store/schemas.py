@@ -1,8 +1,10 @@
 from datetime import datetime
-from typing import List, Optional
+from typing import List, Literal, Optional
 from uuid import UUID
 from pydantic import BaseModel, Field
 
+from src.pagination import CursorPage
+
 class ProductBase(BaseModel):
     image_url: str
     title: str
@@ -21,6 +23,10 @@ class Product(ProductBase):
     class Config:
         from_attributes = True
 
+ProductSort = Literal["newest", "price_asc", "price_desc", "title"]
+
+ProductPage = CursorPage[Product]
+
 class CartProductBase(BaseModel):
     product_id: UUID
     quantity: int
@@ -73,6 +79,8 @@ class Order(BaseModel):
     class Config:
         from_attributes = True
 
+OrderPage = CursorPage[Order]
+
 class CheckoutResponse(BaseModel):
     order_number: str
     full_name: str
@@ -1,68 +1,117 @@
-from sqlalchemy.orm import Session
+from typing import Optional
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import selectinload
 from fastapi import HTTPException, status
+from fastapi.concurrency import run_in_threadpool
 from uuid import UUID
-from datetime import datetime, timedelta
+from datetime import datetime, timedelta, time, timezone, date
 from src.store import models, schemas
-from src.auth.models import User
+from src.auth.schemas import User
 import random
 import string
-from sqlalchemy import func
+from sqlalchemy import func, select, delete, lambda_stmt, literal_column
 import requests
 from src.config import get_settings
+from src.database import mark_user_write
+from src.pagination import CursorPage, CursorParams, SortKey, paginate
 
-def get_products(db: Session):
-    return db.query(models.Product).filter(models.Product.is_active == True).all()
+async def get_products(db: AsyncSession):
+    result = await db.execute(select(models.Product).where(models.Product.is_active == True))
+    return result.scalars().all()
 
-def get_product(db: Session, product_id: UUID):
-    return db.query(models.Product).filter(models.Product.id == product_id, models.Product.is_active == True).first()
+# Orden de cada sort: (columna, descendente). El id desempata filas con el mismo valor
+PRODUCT_SORTS = {
+    "newest": SortKey(models.Product.created_at, True),
+    "price_asc": SortKey(models.Product.price, False),
+    "price_desc": SortKey(models.Product.price, True),
+    "title": SortKey(models.Product.title, False),
+}
 
-def create_product(db: Session, product: schemas.ProductCreate):
+
+async def get_products_page(
+    db: AsyncSession,
+    params: CursorParams,
+    sort: str = "newest",
+    min_price: Optional[float] = None,
+    max_price: Optional[float] = None,
+    in_stock: bool = False,
+) -> CursorPage:
+    """Catálogo paginado por keyset sobre los índices (columna de orden, id) de productos activos."""
+    stmt = select(models.Product).where(models.Product.is_active == True)
+    if min_price is not None:
+        stmt = stmt.where(models.Product.price >= min_price)
+    if max_price is not None:
+        stmt = stmt.where(models.Product.price <= max_price)
+    if in_stock:
+        # Literal y no parámetro: con un plan genérico "stock > $1" no encaja en el índice parcial
+        stmt = stmt.where(models.Product.stock > literal_column("0"))
+    return await paginate(db, stmt, [PRODUCT_SORTS[sort]], models.Product.id, params)
+
+async def get_product(db: AsyncSession, product_id: UUID):
+    result = await db.execute(lambda_stmt(
+        lambda: select(models.Product).where(models.Product.id == product_id, models.Product.is_active == True)
+    ))
+    return result.scalars().first()
+
+async def create_product(db: AsyncSession, product: schemas.ProductCreate):
     db_product = models.Product(**product.dict())
     db.add(db_product)
-    db.commit()
-    db.refresh(db_product)
+    await db.flush()
+    await db.refresh(db_product)
     return db_product
 
-def get_cart(db: Session, user_id: UUID):
-    return db.query(models.Cart).filter(models.Cart.user_id == user_id).first()
+async def get_cart(db: AsyncSession, user_id: UUID):
+    # Cargar los productos del carrito de antemano: en async no hay lazy loading
+    stmt = lambda_stmt(lambda: select(models.Cart).where(models.Cart.user_id == user_id))
+    stmt += lambda s: s.options(
+        selectinload(models.Cart.cart_products).selectinload(models.CartProduct.product)
+    )
+    result = await db.execute(stmt, execution_options={"populate_existing": True})
+    return result.scalars().first()
 
-def add_to_cart(db: Session, user: User, product_id: UUID, quantity: int):
-    cart = get_cart(db, user.id)
+async def _get_cart_product(db: AsyncSession, cart_id: UUID, product_id: UUID):
+    result = await db.execute(
+        select(models.CartProduct).filter_by(cart_id=cart_id, product_id=product_id)
+    )
+    return result.scalars().first()
+
+async def add_to_cart(db: AsyncSession, user: User, product_id: UUID, quantity: int):
+    cart = await get_cart(db, user.id)
     if not cart:
         cart = models.Cart(user_id=user.id)
         db.add(cart)
-        db.commit()
-        db.refresh(cart)
-    product = get_product(db, product_id)
+        await db.flush()
+    product = await get_product(db, product_id)
     if not product or not product.is_active or product.stock < quantity:
         raise HTTPException(status_code=400, detail="Producto no disponible o stock insuficiente")
-    cart_product = db.query(models.CartProduct).filter_by(cart_id=cart.id, product_id=product_id).first()
+    cart_product = await _get_cart_product(db, cart.id, product_id)
     if cart_product:
         cart_product.quantity += quantity
     else:
         cart_product = models.CartProduct(cart_id=cart.id, product_id=product_id, quantity=quantity)
         db.add(cart_product)
-    db.commit()
-    db.refresh(cart)
-    return cart
+    await db.flush()
+    mark_user_write(user.id)
+    return await get_cart(db, user.id)
 
-def update_cart_item(db: Session, user: User, product_id: UUID, quantity: int):
-    cart = get_cart(db, user.id)
+async def update_cart_item(db: AsyncSession, user: User, product_id: UUID, quantity: int):
+    cart = await get_cart(db, user.id)
     if not cart:
         raise HTTPException(status_code=404, detail="Carrito no encontrado")
     
-    product = get_product(db, product_id)
+    product = await get_product(db, product_id)
     if not product or not product.is_active:
         raise HTTPException(status_code=400, detail="Producto no disponible")
     
-    cart_product = db.query(models.CartProduct).filter_by(cart_id=cart.id, product_id=product_id).first()
+    cart_product = await _get_cart_product(db, cart.id, product_id)
     
     if quantity == 0:
         # Eliminar producto del carrito
         if cart_product:
-            db.delete(cart_product)
-            db.commit()
-        return get_cart(db, user.id)
+            await db.delete(cart_product)
+            await db.flush()
+            mark_user_write(user.id)
+        return await get_cart(db, user.id)
     
     if quantity > product.stock:
         raise HTTPException(status_code=400, detail="Stock insuficiente para la cantidad solicitada")
@@ -75,33 +124,33 @@ def update_cart_item(db: Session, user: User, product_id: UUID, quantity: int):
         cart_product = models.CartProduct(cart_id=cart.id, product_id=product_id, quantity=quantity)
         db.add(cart_product)
     
-    db.commit()
-    db.refresh(cart)
-    return cart
+    await db.flush()
+    mark_user_write(user.id)
+    return await get_cart(db, user.id)
 
-def remove_from_cart(db: Session, user: User, product_id: UUID):
-    cart = get_cart(db, user.id)
+async def remove_from_cart(db: AsyncSession, user: User, product_id: UUID):
+    cart = await get_cart(db, user.id)
     if not cart:
         raise HTTPException(status_code=404, detail="Carrito no encontrado")
     
-    cart_product = db.query(models.CartProduct).filter_by(cart_id=cart.id, product_id=product_id).first()
+    cart_product = await _get_cart_product(db, cart.id, product_id)
     if not cart_product:
         raise HTTPException(status_code=404, detail="Producto no encontrado en el carrito")
     
-    db.delete(cart_product)
-    db.commit()
-    db.refresh(cart)
-    return cart
+    await db.delete(cart_product)
+    await db.flush()
+    mark_user_write(user.id)
+    return await get_cart(db, user.id)
 
-def clear_cart(db: Session, user: User):
-    cart = get_cart(db, user.id)
+async def clear_cart(db: AsyncSession, user: User):
+    cart = await get_cart(db, user.id)
     if not cart:
         raise HTTPException(status_code=404, detail="Carrito no encontrado")
     
-    db.query(models.CartProduct).filter_by(cart_id=cart.id).delete()
-    db.commit()
-    db.refresh(cart)
-    return cart
+    await db.execute(delete(models.CartProduct).filter_by(cart_id=cart.id))
+    await db.flush()
+    mark_user_write(user.id)
+    return await get_cart(db, user.id)
 
 def send_whatsapp_order(order):
     settings = get_settings()
@@ -146,16 +195,24 @@ def send_whatsapp_order(order):
         return False
 
 
-def checkout_cart(db: Session, user: User):
-    cart = get_cart(db, user.id)
+async def checkout_cart(db: AsyncSession, user: User):
+    cart = await get_cart(db, user.id)
     if not cart or not cart.cart_products:
         raise HTTPException(status_code=400, detail="El carrito está vacío")
+    # Una sola consulta para todos los productos del carrito en vez de una por línea
+    result = await db.execute(
+        select(models.Product).where(
+            models.Product.id.in_([cp.product_id for cp in cart.cart_products]),
+            models.Product.is_active == True
+        )
+    )
+    products = {product.id: product for product in result.scalars()}
     total = 0
     order_products = []
     for cp in cart.cart_products:
-        product = get_product(db, cp.product_id)
+        product = products.get(cp.product_id)
         if not product or product.stock < cp.quantity:
-            raise HTTPException(status_code=400, detail=f"Stock insuficiente para {product.title}")
+            raise HTTPException(status_code=400, detail=f"Stock insuficiente para {cp.product.title}")
         total += product.price * cp.quantity
         order_products.append({
             'product': product,
@@ -164,92 +221,142 @@ def checkout_cart(db: Session, user: User):
         })
     order_number = ''.join(random.choices(string.ascii_uppercase + string.digits, k=8))
     try:
-        with db.begin():
-            order = models.Order(
-                order_number=order_number,
-                user_id=user.id,
-                full_name=user.full_name,
-                phone_number=user.phone_number,
-                address=user.address,
-                total=total,
-                status="sold"
-            )
-            db.add(order)
-            db.flush()
-            for op in order_products:
-                db_op = models.OrderProduct(
-                    order_id=order.id,
-                    product_id=op['product'].id,
-                    quantity=op['quantity'],
-                    price=op['price']
-                )
-                db.add(db_op)
-                op['product'].stock -= op['quantity']
-            db.query(models.CartProduct).filter_by(cart_id=cart.id).delete()
-            db.flush()
-            # Enviar WhatsApp usando el objeto real de la orden
-            db.refresh(order)
-            if not send_whatsapp_order(order):
-                raise Exception("No se pudo enviar el mensaje de confirmación por WhatsApp. La compra no fue registrada.")
+        order = models.Order(
+            order_number=order_number,
+            user_id=user.id,
+            full_name=user.full_name,
+            phone_number=user.phone_number,
+            address=user.address,
+            total=total,
+            status="sold"
+        )
+        db.add(order)
+        for op in order_products:
+            # Se asocian en memoria para que el mensaje no necesite lazy loading
+            order.order_products.append(models.OrderProduct(
+                product=op['product'],
+                quantity=op['quantity'],
+                price=op['price']
+            ))
+            op['product'].stock -= op['quantity']
+        await db.execute(delete(models.CartProduct).filter_by(cart_id=cart.id))
+        await db.flush()
+        # Enviar WhatsApp usando el objeto real de la orden (requests es bloqueante)
+        if not await run_in_threadpool(send_whatsapp_order, order):
+            raise Exception("No se pudo enviar el mensaje de confirmación por WhatsApp. La compra no fue registrada.")
+        mark_user_write(user.id)
         return order
     except Exception as e:
-        db.rollback()
+        await db.rollback()
         raise HTTPException(status_code=500, detail=str(e))
 
-def get_sales_report(db: Session, user: User):
+def _day_start(day: date) -> datetime:
+    return datetime.combine(day, time.min, tzinfo=timezone.utc)
+
+async def _get_orders(db: AsyncSession, *criteria):
+    # Precargar productos y usuario de cada orden (en async no hay lazy loading)
+    result = await db.execute(
+        select(models.Order)
+        .where(*criteria)
+        .options(
+            selectinload(models.Order.order_products).selectinload(models.OrderProduct.product),
+            selectinload(models.Order.user),
+        )
+    )
+    return result.scalars().all()
+
+def _orders_with_products():
+    return select(models.Order).options(
+        selectinload(models.Order.order_products).selectinload(models.OrderProduct.product)
+    )
+
+async def get_user_orders(db: AsyncSession, user_id: UUID, params: CursorParams) -> CursorPage:
+    """Pedidos del usuario, del más reciente al más antiguo (índice user_id, created_at, id)."""
+    stmt = _orders_with_products().where(models.Order.user_id == user_id)
+    return await paginate(db, stmt, [SortKey(models.Order.created_at, True)], models.Order.id, params)
+
+async def get_all_orders(db: AsyncSession, params: CursorParams, order_status: Optional[str] = None) -> CursorPage:
+    """Todos los pedidos (administración), del más reciente al más antiguo."""
+    stmt = _orders_with_products()
+    if order_status is not None:
+        stmt = stmt.where(models.Order.status == order_status)
+    return await paginate(db, stmt, [SortKey(models.Order.created_at, True)], models.Order.id, params)
+
+def _summarize_orders(orders) -> tuple[float, int, list, list]:
+    """Totales, resumen por producto y detalle de venta de un grupo de órdenes."""
+    product_counter = {}
+    sales_details = []
+    for order in orders:
+        # Detalles de productos en esta orden
+        order_products = []
+        for op in order.order_products:
+            order_products.append({
+                "product_id": str(op.product_id),
+                "title": op.product.title,
+                "quantity": op.quantity,
+                "price": op.price,
+                "subtotal": op.price * op.quantity
+            })
+
+            # Contador para resumen de productos
+            pid = op.product_id
+            if pid not in product_counter:
+                product_counter[pid] = {"product_id": pid, "title": op.product.title, "units_sold": 0, "total": 0.0}
+            product_counter[pid]["units_sold"] += op.quantity
+            product_counter[pid]["total"] += op.price * op.quantity
+
+        sales_details.append(schemas.SaleDetail(
+            order_id=order.id,
+            order_number=order.order_number,
+            customer_name=order.full_name,
+            customer_email=order.user.email,
+            customer_phone=order.phone_number,
+            purchase_date=order.created_at.date(),
+            purchase_time=order.created_at.strftime("%H:%M:%S"),
+            total_amount=order.total,
+            products=order_products
+        ))
+    products = sorted([schemas.ProductSalesSummary(**v) for v in product_counter.values()], key=lambda x: x.units_sold, reverse=True)
+    return sum(order.total for order in orders), len(orders), products, sales_details
+
+async def _get_product_sales_summary(db: AsyncSession) -> list[schemas.ProductSalesSummary]:
+    # Agregado en la BD: no hace falta cargar todas las órdenes históricas
+    result = await db.execute(
+        select(
+            models.OrderProduct.product_id,
+            models.Product.title,
+            func.sum(models.OrderProduct.quantity).label("units_sold"),
+            func.sum(models.OrderProduct.price * models.OrderProduct.quantity).label("total"),
+        )
+        .join(models.Product, models.Product.id == models.OrderProduct.product_id)
+        .group_by(models.OrderProduct.product_id, models.Product.title)
+    )
+    summary = [schemas.ProductSalesSummary(**row._asdict()) for row in result]
+    return sorted(summary, key=lambda x: x.units_sold, reverse=True)
+
+async def get_sales_report(db: AsyncSession, user: User):
     if not user.is_superuser:
         raise HTTPException(status_code=403, detail="No autorizado")
-    
-    # Daily sales (últimos 7 días)
+
     today = datetime.utcnow().date()
+    days = [today - timedelta(days=i) for i in range(7)]  # últimos 7 días
+    week_starts = [today - timedelta(days=today.weekday() + i * 7) for i in range(4)]  # últimas 4 semanas
+
+    # Una sola consulta para todo el periodo (ix_orders_created_at); se agrupa por día y semana en memoria
+    orders = await _get_orders(
+        db,
+        models.Order.created_at >= _day_start(min(week_starts[-1], days[-1])),
+        models.Order.created_at < _day_start(max(today, week_starts[0] + timedelta(days=6)) + timedelta(days=1))
+    )
+    orders_by_day = {}
+    for order in orders:
+        orders_by_day.setdefault(order.created_at.astimezone(timezone.utc).date(), []).append(order)
+
     daily_sales = []
     all_sales_details = []
-    
-    for i in range(7):
-        day = today - timedelta(days=i)
-        orders = db.query(models.Order).filter(func.date(models.Order.created_at) == day).all()
-        total_sales = sum(order.total for order in orders)
-        total_orders = len(orders)
-        
-        # Productos vendidos ese día
-        product_counter = {}
-        sales_details = []
-        
-        for order in orders:
-            # Detalles de productos en esta orden
-            order_products = []
-            for op in order.order_products:
-                order_products.append({
-                    "product_id": str(op.product_id),
-                    "title": op.product.title,
-                    "quantity": op.quantity,
-                    "price": op.price,
-                    "subtotal": op.price * op.quantity
-                })
-                
-                # Contador para resumen de productos
-                pid = op.product_id
-                if pid not in product_counter:
-                    product_counter[pid] = {"product_id": pid, "title": op.product.title, "units_sold": 0, "total": 0.0}
-                product_counter[pid]["units_sold"] += op.quantity
-                product_counter[pid]["total"] += op.price * op.quantity
-            
-            # Crear detalle de venta
-            sale_detail = schemas.SaleDetail(
-                order_id=order.id,
-                order_number=order.order_number,
-                customer_name=order.full_name,
-                customer_email=order.user.email,
-                customer_phone=order.phone_number,
-                purchase_date=order.created_at.date(),
-                purchase_time=order.created_at.strftime("%H:%M:%S"),
-                total_amount=order.total,
-                products=order_products
-            )
-            sales_details.append(sale_detail)
-            all_sales_details.append(sale_detail)
-        
-        products = sorted([schemas.ProductSalesSummary(**v) for v in product_counter.values()], key=lambda x: x.units_sold, reverse=True)
+    for day in days:
+        total_sales, total_orders, products, sales_details = _summarize_orders(orders_by_day.get(day, []))
+        all_sales_details.extend(sales_details)
         daily_sales.append(schemas.DailySalesReport(
             date=str(day),
             total_sales=total_sales,
@@ -258,56 +365,13 @@ def get_sales_report(db: Session, user: User):
             sales_details=sales_details
         ))
     daily_sales = sorted(daily_sales, key=lambda x: x.date, reverse=True)
-    
-    # Weekly sales (últimas 4 semanas)
+
     weekly_sales = []
-    for i in range(4):
-        week_start = today - timedelta(days=today.weekday() + i*7)
-        week_end = week_start + timedelta(days=6)
-        orders = db.query(models.Order).filter(
-            func.date(models.Order.created_at) >= week_start,
-            func.date(models.Order.created_at) <= week_end
-        ).all()
-        total_sales = sum(order.total for order in orders)
-        total_orders = len(orders)
-        
-        product_counter = {}
-        sales_details = []
-        
-        for order in orders:
-            # Detalles de productos en esta orden
-            order_products = []
-            for op in order.order_products:
-                order_products.append({
-                    "product_id": str(op.product_id),
-                    "title": op.product.title,
-                    "quantity": op.quantity,
-                    "price": op.price,
-                    "subtotal": op.price * op.quantity
-                })
-                
-                # Contador para resumen de productos
-                pid = op.product_id
-                if pid not in product_counter:
-                    product_counter[pid] = {"product_id": pid, "title": op.product.title, "units_sold": 0, "total": 0.0}
-                product_counter[pid]["units_sold"] += op.quantity
-                product_counter[pid]["total"] += op.price * op.quantity
-            
-            # Crear detalle de venta
-            sale_detail = schemas.SaleDetail(
-                order_id=order.id,
-                order_number=order.order_number,
-                customer_name=order.full_name,
-                customer_email=order.user.email,
-                customer_phone=order.phone_number,
-                purchase_date=order.created_at.date(),
-                purchase_time=order.created_at.strftime("%H:%M:%S"),
-                total_amount=order.total,
-                products=order_products
-            )
-            sales_details.append(sale_detail)
-        
-        products = sorted([schemas.ProductSalesSummary(**v) for v in product_counter.values()], key=lambda x: x.units_sold, reverse=True)
+    for week_start in week_starts:
+        week_orders = [
+            order for offset in range(7) for order in orders_by_day.get(week_start + timedelta(days=offset), [])
+        ]
+        total_sales, total_orders, products, sales_details = _summarize_orders(week_orders)
         week_label = f"{week_start.isocalendar()[0]}-W{week_start.isocalendar()[1]}"
         weekly_sales.append(schemas.WeeklySalesReport(
             week=week_label,
@@ -317,25 +381,15 @@ def get_sales_report(db: Session, user: User):
             sales_details=sales_details
         ))
     weekly_sales = sorted(weekly_sales, key=lambda x: x.week, reverse=True)
-    
-    # Product summary (total)
-    all_orders = db.query(models.Order).all()
-    product_counter = {}
-    for order in all_orders:
-        for op in order.order_products:
-            pid = op.product_id
-            if pid not in product_counter:
-                product_counter[pid] = {"product_id": pid, "title": op.product.title, "units_sold": 0, "total": 0.0}
-            product_counter[pid]["units_sold"] += op.quantity
-            product_counter[pid]["total"] += op.price * op.quantity
-    product_summary = sorted([schemas.ProductSalesSummary(**v) for v in product_counter.values()], key=lambda x: x.units_sold, reverse=True)
-    
+
+    product_summary = await _get_product_sales_summary(db)
+
     # Ordenar todos los detalles de ventas por fecha (más reciente primero)
     all_sales_details = sorted(all_sales_details, key=lambda x: x.purchase_date, reverse=True)
-    
+
     return schemas.SalesReportResponse(
         daily_sales=daily_sales,
         weekly_sales=weekly_sales,
         product_summary=product_summary,
         all_sales_details=all_sales_details
-    ) 
\ No newline at end of file
+    )
@@ -0,0 +1,39 @@
+import secrets
+import threading
+import time
+import uuid
+
+_uuid7_lock = threading.Lock()
+_uuid7_last_ms = 0
+_uuid7_counter = 0
+
+
+def uuid7() -> uuid.UUID:
+    """
+    UUID versión 7 (RFC 9562): 48 bits de timestamp Unix en ms, un contador de 12 bits
+    para mantener el orden dentro del mismo milisegundo y 62 bits aleatorios.
+    Al ser creciente en el tiempo, las inserciones caen al final del índice de la PK
+    en lugar de repartirse por todo el B-tree como con uuid4.
+    """
+    global _uuid7_last_ms, _uuid7_counter
+    with _uuid7_lock:
+        now_ms = time.time_ns() // 1_000_000
+        if now_ms > _uuid7_last_ms:
+            _uuid7_last_ms = now_ms
+            # Arranque aleatorio dejando margen para incrementar dentro del mismo ms
+            _uuid7_counter = secrets.randbits(11)
+        else:
+            _uuid7_counter += 1
+            if _uuid7_counter > 0xFFF:
+                # Contador agotado: se avanza el timestamp para no romper el orden
+                _uuid7_last_ms += 1
+                _uuid7_counter = secrets.randbits(11)
+        timestamp_ms = _uuid7_last_ms
+        counter = _uuid7_counter
+
+    value = (timestamp_ms & 0xFFFF_FFFF_FFFF) << 80
+    value |= 0x7 << 76
+    value |= counter << 64
+    value |= 0b10 << 62
+    value |= secrets.randbits(62)
+    return uuid.UUID(int=value)
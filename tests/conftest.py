@@ -0,0 +1,28 @@
+import os
+
+# Valores mínimos para construir Settings sin .env; las pruebas no abren conexiones
+_TEST_ENV = {
+    "POSTGRES_SERVER": "localhost",
+    "POSTGRES_USER": "test",
+    "POSTGRES_PASSWORD": "test",
+    "POSTGRES_DB": "test",
+    "SECRET_KEY": "test-secret-key",
+    "SMTP_SERVER": "localhost",
+    "SMTP_PORT": "465",
+    "SMTP_USERNAME": "test",
+    "SMTP_PASSWORD": "test",
+    "SENDER_EMAIL": "test@example.com",
+    "URL": "http://localhost",
+    "DO_SPACES_KEY": "test",
+    "DO_SPACES_SECRET": "test",
+    "DO_SPACES_ENDPOINT": "http://localhost",
+    "DO_SPACES_REGION": "test",
+    "DO_SPACES_BUCKET": "test",
+    "TWILIO_ACCOUNT_SID": "AC" + "0" * 32,
+    "TWILIO_AUTH_TOKEN": "test",
+    "TWILIO_WHATSAPP_NUMBER": "test",
+    "VENDEDOR_WHATSAPP_NUMBER": "test",
+    "BUILDERBOT_API_KEY": "test",
+}
+for name, value in _TEST_ENV.items():
+    os.environ.setdefault(name, value)
@@ -0,0 +1,34 @@
+import asyncio
+import time
+
+from src.counters import MemoryCounterStore
+
+
+def test_memory_store_counts_within_window_and_restarts_after_expiry(monkeypatch):
+    store = MemoryCounterStore()
+    now = [1000.0]
+    monkeypatch.setattr(time, "monotonic", lambda: now[0])
+
+    async def run():
+        assert [await store.incr("login:ip", 60) for _ in range(3)] == [1, 2, 3]
+        now[0] += 61
+        assert await store.get("login:ip") == 0
+        assert await store.incr("login:ip", 60) == 1
+
+    asyncio.run(run())
+
+
+def test_memory_store_evicts_least_recently_used_key_at_capacity():
+    store = MemoryCounterStore(max_keys=3)
+
+    async def run():
+        for key in ("a", "b", "c"):
+            await store.incr(key, 60)
+        await store.incr("a", 60)
+        # Una clave nueva desplaza a "b", la usada hace más tiempo; "a" sigue contando
+        await store.incr("d", 60)
+        assert len(store._data) == 3
+        assert await store.get("b") == 0
+        assert await store.get("a") == 2
+
+    asyncio.run(run())
@@ -0,0 +1,109 @@
+import asyncio
+import base64
+import json
+import uuid
+from types import SimpleNamespace
+
+import pytest
+from fastapi import HTTPException
+from sqlalchemy import select
+
+import src.models  # noqa: F401  (registra todos los mappers)
+from src import pagination
+from src.pagination import SortKey, decode_cursor, encode_cursor, paginate
+from src.store.models import Product
+
+
+def _products(min_price: float):
+    return select(Product).where(Product.is_active.is_(True), Product.price >= min_price)
+
+
+ORDER = [SortKey(Product.price, True)]
+
+
+def _fingerprint(stmt):
+    return pagination._fingerprint(stmt.order_by(Product.price.desc(), Product.id.desc()))
+
+
+class _Result:
+    def __init__(self, rows):
+        self.rows = rows
+
+    def scalars(self):
+        return self
+
+    def all(self):
+        return self.rows
+
+
+class _FakeSession:
+    def __init__(self, rows):
+        self.rows = rows
+        self.statements = []
+
+    async def execute(self, stmt, **kw):
+        self.statements.append(stmt)
+        return _Result(self.rows)
+
+
+def _params(cursor=None, limit=2):
+    return SimpleNamespace(limit=limit, cursor=cursor, total="none")
+
+
+def _rows(n):
+    return [SimpleNamespace(price=10.0 - i, id=uuid.uuid4()) for i in range(n)]
+
+
+def test_cursor_round_trip():
+    fingerprint = _fingerprint(_products(1))
+    values = [9.5, uuid.UUID(int=7)]
+    assert decode_cursor(fingerprint, encode_cursor(fingerprint, values)) == values
+
+
+def test_fingerprint_is_stable_and_depends_on_filters():
+    assert _fingerprint(_products(1)) == _fingerprint(_products(1))
+    assert _fingerprint(_products(1)) != _fingerprint(_products(2))
+
+
+@pytest.mark.parametrize("tamper", [
+    lambda payload, signature: f"{payload}.{'A' * len(signature)}",
+    lambda payload, signature: f"{payload[:-2]}AA.{signature}",
+    lambda payload, signature: payload,
+])
+def test_forged_cursor_is_rejected(tamper):
+    fingerprint = _fingerprint(_products(1))
+    payload, signature = encode_cursor(fingerprint, [9.5, uuid.UUID(int=7)]).split(".")
+    with pytest.raises(HTTPException) as exc:
+        decode_cursor(fingerprint, tamper(payload, signature))
+    assert exc.value.status_code == 400
+
+
+def test_cursor_with_edited_values_and_old_signature_is_rejected():
+    fingerprint = _fingerprint(_products(1))
+    payload, signature = encode_cursor(fingerprint, [9.5, uuid.UUID(int=7)]).split(".")
+    data = json.loads(base64.urlsafe_b64decode(payload + "=" * (-len(payload) % 4)))
+    data["v"][0] = 1000
+    forged = base64.urlsafe_b64encode(json.dumps(data).encode()).decode().rstrip("=")
+    with pytest.raises(HTTPException):
+        decode_cursor(fingerprint, f"{forged}.{signature}")
+
+
+def test_cursor_from_another_query_is_rejected():
+    cursor = encode_cursor(_fingerprint(_products(1)), [9.5, uuid.UUID(int=7)])
+    with pytest.raises(HTTPException) as exc:
+        decode_cursor(_fingerprint(_products(2)), cursor)
+    assert exc.value.status_code == 400
+
+
+def test_paginate_follows_its_own_cursor_and_rejects_it_with_other_filters():
+    db = _FakeSession(_rows(3))
+    first = asyncio.run(paginate(db, _products(1), ORDER, Product.id, _params()))
+    assert len(first.items) == 2 and first.next_cursor is not None
+
+    db = _FakeSession(_rows(1))
+    last = asyncio.run(paginate(db, _products(1), ORDER, Product.id, _params(first.next_cursor)))
+    assert last.next_cursor is None
+    assert "(products.price, products.id) <" in str(db.statements[0])
+
+    with pytest.raises(HTTPException):
+        asyncio.run(paginate(_FakeSession([]), _products(2), ORDER, Product.id, _params(first.next_cursor)))
@@ -0,0 +1,99 @@
+import asyncio
+from types import SimpleNamespace
+
+import pytest
+from fastapi import Depends, FastAPI
+from sqlalchemy import create_engine, text
+
+import src.models  # noqa: F401  (registra todos los mappers)
+from src.monitoring import queries
+from src.monitoring.context import RequestContextMiddleware
+from src.monitoring.queries import QueryBudgetExceeded, instrument_queries, track_queries
+from src.store import service
+
+engine = create_engine("sqlite://")
+instrument_queries(engine)
+
+
+async def _tracked():
+    # Como get_async_db: dependencia async, en el mismo contexto que la ruta
+    with track_queries() as stats:
+        yield stats
+
+
+def _app(queries_per_request: int) -> FastAPI:
+    app = FastAPI()
+    app.add_middleware(RequestContextMiddleware)
+
+    @app.get("/items/{item_id}")
+    async def items(item_id: int, stats=Depends(_tracked)):
+        with engine.connect() as conn:
+            for _ in range(queries_per_request):
+                conn.execute(text("SELECT 1"))
+        return {"queries": stats.count}
+
+    return app
+
+
+def _get(app: FastAPI, path: str) -> list[dict]:
+    """Ejecuta una petición GET contra la app ASGI y devuelve los mensajes enviados."""
+    sent = []
+
+    async def receive():
+        return {"type": "http.request", "body": b"", "more_body": False}
+
+    async def send(message):
+        sent.append(message)
+
+    scope = {
+        "type": "http", "asgi": {"version": "3.0"}, "http_version": "1.1", "method": "GET",
+        "scheme": "http", "path": path, "raw_path": path.encode(), "root_path": "", "query_string": b"",
+        "headers": [], "client": ("127.0.0.1", 1234), "server": ("testserver", 80),
+    }
+    asyncio.run(app(scope, receive, send))
+    return sent
+
+
+@pytest.fixture
+def strict(monkeypatch):
+    monkeypatch.setattr(queries.settings, "DB_QUERY_STRICT", True)
+    monkeypatch.setattr(queries.settings, "DB_QUERY_BUDGET", 30)
+    monkeypatch.setattr(queries.settings, "DB_QUERY_BUDGETS", {"GET /items/{item_id}": 3})
+
+
+def test_route_within_budget_passes_in_strict_mode(strict):
+    sent = _get(_app(3), "/items/1")
+    assert sent[0]["status"] == 200
+
+
+def test_route_over_budget_fails_in_strict_mode(strict):
+    with pytest.raises(QueryBudgetExceeded, match=r"GET /items/\{item_id\} superó su presupuesto de 3"):
+        _get(_app(4), "/items/1")
+
+
+def test_route_over_budget_only_counts_when_not_strict(monkeypatch):
+    monkeypatch.setattr(queries.settings, "DB_QUERY_STRICT", False)
+    monkeypatch.setattr(queries.settings, "DB_QUERY_BUDGETS", {"GET /items/{item_id}": 3})
+    sent = _get(_app(4), "/items/1")
+    assert sent[0]["status"] == 200
+
+
+def test_sales_report_uses_a_fixed_number_of_queries():
+    class Result(list):
+        def scalars(self):
+            return self
+
+        def all(self):
+            return list(self)
+
+    class Session:
+        statements = 0
+
+        async def execute(self, stmt, **kw):
+            Session.statements += 1
+            return Result()
+
+    report = asyncio.run(service.get_sales_report(Session(), SimpleNamespace(is_superuser=True)))
+    # Órdenes del periodo + resumen agregado por producto (no una consulta por día o semana)
+    assert Session.statements == 2
+    assert len(report.daily_sales) == 7 and len(report.weekly_sales) == 4